@@ -0,0 +1,12 @@
+"""
+Benchmarks of lexing, parsing and evaluating BEXL expressions, run with::
+
+    python -m benchmarks [--filter PATTERN] [--output FILE] [--compare FILE]
+
+The benchmarks cover every expression of test/standard_test_suite.yaml, as
+well as synthetic workloads (see workloads.py). Their results can be saved
+as JSON and compared with those of another run, e.g. of another commit.
+
+The scripts named bench_*.py compare specific features with the
+alternatives to them, and are run on their own.
+"""
@@ -0,0 +1,77 @@
+"""
+Runs the benchmarks of lexing, parsing and evaluating BEXL expressions.
+
+    python -m benchmarks [--filter PATTERN] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+
+from .corpus import corpus_benchmarks
+from .runner import run_benchmarks, save_results, load_results, compare, \
+    format_seconds
+from .workloads import workload_benchmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument(
+        '-k',
+        '--filter',
+        help='only run the benchmarks whose names match this regex',
+    )
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument(
+        '--min-time',
+        type=float,
+        default=0.1,
+        help='the minimum number of seconds each timing takes',
+    )
+    parser.add_argument(
+        '-o',
+        '--output',
+        help='write the results to this JSON file',
+    )
+    parser.add_argument(
+        '-c',
+        '--compare',
+        help='compare the results with those in this JSON file',
+    )
+    parser.add_argument('--list', action='store_true')
+    args = parser.parse_args()
+
+    benchmarks = corpus_benchmarks() + workload_benchmarks()
+    if args.list:
+        for benchmark in benchmarks:
+            print(benchmark.name)
+        return
+
+    baseline = load_results(args.compare) if args.compare else None
+
+    def report(name, result):
+        print('%-22s %12s/op +- %5.1f%%' % (
+            name,
+            format_seconds(result['median']),
+            100.0 * result['stdev'] / result['mean'],
+        ))
+
+    results = run_benchmarks(
+        benchmarks,
+        pattern=args.filter,
+        repeat=args.repeat,
+        min_time=args.min_time,
+        report=report,
+    )
+    if args.output:
+        save_results(results, args.output)
+
+    if baseline:
+        print('')
+        print('Compared with %s:' % (
+            baseline['metadata'].get('revision') or args.compare,
+        ))
+        for name, ratio, verdict in compare(baseline, results):
+            print('%-22s %6.2fx  %s' % (name, ratio, verdict))
+
+
+if __name__ == '__main__':
+    main()
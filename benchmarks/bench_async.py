@@ -0,0 +1,73 @@
+"""
+Compares fetching the variables of an expression one at a time before
+evaluating it with evaluate_async(), which fetches them concurrently and
+skips those that short-circuiting makes unnecessary. Every fetch is
+simulated with an asyncio.sleep() of the given latency.
+
+    python benchmarks/bench_async.py [--latency MS] [--variables N]
+"""
+
+import argparse
+import asyncio
+import time
+
+from bexl import Parser, Interpreter
+from bexl.analysis import variable_dependencies
+from bexl.asynchronous import evaluate_async, AsyncVariableResolver
+
+
+def make_expression(count):
+    return '$gate & (%s) > 0' % (
+        ' + '.join(['$v%d' % (i,) for i in range(count)]),
+    )
+
+
+def make_fetch(latency):
+    async def fetch(name):
+        await asyncio.sleep(latency)
+        if name == 'gate':
+            return True
+        return int(name[1:])
+    return fetch
+
+
+async def run_serial(tree, fetch):
+    variables = {}
+    for name in sorted(variable_dependencies(tree)):
+        variables[name] = await fetch(name)
+    return Interpreter().interpret(tree, variables).value
+
+
+async def run_concurrent(tree, fetch):
+    return await evaluate_async(tree, AsyncVariableResolver(fetch))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--latency', type=float, default=5)
+    parser.add_argument('--variables', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tree = Parser().parse(make_expression(args.variables))
+    fetch = make_fetch(args.latency / 1000.0)
+    loop = asyncio.new_event_loop()
+
+    print('%d variables, %.1f ms per fetch' % (
+        args.variables + 1,
+        args.latency,
+    ))
+    for name, func in (
+            ('serial prefetch', run_serial),
+            ('evaluate_async', run_concurrent)):
+        elapsed = []
+        for _ in range(args.repeat):
+            start = time.time()
+            assert loop.run_until_complete(func(tree, fetch)) is True
+            elapsed.append(time.time() - start)
+        print('%-16s %8.2f ms' % (name, min(elapsed) * 1000))
+    loop.close()
+
+
+if __name__ == '__main__':
+    main()
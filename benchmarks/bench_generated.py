@@ -0,0 +1,94 @@
+"""
+Load tests the Compiler with random well-typed expressions (see
+bexl.generator), or, with --pathological, looks for expressions whose
+lexing, parsing or evaluation takes time that grows faster than linearly
+with their size, and prints minimized reproducers of those it finds.
+
+    python benchmarks/bench_generated.py [--expressions N] [--rows N]
+        [--depth N] [--width N] [--seed N]
+    python benchmarks/bench_generated.py --pathological [--expressions N]
+        [--sizes N,N,...] [--threshold K]
+"""
+
+import argparse
+import timeit
+
+from bexl import Compiler, Parser
+from bexl.generator import ExpressionGenerator, find_pathological
+
+
+def load(generator, expressions, rows):
+    parser = Parser()
+    compiler = Compiler()
+    compiled = []
+    failures = 0
+    started = timeit.default_timer()
+    for _ in range(expressions):
+        compiled.append(compiler.compile(parser.parse(generator.expression())))
+    print('%d expressions compiled in %.2fs' % (
+        expressions,
+        timeit.default_timer() - started,
+    ))
+
+    variables = generator.rows(rows)
+    started = timeit.default_timer()
+    for expression in compiled:
+        for row in variables:
+            try:
+                expression.evaluate(row)
+            except Exception:  # noqa: broad-except
+                # BexlErrors, as well as the errors that the functions don't
+                # always guard against on random values.
+                failures += 1
+    elapsed = timeit.default_timer() - started
+    evaluations = expressions * rows
+    print('%d evaluations in %.2fs (%.2f us each, %d failed)' % (
+        evaluations,
+        elapsed,
+        elapsed * 1000000 / evaluations,
+        failures,
+    ))
+
+
+def pathological(generator, expressions, sizes, threshold):
+    found = find_pathological(
+        generator,
+        count=expressions,
+        sizes=sizes,
+        threshold=threshold,
+    )
+    for reproducer in found:
+        print(reproducer.describe())
+    print('%d problems found in %d expressions' % (len(found), expressions))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--expressions', type=int, default=None)
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--width', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--pathological', action='store_true')
+    parser.add_argument('--sizes', default='16,32,64,128,256')
+    parser.add_argument('--threshold', type=float, default=1.5)
+    args = parser.parse_args()
+
+    generator = ExpressionGenerator(
+        max_depth=args.depth,
+        max_width=args.width,
+        seed=args.seed,
+    )
+    if args.pathological:
+        pathological(
+            generator,
+            args.expressions or 10,
+            [int(size) for size in args.sizes.split(',')],
+            args.threshold,
+        )
+    else:
+        load(generator, args.expressions or 1000, args.rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Compares evaluating an expression compiled by the Compiler with one compiled
+by the HookedCompiler with hooks that aren't interested in any event (which
+should be the same), with a coverage hook that is only notified of the nodes
+entered, and with a tracer that is notified of every event.
+
+    python benchmarks/bench_hooks.py [--rows N]
+"""
+
+import argparse
+import random
+import timeit
+
+from bexl import Compiler, Parser
+from bexl.hooks import EvaluationHooks, HookedCompiler
+
+
+SOURCE = (
+    "$eventType == 'purchase'"
+    " & lower(trim($email)) != ''"
+    " & $amount * 1.2 > 100"
+    " & in(7, $tags)"
+)
+
+
+class Coverage(EvaluationHooks):
+    def __init__(self):
+        self.covered = set()
+
+    def enter(self, node):
+        self.covered.add(id(node))
+
+
+class Tracer(EvaluationHooks):
+    def __init__(self):
+        self.events = 0
+
+    def enter(self, node):
+        self.events += 1
+
+    def exit(self, node, value):
+        self.events += 1
+
+    def variable(self, node, value):
+        self.events += 1
+
+    def dispatch(self, name, implementation, arguments):
+        self.events += 1
+
+    def error(self, node, error):
+        self.events += 1
+
+
+def make_row(rand):
+    return {
+        'eventType': rand.choice(('purchase', 'refund')),
+        'email': ' Someone@Example.com ',
+        'amount': rand.randint(0, 1000),
+        'tags': [rand.randint(0, 20) for _ in range(10)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--rows', type=int, default=2000)
+    args = parser.parse_args()
+
+    rand = random.Random(1)
+    rows = [make_row(rand) for _ in range(args.rows)]
+    tree = Parser().parse(SOURCE)
+
+    variants = (
+        ('Compiler', Compiler().compile(tree)),
+        ('no hooks', HookedCompiler([]).compile(tree)),
+        ('uninterested hook', HookedCompiler(EvaluationHooks()).compile(tree)),
+        ('coverage hook', HookedCompiler(Coverage()).compile(tree)),
+        ('tracer hook', HookedCompiler(Tracer()).compile(tree)),
+    )
+
+    expected = [variants[0][1].evaluate(row) for row in rows]
+    for _, expression in variants:
+        assert [expression.evaluate(row) for row in rows] == expected
+
+    baseline = None
+    for name, expression in variants:
+        def run(expression=expression):
+            for row in rows:
+                expression.evaluate(row)
+        elapsed = min(timeit.repeat(run, number=1, repeat=5))
+        if baseline is None:
+            baseline = elapsed
+        print('%-18s %8.2f us/row %6.2fx' % (
+            name,
+            elapsed * 1000000 / len(rows),
+            elapsed / baseline,
+        ))
+
+
+if __name__ == '__main__':
+    main()
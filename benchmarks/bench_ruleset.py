@@ -0,0 +1,100 @@
+"""
+Compares evaluating a RuleSet against calling bexl.evaluate() for each of its
+rules.
+
+    python benchmarks/bench_ruleset.py [--rules N] [--events N]
+"""
+
+import argparse
+import random
+import timeit
+
+from bexl import RuleSet, Parser, Interpreter, VariableResolver, evaluate
+
+
+EVENT_TYPES = ('purchase', 'refund', 'signup', 'login', 'logout')
+
+
+def make_rules(count, seed=0):
+    rand = random.Random(seed)
+    rules = {}
+    for i in range(count):
+        rules['rule%d' % (i,)] = (
+            "$eventType == '%s'"
+            " & lower(trim($email)) != ''"
+            " & $amount * 1.2 > %d"
+            " & in(%d, $tags)"
+        ) % (
+            rand.choice(EVENT_TYPES),
+            rand.randint(0, 1000),
+            rand.randint(0, 20),
+        )
+    return rules
+
+
+def make_event(rand):
+    return {
+        'eventType': rand.choice(EVENT_TYPES),
+        'email': ' Someone@Example.com ',
+        'amount': rand.randint(0, 1000),
+        'tags': [rand.randint(0, 20) for _ in range(10)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument('--rules', type=int, default=5000)
+    parser.add_argument('--events', type=int, default=5)
+    args = parser.parse_args()
+
+    rules = make_rules(args.rules)
+    rand = random.Random(1)
+    events = [make_event(rand) for _ in range(args.events)]
+
+    ruleset = RuleSet(rules)
+    ruleset.compile()
+    trees = dict([
+        (name, Parser().parse(source))
+        for name, source in rules.items()
+    ])
+
+    def run_evaluate():
+        for event in events:
+            for source in rules.values():
+                evaluate(source, event)
+
+    def run_interpreter():
+        interpreter = Interpreter()
+        for event in events:
+            for tree in trees.values():
+                interpreter.interpret(tree, VariableResolver.make_from(event))
+
+    def run_ruleset():
+        for event in events:
+            ruleset.evaluate(event)
+
+    for event in events:
+        expected = dict([
+            (name, evaluate(source, event))
+            for name, source in rules.items()
+        ])
+        assert dict(ruleset.evaluate(event)) == expected
+
+    print('%d rules, %d events; %.2f nodes per distinct node' % (
+        len(rules),
+        len(events),
+        ruleset.interner.dedup_ratio,
+    ))
+    for name, func in (
+            ('evaluate() loop', run_evaluate),
+            ('Interpreter loop', run_interpreter),
+            ('RuleSet', run_ruleset)):
+        elapsed = min(timeit.repeat(func, number=1, repeat=3))
+        print('%-18s %8.2f ms/event' % (
+            name,
+            elapsed * 1000 / len(events),
+        ))
+
+
+if __name__ == '__main__':
+    main()
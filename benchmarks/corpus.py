@@ -0,0 +1,87 @@
+"""
+The expressions of the standard test suite, as a corpus of benchmarks.
+"""
+
+import os
+
+import yaml
+
+from bexl import VariableResolver, python_to_bexl, IntegerValue, \
+    FloatValue, StringValue, BooleanValue, ListValue, RecordValue, \
+    UntypedValue, DateValue, TimeValue, DateTimeValue
+
+from .workloads import stage_benchmarks
+
+
+SUITE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    'test',
+    'standard_test_suite.yaml',
+)
+
+TYPES = {
+    'INTEGER': IntegerValue,
+    'FLOAT': FloatValue,
+    'STRING': StringValue,
+    'BOOLEAN': BooleanValue,
+    'LIST': ListValue,
+    'RECORD': RecordValue,
+    'UNTYPED': UntypedValue,
+    'DATE': DateValue,
+    'TIME': TimeValue,
+    'DATETIME': DateTimeValue,
+}
+
+
+def make_value(value, value_type):
+    # The same conversion as test/test_standard_suite.py.
+    if value is None:
+        return TYPES[value_type](value)
+    if value_type == 'LIST':
+        return ListValue([python_to_bexl(element) for element in value])
+    if value_type == 'RECORD':
+        return RecordValue(dict([
+            (key, python_to_bexl(element))
+            for key, element in value.items()
+        ]))
+    return TYPES[value_type](value)
+
+
+def load_corpus(path=SUITE_PATH):
+    """
+    Returns the expressions of the standard test suite, and the variables
+    they are evaluated with.
+
+    :param path: the path of the suite
+    :type path: str
+    :rtype: list of tuple(str, bexl.VariableResolver)
+    """
+
+    with open(path) as source:
+        suite = yaml.safe_load(source)
+
+    cases = []
+    for group in suite['suite']:
+        for test in group['tests']:
+            resolver = VariableResolver()
+            for name, definition in test.get('vars', {}).items():
+                resolver[name] = make_value(
+                    definition['value'],
+                    definition['type'],
+                )
+            cases.append((test['expr'], resolver))
+    return cases
+
+
+def corpus_benchmarks(path=SUITE_PATH):
+    """
+    Returns the benchmarks of each stage of evaluating all the expressions
+    of the standard test suite.
+
+    :param path: the path of the suite
+    :type path: str
+    :rtype: list of Benchmark
+    """
+
+    return stage_benchmarks('suite', load_corpus(path))
@@ -0,0 +1,267 @@
+"""
+Runs benchmarks, stores their results as JSON and compares the results of
+different runs.
+"""
+
+import datetime
+import json
+import math
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+
+
+# The version of the format of the results files.
+RESULTS_VERSION = 1
+
+_timer = getattr(time, 'perf_counter', time.time)  # noqa: invalid-name
+
+
+class Benchmark(object):
+    """
+    A piece of work to time.
+
+    :param name: the name of the benchmark, e.g. ``workload.stage``
+    :type name: str
+    :param func: the callable that performs the work
+    :type func: callable
+    :param operations:
+        the number of operations (e.g. evaluations) the callable performs,
+        so that the results are per operation
+    :type operations: int
+    """
+
+    __slots__ = (
+        'name',
+        'func',
+        'operations',
+    )
+
+    def __init__(self, name, func, operations=1):
+        self.name = name
+        self.func = func
+        self.operations = operations
+
+
+def _time(func, loops):
+    started = _timer()
+    for _ in range(loops):
+        func()
+    return _timer() - started
+
+
+def run_benchmark(benchmark, repeat=5, min_time=0.1):
+    """
+    Times a benchmark. Like pyperf, the work is repeated in a loop long
+    enough (at least ``min_time`` seconds) for the timer to be accurate,
+    after a warmup run, and the loop is timed ``repeat`` times.
+
+    :param benchmark: the benchmark to run
+    :type benchmark: Benchmark
+    :param repeat: the number of times to time the loop
+    :type repeat: int
+    :param min_time: the minimum number of seconds the loop should take
+    :type min_time: float
+    :returns: the result of the benchmark (see summarize())
+    :rtype: dict
+    """
+
+    func = benchmark.func
+    func()
+
+    loops = 1
+    while True:
+        elapsed = _time(func, loops)
+        if elapsed >= min_time or loops >= 2 ** 20:
+            break
+        loops *= 2
+
+    runs = [
+        _time(func, loops) / (loops * benchmark.operations)
+        for _ in range(repeat)
+    ]
+    result = summarize(runs)
+    result['loops'] = loops
+    result['operations'] = benchmark.operations
+    return result
+
+
+def summarize(runs):
+    """
+    Returns the statistics of the seconds per operation of the runs of a
+    benchmark.
+
+    :param runs: the seconds per operation of each run
+    :type runs: list of float
+    :rtype: dict
+    """
+
+    ordered = sorted(runs)
+    middle = len(ordered) // 2
+    if len(ordered) % 2:
+        median = ordered[middle]
+    else:
+        median = (ordered[middle - 1] + ordered[middle]) / 2.0
+    mean = sum(runs) / len(runs)
+    if len(runs) > 1:
+        stdev = math.sqrt(
+            sum([(run - mean) ** 2 for run in runs]) / (len(runs) - 1)
+        )
+    else:
+        stdev = 0.0
+    return {
+        'runs': runs,
+        'min': ordered[0],
+        'median': median,
+        'mean': mean,
+        'stdev': stdev,
+    }
+
+
+def _git_revision():
+    directory = os.path.dirname(os.path.abspath(__file__))
+    try:
+        output = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=directory,
+            stderr=subprocess.STDOUT,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.decode('ascii', 'replace').strip()
+
+
+def metadata():
+    """
+    Describes the environment the benchmarks are run in, so that results
+    can be compared knowingly.
+
+    :rtype: dict
+    """
+
+    return {
+        'revision': _git_revision(),
+        'date': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+    }
+
+
+def run_benchmarks(
+        benchmarks,
+        pattern=None,
+        repeat=5,
+        min_time=0.1,
+        report=None):
+    """
+    Runs the benchmarks whose names match the pattern.
+
+    :param benchmarks: the benchmarks
+    :type benchmarks: list of Benchmark
+    :param pattern:
+        a regular expression the names of the benchmarks to run must
+        contain a match for. If not specified, all of them are run.
+    :type pattern: str
+    :param repeat: the number of times to time each benchmark
+    :type repeat: int
+    :param min_time: the minimum number of seconds each timing should take
+    :type min_time: float
+    :param report:
+        a callable that is invoked with the name and result of each
+        benchmark as it finishes
+    :type report: callable
+    :returns: the results, in the format written by save_results()
+    :rtype: dict
+    """
+
+    results = {}
+    for benchmark in benchmarks:
+        if pattern and not re.search(pattern, benchmark.name):
+            continue
+        results[benchmark.name] = run_benchmark(benchmark, repeat, min_time)
+        if report:
+            report(benchmark.name, results[benchmark.name])
+    return {
+        'version': RESULTS_VERSION,
+        'metadata': metadata(),
+        'benchmarks': results,
+    }
+
+
+def save_results(results, path):
+    """
+    Writes the results of a run to a JSON file.
+
+    :param results: the results returned by run_benchmarks()
+    :type results: dict
+    :param path: the path of the file
+    :type path: str
+    """
+
+    with open(path, 'w') as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+        output.write('\n')
+
+
+def load_results(path):
+    """
+    Reads the results of a run from a JSON file.
+
+    :param path: the path of the file
+    :type path: str
+    :rtype: dict
+    """
+
+    with open(path) as source:
+        results = json.load(source)
+    if results.get('version') != RESULTS_VERSION:
+        raise ValueError('%s is not a results file of version %s' % (
+            path,
+            RESULTS_VERSION,
+        ))
+    return results
+
+
+def compare(baseline, results, threshold=0.05):
+    """
+    Compares the median times of the benchmarks in both results.
+
+    :param baseline: the results to compare against
+    :type baseline: dict
+    :param results: the results to compare
+    :type results: dict
+    :param threshold:
+        the relative difference below which a benchmark is considered
+        unchanged
+    :type threshold: float
+    :returns:
+        tuples of the name of each benchmark, its ratio of the baseline's
+        time, and whether it is "faster", "slower" or "same"
+    :rtype: list of tuple
+    """
+
+    comparisons = []
+    before = baseline['benchmarks']
+    for name, result in sorted(results['benchmarks'].items()):
+        if name not in before:
+            continue
+        ratio = result['median'] / before[name]['median']
+        if ratio < 1 - threshold:
+            verdict = 'faster'
+        elif ratio > 1 + threshold:
+            verdict = 'slower'
+        else:
+            verdict = 'same'
+        comparisons.append((name, ratio, verdict))
+    return comparisons
+
+
+def format_seconds(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return '%.2f %s' % (seconds / scale, unit)
+    return '%.0f ns' % (seconds / 1e-9,)
@@ -0,0 +1,272 @@
+"""
+The benchmarks of each stage of evaluating expressions, and the synthetic
+workloads they are run on.
+"""
+
+import datetime
+import random
+
+from bexl import BexlError, Interpreter, Lexer, Parser, RuleSet, \
+    VariableResolver, DateValue, DateTimeValue, compile, evaluate
+
+from bexl.generator import ExpressionGenerator
+
+from .bench_ruleset import make_rules, make_event
+from .runner import Benchmark
+
+
+# The stages of evaluating an expression that are benchmarked.
+STAGES = (
+    'lex',
+    'parse',
+    'interpret',
+    'compiled',
+    'evaluate',
+)
+
+
+def _quietly(func, *args):
+    try:
+        return func(*args)
+    except BexlError:
+        return None
+
+
+def stage_benchmarks(prefix, cases):
+    """
+    Returns benchmarks of each stage of evaluating the given expressions:
+
+    lex
+        tokenizing them
+    parse
+        parsing them into ASTs
+    interpret
+        interpreting the parsed ASTs
+    compiled
+        evaluating them once compiled
+    evaluate
+        calling bexl.evaluate() on them, from source to result
+
+    Errors raised by the expressions are ignored, so expressions that are
+    expected to fail can be benchmarked too. Those that can't be parsed are
+    only lexed and parsed.
+
+    :param prefix: the prefix of the names of the benchmarks
+    :type prefix: str
+    :param cases: the expressions and the variables to evaluate them with
+    :type cases: list of tuple(str, bexl.VariableResolver)
+    :rtype: list of Benchmark
+    """
+
+    parser = Parser()
+    parsed = []
+    for source, resolver in cases:
+        tree = _quietly(parser.parse, source)
+        if tree is not None:
+            parsed.append((source, tree, compile(source), resolver))
+    interpreter = Interpreter()
+
+    def lex():
+        for source, _ in cases:
+            _quietly(list, Lexer(source))
+
+    def parse():
+        for source, _ in cases:
+            _quietly(parser.parse, source)
+
+    def interpret():
+        for _, tree, _, resolver in parsed:
+            _quietly(interpreter.interpret, tree, resolver)
+
+    def run_compiled():
+        for _, _, expression, resolver in parsed:
+            _quietly(expression.evaluate, resolver)
+
+    def run_evaluate():
+        for source, _, _, resolver in parsed:
+            _quietly(evaluate, source, resolver)
+
+    return [
+        Benchmark(prefix + '.lex', lex, len(cases)),
+        Benchmark(prefix + '.parse', parse, len(cases)),
+        Benchmark(prefix + '.interpret', interpret, len(parsed)),
+        Benchmark(prefix + '.compiled', run_compiled, len(parsed)),
+        Benchmark(prefix + '.evaluate', run_evaluate, len(parsed)),
+    ]
+
+
+def boolean_chain(rand, clauses=40, rows=20):
+    """
+    A long chain of & and | over comparisons, like a generated rule.
+    """
+
+    parts = []
+    for position in range(clauses):
+        if position % 3 == 2:
+            parts.append("$s%d != '%s'" % (position % 10, rand.choice('xyz')))
+        else:
+            parts.append('$v%d > %d' % (position % 20, rand.randint(0, 20)))
+    source = parts[0]
+    for part in parts[1:]:
+        source += (' | ' if rand.random() < 0.2 else ' & ') + part
+
+    variables = []
+    for _ in range(rows):
+        row = dict([
+            ('v%d' % (position,), rand.randint(0, 200))
+            for position in range(20)
+        ])
+        row.update([
+            ('s%d' % (position,), rand.choice('xyzw'))
+            for position in range(10)
+        ])
+        variables.append(row)
+    return source, variables
+
+
+def list_aggregates(rand, size=5000, rows=3):
+    """
+    Aggregates over a large list.
+    """
+
+    source = (
+        'sum($values) > 1000'
+        ' & average($values) < 600'
+        ' & max($values) - min($values) > 10'
+        ' & count($values) > 0'
+        ' & length($values) == %d'
+        ' & in(42, $values)'
+    ) % (size,)
+    variables = [
+        {'values': [rand.randint(0, 1000) for _ in range(size)]}
+        for _ in range(rows)
+    ]
+    return source, variables
+
+
+def date_comparisons(rand, rows=20):
+    """
+    Comparisons of dates and datetimes, and of their parts.
+    """
+
+    source = (
+        "$created >= date('2019-01-01')"
+        ' & $created <= $shipped'
+        ' & year($created) == 2019'
+        ' & month($shipped) >= month($created)'
+        " & $updated < datetime('2020-01-01T00:00:00')"
+        ' & hour($updated) < 18'
+        ' & day($shipped) != 31'
+    )
+    start = datetime.date(2019, 1, 1)
+    variables = []
+    for _ in range(rows):
+        created = start + datetime.timedelta(days=rand.randint(0, 300))
+        shipped = created + datetime.timedelta(days=rand.randint(0, 30))
+        variables.append({
+            'created': DateValue(created),
+            'shipped': DateValue(shipped),
+            'updated': DateTimeValue(datetime.datetime.combine(
+                shipped,
+                datetime.time(rand.randint(0, 23)),
+            )),
+        })
+    return source, variables
+
+
+def record_properties(rand, rows=20):
+    """
+    Access to the properties of nested records and lists of records.
+    """
+
+    source = (
+        "$order.customer.address.country == 'US'"
+        ' & $order.total > 100'
+        " & $order.items[0].sku != ''"
+        ' & length($order.items) > 1'
+        " & lower($order.customer.name) != 'test'"
+        ' & $order.items[-1].quantity * $order.items[-1].price < 1000'
+    )
+    variables = []
+    for _ in range(rows):
+        variables.append({'order': {
+            'total': rand.randint(0, 500),
+            'customer': {
+                'name': rand.choice(('Alice', 'Bob', 'Test')),
+                'address': {'country': rand.choice(('US', 'CA'))},
+            },
+            'items': [
+                {
+                    'sku': 'SKU%d' % (position,),
+                    'quantity': rand.randint(1, 5),
+                    'price': rand.randint(1, 300),
+                }
+                for position in range(rand.randint(1, 5))
+            ],
+        }})
+    return source, variables
+
+
+# The synthetic workloads, which return an expression and the variables to
+# evaluate it with.
+WORKLOADS = (
+    ('chain', boolean_chain),
+    ('aggregates', list_aggregates),
+    ('dates', date_comparisons),
+    ('records', record_properties),
+)
+
+
+def generated_cases(seed, count=50):
+    """
+    Random well-typed expressions (see bexl.generator), each with random
+    variables to evaluate it with. Those that fail with errors other than
+    BexlErrors (which the functions don't always guard against on random
+    values) are left out.
+    """
+
+    generator = ExpressionGenerator(max_depth=3, seed=seed)
+    cases = []
+    while len(cases) < count:
+        source = generator.expression()
+        resolver = VariableResolver.make_from(generator.row())
+        try:
+            _quietly(evaluate, source, resolver)
+        except Exception:  # noqa: broad-except
+            continue
+        cases.append((source, resolver))
+    return cases
+
+
+def workload_benchmarks(seed=0):
+    """
+    Returns the benchmarks of each stage of the synthetic workloads, of
+    random generated expressions, and of evaluating a RuleSet (see
+    bench_ruleset.py).
+
+    :param seed: the seed of the random workloads
+    :type seed: int
+    :rtype: list of Benchmark
+    """
+
+    rand = random.Random(seed)
+    benchmarks = []
+    for name, workload in WORKLOADS:
+        source, variables = workload(rand)
+        benchmarks.extend(stage_benchmarks(name, [
+            (source, VariableResolver.make_from(row))
+            for row in variables
+        ]))
+    benchmarks.extend(stage_benchmarks('generated', generated_cases(seed)))
+
+    ruleset = RuleSet(make_rules(500, seed))
+    ruleset.compile()
+    events = [make_event(rand) for _ in range(5)]
+
+    def evaluate_ruleset():
+        for event in events:
+            ruleset.evaluate(event)
+    benchmarks.append(
+        Benchmark('ruleset.evaluate', evaluate_ruleset, len(events)),
+    )
+    return benchmarks
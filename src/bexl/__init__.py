@@ -2,8 +2,24 @@ from . import (
     functions,
     operators,
 )
+from .analysis import (
+    variable_dependencies,
+    VariableDependency,
+)
+from .compiler import (
+    Compiler,
+    CompiledExpression,
+)
+from .cost import (
+    estimate_cost,
+    CostModel,
+)
 from .core import (
     evaluate,
+    compile,
+)
+from .dispatcher import (
+    FunctionRegistry,
 )
 from .errors import (
     BexlError,
@@ -13,7 +29,9 @@ from .errors import (
     ResolverError,
     DispatchError,
     ExecutionError,
+    LimitExceededError,
     ConversionError,
+    SerializationError,
 )
 from .interpreter import (
     Interpreter,
@@ -21,11 +39,27 @@ from .interpreter import (
 from .lexer import (
     Lexer,
 )
+from .limits import (
+    ExecutionLimits,
+)
+from .metrics import (
+    DispatchMetrics,
+)
 from .parser import (
     Parser,
 )
 from .resolver import (
     VariableResolver,
+    LazyVariableResolver,
+)
+from .ruleset import (
+    RuleSet,
+)
+from .session import (
+    EvaluationSession,
+)
+from .standard import (
+    STANDARD_REGISTRY,
 )
 from .types import (
     bexl_to_python,
@@ -45,6 +79,11 @@ from .types import (
 
 __all__ = (
     'evaluate',
+    'compile',
+    'variable_dependencies',
+    'VariableDependency',
+    'estimate_cost',
+    'CostModel',
 
     'bexl_to_python',
     'python_to_bexl',
@@ -63,7 +102,16 @@ __all__ = (
     'Lexer',
     'Parser',
     'Interpreter',
+    'Compiler',
+    'CompiledExpression',
+    'FunctionRegistry',
+    'STANDARD_REGISTRY',
     'VariableResolver',
+    'LazyVariableResolver',
+    'RuleSet',
+    'EvaluationSession',
+    'ExecutionLimits',
+    'DispatchMetrics',
 
     'BexlError',
     'LexerError',
@@ -72,6 +120,8 @@ __all__ = (
     'ResolverError',
     'DispatchError',
     'ExecutionError',
+    'LimitExceededError',
     'ConversionError',
+    'SerializationError',
 )
 
@@ -0,0 +1,389 @@
+import time
+
+from .analysis import is_pure, is_total, variable_dependencies
+from .compiler import CompiledExpression, Compiler, unwrap_grouping
+from .dispatcher import Delegate, DEFAULT_REGISTRY
+from .errors import InterpreterError
+from .functions.logical import logical_and, logical_or
+from .interpreter import SHORT_CIRCUITS
+from .nodes import Binary
+from .token import TokenType
+from .types import make_value, cast, Types
+
+
+# The number of evaluations of a chain between reconsiderations of the order
+# of its operands, if not specified.
+DEFAULT_INTERVAL = 1000
+
+# The functions that the short-circuiting operators must be implemented by
+# for their operands to be reordered.
+STOCK_IMPLEMENTATIONS = {
+    TokenType.AMPERSAND: ('and', logical_and),
+    TokenType.PIPE: ('or', logical_or),
+}
+
+_timer = getattr(time, 'perf_counter', time.time)  # noqa: invalid-name
+
+
+def _compile_adaptive(tree, interval, registry=None):
+    return AdaptiveCompiler(
+        interval=interval,
+        registry=registry,
+    ).compile(tree)
+
+
+def flatten_chain(node):
+    """
+    Returns the operands of a chain of the same & or | operator, such as the
+    three operands of ``$a & ($b & $c)``, in the order they're evaluated.
+
+    :param node: the Binary node at the top of the chain
+    :type node: bexl.nodes.Binary
+    :rtype: list of bexl.nodes.Expression
+    """
+
+    operands = []
+    pending = [node]
+    while pending:
+        current = unwrap_grouping(pending.pop())
+        if isinstance(current, Binary) and current.name == node.name:
+            pending.append(current.right)
+            pending.append(current.left)
+        else:
+            operands.append(current)
+    return operands
+
+
+class OperandStatistics(object):
+    """
+    What has been observed about the evaluations of one operand of an
+    AdaptiveChain.
+
+    :param node: the operand
+    :type node: bexl.nodes.Expression
+    :param position: the position of the operand in the expression
+    :type position: int
+    """
+
+    __slots__ = (
+        'node',
+        'position',
+        'evaluations',
+        'decisions',
+        'seconds',
+    )
+
+    def __init__(self, node, position):
+        self.node = node
+        self.position = position
+        self.evaluations = 0
+        self.decisions = 0
+        self.seconds = 0.0
+
+    @property
+    def decision_rate(self):
+        """
+        The estimated probability that the operand decides the result of the
+        chain (i.e., that it is false in an & chain, or true in a | chain).
+        Operands that haven't been evaluated much are assumed to decide half
+        the time.
+        """
+
+        return (self.decisions + 1.0) / (self.evaluations + 2.0)
+
+    @property
+    def average_seconds(self):
+        """
+        The average number of seconds an evaluation of the operand takes.
+        """
+
+        if not self.evaluations:
+            return 0.0
+        return self.seconds / self.evaluations
+
+    @property
+    def rank(self):
+        """
+        The average cost of the operand per decision it makes. Evaluating
+        the operands of the lowest rank first minimizes the expected cost of
+        the chain.
+        """
+
+        return self.average_seconds / self.decision_rate
+
+    def __repr__(self):
+        return '%s(position=%s, evaluations=%s, decisions=%s, ' \
+            'seconds=%.6f)' % (
+                self.__class__.__name__,
+                self.position,
+                self.evaluations,
+                self.decisions,
+                self.seconds,
+            )
+
+
+class AdaptiveChain(object):
+    """
+    A compiled chain of the same & or | operator whose operands are all
+    pure, which are evaluated in the order that the statistics gathered so
+    far suggest is the cheapest.
+
+    Since the operands are pure, the order they're evaluated in can only
+    change the outcome if one of them raises an error. Only the operands
+    that are total (see bexl.analysis.is_total), which can't raise anything
+    but a ResolverError, are reordered, and only among the total operands
+    next to them; the others stay where they are. When an operand decides
+    the result, the variables of the operands before it in the original
+    order that were skipped are resolved (as they would have been without
+    reordering), and if one of them can't be, or an operand raises an
+    error, the chain is evaluated again in its original order, so that the
+    same error is raised as without reordering.
+
+    :param node: the Binary node at the top of the chain
+    :type node: bexl.nodes.Binary
+    :param operands: the operands, in their original order
+    :type operands: list of bexl.nodes.Expression
+    :param compiled: the compiled operands, in their original order
+    :type compiled: list of callable
+    :param fallback:
+        a callable that returns the compiled chain, to evaluate in the
+        original order
+    :type fallback: callable
+    :param interval:
+        the number of evaluations between reconsiderations of the order
+    :type interval: int
+    :param total:
+        whether each of the operands is total, in their original order. If
+        not specified, all of them are.
+    :type total: list of bool
+    """
+
+    def __init__(
+            self,
+            node,
+            operands,
+            compiled,
+            fallback,
+            interval,
+            total=None):
+        self.node = node
+        self.decider = SHORT_CIRCUITS[node.name]
+        self.statistics = [
+            OperandStatistics(operand, position)
+            for position, operand in enumerate(operands)
+        ]
+        self.interval = interval
+        self.evaluations = 0
+        self.fallbacks = 0
+        self.decisions = []
+        self.order = tuple(range(len(operands)))
+        self._original = self.order
+        if total is None:
+            total = [True] * len(operands)
+
+        # Operands that aren't total separate the runs of total ones that
+        # can be reordered among themselves.
+        self._segments = []
+        segment = 0
+        for is_operand_total in total:
+            if not is_operand_total:
+                segment += 1
+            self._segments.append(segment)
+            if not is_operand_total:
+                segment += 1
+
+        self._variables = [
+            sorted(variable_dependencies(operand))
+            for operand in operands
+        ]
+
+        self._compiled = compiled
+        self._fallback = fallback
+        self._fallback_function = None
+        self._decided = make_value(Types.BOOLEAN, self.decider)
+        self._undecided = make_value(Types.BOOLEAN, not self.decider)
+
+    def __call__(self, context):
+        self.evaluations += 1
+        if self.evaluations % self.interval == 0:
+            self.reorder()
+
+        decider = self.decider
+        evaluated = set()
+        try:
+            for position in self.order:
+                statistics = self.statistics[position]
+                started = _timer()
+                value = self._compiled[position](context)
+                decided = cast(value, Types.BOOLEAN).raw_value is decider
+                statistics.seconds += _timer() - started
+                statistics.evaluations += 1
+                evaluated.add(position)
+                if decided:
+                    statistics.decisions += 1
+                    self._resolve_skipped(context, position, evaluated)
+                    return self._decided
+        except InterpreterError:
+            self.fallbacks += 1
+            if self._fallback_function is None:
+                self._fallback_function = self._fallback()
+            return self._fallback_function(context)
+        return self._undecided
+
+    def _resolve_skipped(self, context, position, evaluated):
+        # Raises a ResolverError if one of the operands that would have been
+        # evaluated before the deciding one without reordering references a
+        # variable that doesn't exist.
+        for skipped in range(position):
+            if skipped not in evaluated:
+                for name in self._variables[skipped]:
+                    context.resolver(name)
+
+    def reorder(self):
+        """
+        Changes the order the operands are evaluated in to the one that the
+        statistics gathered so far suggest is the cheapest, recording the
+        change in ``decisions`` if it is different. Operands that aren't
+        total keep their positions.
+        """
+
+        segments = self._segments
+        order = tuple([
+            statistics.position
+            for statistics in sorted(
+                self.statistics,
+                key=lambda statistics: (
+                    segments[statistics.position],
+                    statistics.rank,
+                    statistics.position,
+                ),
+            )
+        ])
+        if order != self.order:
+            self.decisions.append((self.evaluations, self.order, order))
+            self.order = order
+
+    def describe(self):
+        """
+        Describes the operands of the chain, in the order they're currently
+        evaluated in.
+
+        :rtype: list of dict
+        """
+
+        return [
+            {
+                'position': position,
+                'evaluations': self.statistics[position].evaluations,
+                'decision_rate': self.statistics[position].decision_rate,
+                'average_seconds': self.statistics[position].average_seconds,
+            }
+            for position in self.order
+        ]
+
+
+class AdaptiveExpression(CompiledExpression):
+    """
+    A CompiledExpression whose chains of & and | adapt the order they
+    evaluate their operands in (see AdaptiveCompiler).
+
+    :param tree: the parsed AST the expression was compiled from
+    :type tree: bexl.nodes.Expression
+    :param function: the compiled closure that evaluates the expression
+    :type function: callable
+    :param registry:
+        the registry of the operators and functions the expression was
+        compiled with
+    :type registry: bexl.dispatcher.FunctionRegistry
+    :param chains: the adaptive chains of the expression
+    :type chains: list of AdaptiveChain
+    :param interval:
+        the number of evaluations of a chain between reconsiderations of the
+        order of its operands
+    :type interval: int
+    """
+
+    def __init__(self, tree, function, registry, chains, interval):
+        super(AdaptiveExpression, self).__init__(tree, function, registry)
+        self.chains = chains
+        self.interval = interval
+
+    def __reduce__(self):
+        # The statistics of the chains are not kept.
+        if self.registry is DEFAULT_REGISTRY:
+            return _compile_adaptive, (self.tree, self.interval)
+        return _compile_adaptive, (self.tree, self.interval, self.registry)
+
+
+class AdaptiveCompiler(Compiler):
+    """
+    A Compiler that produces expressions whose chains of & and | (such as
+    ``$a & $b & $c``) learn which of their operands are the cheapest and
+    most likely to decide the result, and evaluate those first. The
+    adaptive expression produces the same value, or raises the same error,
+    as an expression produced by the Compiler would; see AdaptiveChain for
+    how errors are handled.
+
+    Only chains whose operands are all pure, and which have at least two
+    total operands next to each other, are reordered. The statistics of
+    a chain are updated without locking, so they are approximate if the
+    expression is evaluated from many threads at once.
+
+    :param interval:
+        the number of evaluations of a chain between reconsiderations of the
+        order of its operands. If not specified, 1000 is used.
+    :type interval: int
+    :param registry: the registry of the operators and functions to use
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, registry=None):
+        super(AdaptiveCompiler, self).__init__(registry=registry)
+        self.interval = interval
+        self._chains = []
+
+    def compile(self, tree):
+        self._chains = []
+        function = self.compile_node(tree)
+        return AdaptiveExpression(
+            tree,
+            function,
+            self.registry,
+            self._chains,
+            self.interval,
+        )
+
+    def _is_stock(self, name):
+        function_name, implementation = STOCK_IMPLEMENTATIONS[name]
+        operator = self.registry.binary_operators.get(name)
+        return isinstance(operator, Delegate) \
+            and operator.name == function_name \
+            and self.registry.functions.get(function_name) is implementation
+
+    def visit_binary(self, node):
+        if node.name not in SHORT_CIRCUITS or not self._is_stock(node.name):
+            return super(AdaptiveCompiler, self).visit_binary(node)
+
+        operands = flatten_chain(node)
+        if not all([
+                is_pure(operand, self.registry.functions)
+                for operand in operands]):
+            return super(AdaptiveCompiler, self).visit_binary(node)
+
+        registry = self.registry
+        total = [is_total(operand, registry) for operand in operands]
+        if not any([
+                total[position] and total[position + 1]
+                for position in range(len(total) - 1)]):
+            return super(AdaptiveCompiler, self).visit_binary(node)
+
+        chain = AdaptiveChain(
+            node,
+            operands,
+            [self.compile_node(operand) for operand in operands],
+            lambda: Compiler(registry=registry).compile_node(node),
+            self.interval,
+            total,
+        )
+        self._chains.append(chain)
+        return chain
@@ -0,0 +1,215 @@
+from .dispatcher import DEFAULT_REGISTRY, Delegate, FUNCTIONS
+from .nodes import Binary, Expression, Function, Grouping, Indexing, \
+    Property, Unary, Variable
+
+
+def walk(tree):
+    """
+    Iterates over all the nodes in the AST, parents before their children.
+
+    :param tree: the parsed AST to walk
+    :type tree: bexl.nodes.Expression
+    :rtype: iterator of bexl.nodes.Expression
+    """
+
+    pending = [tree]
+    while pending:
+        node = pending.pop()
+        yield node
+        pending.extend(reversed(node.children))
+
+
+def is_pure(tree, functions=FUNCTIONS):
+    """
+    Determines whether the AST always produces the same result when evaluated
+    with the same variables; i.e., that it doesn't invoke any functions that
+    were registered with ``pure=False``, such as now().
+
+    :param tree: the parsed AST to examine
+    :type tree: bexl.nodes.Expression
+    :param functions: the Dispatcher the functions are registered with
+    :type functions: bexl.dispatcher.Dispatcher
+    :rtype: bool
+    """
+
+    for node in walk(tree):
+        if isinstance(node, Function) \
+                and not functions.metadata(node.name).get('pure', True):
+            return False
+    return True
+
+
+def _is_total_function(functions, name):
+    # Implementations registered with signatures raise a DispatchError when
+    # invoked with arguments of other types.
+    return functions.metadata(name).get('total', False) \
+        and not isinstance(functions.get(name), dict)
+
+
+def _is_total_operator(operators, functions, name):
+    implementation = operators.get(name)
+    if isinstance(implementation, Delegate):
+        return _is_total_function(functions, implementation.name)
+    return _is_total_function(operators, name)
+
+
+def is_total(tree, registry=DEFAULT_REGISTRY):
+    """
+    Determines whether the AST can only raise an error if one of the
+    variables it references doesn't exist; i.e., that it doesn't access
+    properties or index into values, and only invokes operators and
+    functions that were registered with ``total=True``, such as ``&``.
+
+    :param tree: the parsed AST to examine
+    :type tree: bexl.nodes.Expression
+    :param registry: the registry of the operators and functions to use
+    :type registry: bexl.dispatcher.FunctionRegistry
+    :rtype: bool
+    """
+
+    functions = registry.functions
+    for node in walk(tree):
+        if isinstance(node, (Property, Indexing)):
+            return False
+        if isinstance(node, Function) \
+                and not _is_total_function(functions, node.name):
+            return False
+        if isinstance(node, Unary) and not _is_total_operator(
+                registry.unary_operators,
+                functions,
+                node.name):
+            return False
+        if isinstance(node, Binary) and not _is_total_operator(
+                registry.binary_operators,
+                functions,
+                node.name):
+            return False
+    return True
+
+
+class VariableDependency(object):
+    """
+    Describes how an expression uses one of the variables it references.
+
+    :param name: the name of the variable
+    :type name: str
+    :param paths:
+        the chains of properties accessed on the variable, as tuples of
+        property names
+    :type paths: iterable of tuple
+    :param whole:
+        whether the expression uses the value of the variable itself, rather
+        than only properties of it
+    :type whole: bool
+    """
+
+    __slots__ = (
+        'name',
+        'paths',
+        'whole',
+    )
+
+    def __init__(self, name, paths=(), whole=False):
+        self.name = name
+        self.whole = whole
+        if whole:
+            self.paths = frozenset()
+        else:
+            # A path that is accessed in full makes any longer path that
+            # starts with it redundant.
+            self.paths = frozenset([
+                path
+                for path in paths
+                if not any([
+                    other != path and path[:len(other)] == other
+                    for other in paths
+                ])
+            ])
+
+    def dotted(self):
+        """
+        Returns the parts of the variable that are used, as dotted names
+        (e.g., ``order.customer.id``).
+
+        :rtype: list of str
+        """
+
+        if self.whole:
+            return [self.name]
+        return sorted([
+            '.'.join((self.name,) + path)
+            for path in self.paths
+        ])
+
+    def __eq__(self, other):
+        return isinstance(other, VariableDependency) \
+            and (self.name, self.paths, self.whole) \
+            == (other.name, other.paths, other.whole)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((self.name, self.paths, self.whole))
+
+    def __repr__(self):
+        return '%s(%r, whole=%r, paths=%r)' % (
+            self.__class__.__name__,
+            self.name,
+            self.whole,
+            sorted(self.paths),
+        )
+
+
+def _unwrap(node):
+    while isinstance(node, Grouping):
+        node = node.expression
+    return node
+
+
+def variable_dependencies(tree):
+    """
+    Determines which variables the AST references, and which parts of their
+    values it uses. An access like ``$order.customer.id`` only needs the
+    ``customer.id`` property of ``$order``; any other use of a variable
+    (including indexing and passing it to a function) needs its whole value.
+
+    :param tree: the parsed AST (or CompiledExpression) to examine
+    :type tree: bexl.nodes.Expression|bexl.CompiledExpression
+    :returns: the dependencies of the AST, keyed by variable name
+    :rtype: dict of VariableDependency
+    """
+
+    if not isinstance(tree, Expression):
+        tree = tree.tree
+
+    paths = {}
+    whole = set()
+    pending = [tree]
+    while pending:
+        node = _unwrap(pending.pop())
+
+        if isinstance(node, Property):
+            path = []
+            while isinstance(node, Property):
+                path.insert(0, node.name)
+                node = _unwrap(node.expression)
+            if isinstance(node, Variable):
+                paths.setdefault(node.name, set()).add(tuple(path))
+                continue
+
+        if isinstance(node, Variable):
+            whole.add(node.name)
+        pending.extend(node.children)
+
+    return dict([
+        (
+            name,
+            VariableDependency(
+                name,
+                paths=paths.get(name, ()),
+                whole=name in whole,
+            ),
+        )
+        for name in set(paths) | whole
+    ])
@@ -0,0 +1,441 @@
+"""
+Evaluation of BEXL expressions whose variables are retrieved, or whose
+functions are implemented, with asyncio. This module requires Python 3.5 or
+later, so it isn't imported by the bexl package itself.
+"""
+
+import asyncio
+import inspect
+
+from .errors import InterpreterError, ResolverError, ExecutionError
+from .interpreter import Interpreter, SHORT_CIRCUITS, wrap_and_raise
+from .lexer import Lexer
+from .nodes import Binary, Expression, Function, Variable
+from .parser import Parser
+from .resolver import LazyVariableResolver, VariableResolver
+from .types import bexl_to_python, make_value, cast, Types
+
+
+def _abandon(task):
+    # Cancels a task whose result is no longer needed, making sure that any
+    # error it raised before being cancelled isn't reported as unhandled.
+    task.cancel()
+    task.add_done_callback(
+        lambda task: task.cancelled() or task.exception()
+    )
+
+
+def unconditional_variables(tree):
+    """
+    Returns the names of the variables that are resolved whenever the AST is
+    evaluated; i.e., those that aren't in the right operand of a & or |.
+
+    :param tree: the parsed AST to examine
+    :type tree: bexl.nodes.Expression
+    :rtype: set of str
+    """
+
+    names = set()
+    pending = [tree]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, Variable):
+            names.add(node.name)
+        elif isinstance(node, Binary) and node.name in SHORT_CIRCUITS:
+            pending.append(node.left)
+        else:
+            pending.extend(node.children)
+    return names
+
+
+class AsyncVariableResolver(LazyVariableResolver):
+    """
+    A LazyVariableResolver whose loaders may return awaitables (e.g., be
+    coroutine functions). Variables are fetched by awaiting resolve() or
+    prefetch(); calling the resolver only returns variables that have
+    already been fetched.
+
+    :param loader:
+        a callable that accepts the name of a variable and returns its native
+        Python value (or an awaitable of it), or a mapping of variable names
+        to callables that accept no arguments and do the same
+    :type loader: callable|Mapping
+    """
+
+    def __init__(self, loader):
+        super(AsyncVariableResolver, self).__init__(loader)
+        self._fetches = {}
+
+    def __call__(self, name):
+        if name in self:
+            self.hits[name] = self.hits.get(name, 0) + 1
+            return self[name]
+        raise ResolverError(
+            'Variable "%s" has not been fetched' % (
+                name,
+            ),
+        )
+
+    def clear(self):
+        super(AsyncVariableResolver, self).clear()
+        self._fetches = {}
+
+    async def resolve(self, name):
+        """
+        Retrieves the BEXL Value for the given variable name, fetching it if
+        it hasn't been already.
+
+        :param name: the name of the variable to resolve
+        :type name: str
+        :rtype: bexl.types.Value
+        """
+
+        if name in self:
+            self.hits[name] = self.hits.get(name, 0) + 1
+            return self[name]
+
+        fetch = self._fetches.get(name)
+        if fetch is None:
+            fetch = self._fetches[name] = asyncio.ensure_future(
+                self._fetch(name),
+            )
+        # The fetch may be shared with other parts of the expression, so it
+        # isn't cancelled along with the part that is waiting for it here.
+        return await asyncio.shield(fetch)
+
+    async def _fetch(self, name):
+        value = self._load(name)
+        if inspect.isawaitable(value):
+            try:
+                value = await value
+            except KeyError:
+                raise ResolverError(
+                    'Could not resolve variable "%s"' % (
+                        name,
+                    ),
+                )
+        self[name] = value
+        return self[name]
+
+    async def prefetch(self, names):
+        """
+        Fetches the given variables concurrently. Errors are not raised here,
+        but when the variables are resolved.
+
+        :param names: the names of the variables to fetch
+        :type names: iterable of str
+        """
+
+        await asyncio.gather(
+            *[
+                self.resolve(name)
+                for name in names
+                if name not in self
+            ],
+            return_exceptions=True
+        )
+
+
+class AsyncInterpreter(Interpreter):
+    """
+    An Interpreter for expressions whose variables come from an
+    AsyncVariableResolver, or that invoke functions implemented as
+    coroutines. Before evaluating an expression, the variables it will
+    certainly need are fetched concurrently. Variables in the right operand
+    of a & or | are only fetched (again, concurrently) if that operand is
+    evaluated.
+
+    The operands and arguments of an operator or function that contain calls
+    to asynchronous functions are evaluated concurrently. If more than one
+    of them fails, the error of the first is raised, as it would be by the
+    Interpreter.
+
+    :param timeout:
+        the number of seconds after which a call to an asynchronous function
+        is abandoned (raising an ExecutionError), unless the function was
+        registered with its own ``timeout``. If not specified, calls are
+        never abandoned.
+    :type timeout: float
+    :param speculative:
+        whether the right operand of a & or | is evaluated concurrently with
+        the left operand (rather than after it), to be cancelled if the left
+        operand decides the result. If not specified, operands are evaluated
+        in order.
+    :type speculative: bool
+    :param registry:
+        the registry of the operators and functions to use. If not
+        specified, bexl.dispatcher.DEFAULT_REGISTRY is used.
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, timeout=None, speculative=False, registry=None):
+        super(AsyncInterpreter, self).__init__(registry=registry)
+        self.timeout = timeout
+        self.speculative = speculative
+        self._awaiting = {}
+
+    def _awaits(self, node):
+        # Whether evaluating the node involves calling asynchronous
+        # functions.
+        key = id(node)
+        if key not in self._awaiting:
+            self._awaiting[key] = (
+                isinstance(node, Function)
+                and self.registry.functions.metadata(node.name).get(
+                    'asynchronous',
+                    False,
+                )
+            ) or any([self._awaits(child) for child in node.children])
+        return self._awaiting[key]
+
+    async def _evaluate_all(self, nodes, resolver):
+        if len([node for node in nodes if self._awaits(node)]) < 2:
+            return [
+                await node.accept(self, resolver=resolver)
+                for node in nodes
+            ]
+
+        values = await asyncio.gather(
+            *[node.accept(self, resolver=resolver) for node in nodes],
+            return_exceptions=True
+        )
+        for value in values:
+            if isinstance(value, BaseException):
+                raise value
+        return values
+
+    async def interpret(self, tree, variable_resolver=None):
+        """
+        Interprets the AST and produces the resulting value
+
+        :param tree: the parsed AST to interpret
+        :type tree: bexl.nodes.Expression
+        :param variable_resolver:
+            the mechanism used to retrieve the Value for variables referenced
+            in the expression
+        :type variable_resolver:
+            AsyncVariableResolver|bexl.VariableResolver|dict
+        :rtype: bexl.Value
+        """
+
+        resolver = VariableResolver.make_from(variable_resolver)
+        # The nodes are cached by id(), which may be reused once the trees
+        # the interpreter evaluated before are freed.
+        self._awaiting = {}
+        return await self._branch(tree, resolver)
+
+    async def _branch(self, node, resolver):
+        if isinstance(resolver, AsyncVariableResolver):
+            await resolver.prefetch(unconditional_variables(node))
+        return await node.accept(self, resolver=resolver)
+
+    async def visit_literal(self, node, resolver):  # noqa: unused-argument
+        return make_value(node.data_type, node.value)
+
+    async def visit_grouping(self, node, resolver):
+        return await node.expression.accept(self, resolver=resolver)
+
+    async def visit_list(self, node, resolver):
+        elements = await self._evaluate_all(node.elements, resolver)
+        return make_value(Types.LIST, elements)
+
+    async def visit_variable(self, node, resolver):
+        try:
+            if isinstance(resolver, AsyncVariableResolver):
+                return await resolver.resolve(node.name)
+            return resolver(node.name)
+        except InterpreterError:
+            wrap_and_raise(node)
+
+    async def visit_property(self, node, resolver):
+        expression = await node.expression.accept(self, resolver=resolver)
+        prop = make_value(Types.STRING, node.name)
+        try:
+            return self.registry.functions.call('property', expression, prop)
+        except InterpreterError:
+            wrap_and_raise(node)
+
+    async def visit_indexing(self, node, resolver):
+        if node.index is not None:
+            expression, index = await self._evaluate_all(
+                [node.expression, node.index],
+                resolver,
+            )
+            try:
+                return self.registry.functions.call('at', expression, index)
+            except InterpreterError:
+                wrap_and_raise(node)
+
+        else:
+            expression = await node.expression.accept(self, resolver=resolver)
+            start = end = None
+            if node.start:
+                start = await node.start.accept(self, resolver=resolver)
+            else:
+                start = make_value(Types.INTEGER, 0)
+            if node.end:
+                end = await node.end.accept(self, resolver=resolver)
+
+            try:
+                if end:
+                    return self.registry.functions.call(
+                        'slice',
+                        expression,
+                        start,
+                        end,
+                    )
+                return self.registry.functions.call(
+                    'slice',
+                    expression,
+                    start,
+                )
+            except InterpreterError:
+                wrap_and_raise(node)
+
+    async def visit_unary(self, node, resolver):
+        right = await node.right.accept(self, resolver=resolver)
+
+        try:
+            return self.registry.unary_operators.call(node.name, right)
+        except InterpreterError:
+            wrap_and_raise(node)
+
+    async def visit_binary(self, node, resolver):
+        if node.name in SHORT_CIRCUITS:
+            return await self._short_circuit(node, resolver)
+
+        left, right = await self._evaluate_all(
+            [node.left, node.right],
+            resolver,
+        )
+
+        try:
+            return self.registry.binary_operators.call(
+                node.name,
+                left,
+                right,
+            )
+        except InterpreterError:
+            wrap_and_raise(node)
+
+    async def _short_circuit(self, node, resolver):
+        right = None
+        if self.speculative and self._awaits(node.right):
+            right = asyncio.ensure_future(self._branch(node.right, resolver))
+
+        try:
+            left = await node.left.accept(self, resolver=resolver)
+            decider = SHORT_CIRCUITS[node.name]
+            try:
+                decided = cast(left, Types.BOOLEAN).raw_value is decider
+            except InterpreterError:
+                wrap_and_raise(node)
+        except BaseException:
+            if right is not None:
+                _abandon(right)
+            raise
+
+        if decided:
+            if right is not None:
+                _abandon(right)
+            return make_value(Types.BOOLEAN, decider)
+
+        if right is None:
+            right = await self._branch(node.right, resolver)
+        else:
+            right = await right
+
+        try:
+            return self.registry.binary_operators.call(
+                node.name,
+                left,
+                right,
+            )
+        except InterpreterError:
+            wrap_and_raise(node)
+
+    async def visit_function(self, node, resolver):
+        arguments = await self._evaluate_all(node.arguments, resolver)
+        functions = self.registry.functions
+
+        metadata = functions.metadata(node.name)
+        if not metadata.get('asynchronous', False):
+            try:
+                return functions.call(node.name, *arguments)
+            except InterpreterError:
+                wrap_and_raise(node)
+
+        try:
+            func = functions.resolve(node.name, *arguments)
+        except InterpreterError:
+            wrap_and_raise(node)
+
+        timeout = metadata.get('timeout', self.timeout)
+        try:
+            try:
+                return await asyncio.wait_for(func(*arguments), timeout)
+            except asyncio.TimeoutError:
+                raise ExecutionError(
+                    '"%s" did not complete within %s seconds' % (
+                        node.name,
+                        timeout,
+                    )
+                )
+        except InterpreterError:
+            wrap_and_raise(node)
+
+
+async def evaluate_async(
+        expression,
+        variable_resolver=None,
+        native=True,
+        interpreter=None,
+        lexer=Lexer,
+        parser=Parser):
+    """
+    Evaluates the given BEXL expression and returns its result.
+
+    :param expression:
+        the BEXL expression to evaluate, or its parsed AST or
+        CompiledExpression
+    :type expression: str|bexl.nodes.Expression|bexl.CompiledExpression
+    :param variable_resolver:
+        the mechanism used to retrieve the Value for variables referenced
+        in the expression
+    :type variable_resolver: AsyncVariableResolver|bexl.VariableResolver|dict
+    :param native:
+        whether or not this function should return the raw bexl.Value returned
+        by the BEXL interpreter, or the native Python value. If not specified,
+        the native Python value is returned.
+    :type native: bool
+    :param interpreter:
+        the interpreter to evaluate the expression with, which carries the
+        registry, timeout and speculation settings. If not specified, an
+        AsyncInterpreter with the default settings is used.
+    :type interpreter: AsyncInterpreter
+    :param lexer:
+        the Lexer to use when parsing the expression. If not specified,
+        defaults to bexl.Lexer.
+    :type lexer: bexl.Lexer
+    :param parser:
+        the Parser to use when parsing the expression. If not specified,
+        defaults to bexl.Parser.
+    :type parser: bexl.Parser
+    """
+
+    if isinstance(expression, Expression):
+        tree = expression
+    elif hasattr(expression, 'tree'):
+        tree = expression.tree
+    else:
+        tree = parser(lexer=lexer).parse(expression)
+
+    interpreter = interpreter or AsyncInterpreter()
+    result = await interpreter.interpret(
+        tree,
+        variable_resolver=variable_resolver,
+    )
+
+    if native:
+        return bexl_to_python(result)
+    return result
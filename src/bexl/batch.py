@@ -0,0 +1,346 @@
+from collections import OrderedDict
+
+from six import iteritems
+
+from .errors import InterpreterError, ExecutionError
+from .interpreter import Interpreter, SHORT_CIRCUITS, wrap_and_raise
+from .lexer import Lexer
+from .nodes import Expression
+from .parser import Parser
+from .resolver import VariableResolver
+from .types import bexl_to_python, make_value, python_to_bexl, Types
+
+
+def argument_key(value):
+    """
+    Returns a hashable representation of a Value, such that two Values have
+    the same key only if they are of the same type and are equal.
+
+    :param value: the Value
+    :type value: bexl.Value
+    :rtype: tuple
+    """
+
+    raw = value.raw_value
+    if value.data_type == Types.LIST and raw is not None:
+        raw = tuple([argument_key(element) for element in raw])
+    elif value.data_type == Types.RECORD and raw is not None:
+        raw = tuple(sorted([
+            (key, argument_key(element))
+            for key, element in iteritems(raw)
+        ]))
+    return (value.data_type, raw)
+
+
+class _Pending(Exception):
+    """
+    Raised while evaluating an expression that needs the result of a batched
+    function call that hasn't been made yet.
+    """
+
+
+class BatchInterpreter(Interpreter):
+    """
+    An Interpreter that evaluates many expressions (e.g., one expression for
+    many rows of variables, or many rules for one set of variables) together,
+    so that the calls they make to functions registered with ``batch=True``
+    can be combined.
+
+    Evaluation happens in rounds. In each round, every expression that isn't
+    finished is evaluated until it needs the result of a batched call that
+    hasn't been made; the calls needed by all the expressions are then made
+    with one invocation per function, with identical argument tuples only
+    passed once. Batched functions must therefore be pure within a single
+    interpret_many(); their results aren't kept for the next one. The values
+    of the nodes that were finished in a round are kept for the next ones,
+    so that only the subtrees that were waiting on a call are evaluated
+    again, and the other functions are invoked once per node, as by the
+    Interpreter.
+
+    :param registry:
+        the registry of the operators and functions to use. If not
+        specified, bexl.dispatcher.DEFAULT_REGISTRY is used.
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, registry=None):
+        super(BatchInterpreter, self).__init__(registry=registry)
+        self.rounds = 0
+        self.batches = 0
+        self._results = {}
+        self._calls = OrderedDict()
+        self._memo = None
+
+    def interpret(self, tree, variable_resolver=None):
+        return self.interpret_many([(tree, variable_resolver)])[0]
+
+    def interpret_many(self, jobs):
+        """
+        Interprets the ASTs and produces their resulting values, in the same
+        order as the ASTs were given.
+
+        :param jobs:
+            the ASTs to interpret, along with the mechanism used to retrieve
+            the Value for variables referenced in each
+        :type jobs: list of (bexl.nodes.Expression, bexl.VariableResolver|dict)
+        :rtype: list of bexl.Value
+        """
+
+        jobs = [
+            (tree, VariableResolver.make_from(variable_resolver))
+            for tree, variable_resolver in jobs
+        ]
+        results = [None] * len(jobs)
+        # The values of the finished nodes of each job, keyed by their id().
+        memos = [{} for _ in jobs]
+        unfinished = list(range(len(jobs)))
+        self._results = {}
+        self._calls = OrderedDict()
+
+        try:
+            while unfinished:
+                self.rounds += 1
+                waiting = []
+                for position in unfinished:
+                    tree, resolver = jobs[position]
+                    self._memo = memos[position]
+                    try:
+                        results[position] = tree.accept(
+                            self,
+                            resolver=resolver,
+                        )
+                    except _Pending:
+                        waiting.append(position)
+                unfinished = waiting
+                self._dispatch()
+        finally:
+            self._memo = None
+            self._results = {}
+            self._calls = OrderedDict()
+
+        return results
+
+    def _dispatch(self):
+        calls, self._calls = self._calls, OrderedDict()
+        batches = OrderedDict()
+        for key, (func, arguments) in iteritems(calls):
+            batches.setdefault(func, []).append((key, arguments))
+
+        for func, batch in iteritems(batches):
+            self.batches += 1
+            results = func([arguments for _, arguments in batch])
+            if len(results) != len(batch):
+                raise ExecutionError(
+                    'Batched function returned %s results for %s calls' % (
+                        len(results),
+                        len(batch),
+                    )
+                )
+            for (key, _), result in zip(batch, results):
+                self._results[key] = python_to_bexl(result)
+
+    def _memoized(self, visit, node, resolver):
+        memo = self._memo
+        key = id(node)
+        if key in memo:
+            return memo[key]
+        value = visit(node, resolver)
+        memo[key] = value
+        return value
+
+    def _evaluate_all(self, nodes, resolver):
+        # Evaluates every node even if some of them are pending, so that all
+        # their batched calls are collected in the same round.
+        values = []
+        pending = None
+        for node in nodes:
+            try:
+                values.append(node.accept(self, resolver=resolver))
+            except _Pending as exc:
+                pending = exc
+        if pending is not None:
+            raise pending
+        return values
+
+    def _visit_list(self, node, resolver):
+        return make_value(
+            Types.LIST,
+            self._evaluate_all(node.elements, resolver),
+        )
+
+    def _visit_binary(self, node, resolver):
+        if node.name in SHORT_CIRCUITS:
+            return super(BatchInterpreter, self).visit_binary(node, resolver)
+
+        left, right = self._evaluate_all([node.left, node.right], resolver)
+        try:
+            return self.registry.binary_operators.call(
+                node.name,
+                left,
+                right,
+            )
+        except InterpreterError:
+            wrap_and_raise(node)
+
+    def _visit_function(self, node, resolver):
+        arguments = self._evaluate_all(node.arguments, resolver)
+        functions = self.registry.functions
+
+        if not functions.metadata(node.name).get('batch', False):
+            try:
+                return functions.call(node.name, *arguments)
+            except InterpreterError:
+                wrap_and_raise(node)
+
+        try:
+            func = functions.resolve(node.name, *arguments)
+        except InterpreterError:
+            wrap_and_raise(node)
+
+        key = (
+            node.name,
+            tuple([argument_key(argument) for argument in arguments]),
+        )
+        if key in self._results:
+            return self._results[key]
+        self._calls[key] = (func, tuple(arguments))
+        raise _Pending()
+
+    def visit_grouping(self, node, resolver):
+        return self._memoized(
+            super(BatchInterpreter, self).visit_grouping,
+            node,
+            resolver,
+        )
+
+    def visit_list(self, node, resolver):
+        return self._memoized(self._visit_list, node, resolver)
+
+    def visit_variable(self, node, resolver):
+        return self._memoized(
+            super(BatchInterpreter, self).visit_variable,
+            node,
+            resolver,
+        )
+
+    def visit_property(self, node, resolver):
+        return self._memoized(
+            super(BatchInterpreter, self).visit_property,
+            node,
+            resolver,
+        )
+
+    def visit_indexing(self, node, resolver):
+        return self._memoized(
+            super(BatchInterpreter, self).visit_indexing,
+            node,
+            resolver,
+        )
+
+    def visit_unary(self, node, resolver):
+        return self._memoized(
+            super(BatchInterpreter, self).visit_unary,
+            node,
+            resolver,
+        )
+
+    def visit_binary(self, node, resolver):
+        return self._memoized(self._visit_binary, node, resolver)
+
+    def visit_function(self, node, resolver):
+        return self._memoized(self._visit_function, node, resolver)
+
+
+def evaluate_batch(
+        expression,
+        rows,
+        native=True,
+        registry=None,
+        lexer=Lexer,
+        parser=Parser):
+    """
+    Evaluates the given BEXL expression once for each set of variables,
+    combining the calls made to functions registered with ``batch=True``.
+
+    :param expression:
+        the BEXL expression to evaluate, or its parsed AST or
+        CompiledExpression
+    :type expression: str|bexl.nodes.Expression|bexl.CompiledExpression
+    :param rows: the variables to evaluate the expression with
+    :type rows: list of (bexl.VariableResolver|dict)
+    :param native:
+        whether or not the results should be the raw bexl.Values returned
+        by the BEXL interpreter, or native Python values. If not specified,
+        native Python values are returned.
+    :type native: bool
+    :param registry:
+        the registry of the operators and functions to use. If not
+        specified, bexl.dispatcher.DEFAULT_REGISTRY is used.
+    :type registry: bexl.dispatcher.FunctionRegistry
+    :param lexer: the Lexer to use when parsing the expression
+    :type lexer: bexl.Lexer
+    :param parser: the Parser to use when parsing the expression
+    :type parser: bexl.Parser
+    :returns: the results, in the same order as the rows
+    :rtype: list
+    """
+
+    if isinstance(expression, Expression):
+        tree = expression
+    elif hasattr(expression, 'tree'):
+        tree = expression.tree
+    else:
+        tree = parser(lexer=lexer).parse(expression)
+
+    results = BatchInterpreter(registry=registry).interpret_many([
+        (tree, row)
+        for row in rows
+    ])
+    if native:
+        return [bexl_to_python(result) for result in results]
+    return results
+
+
+class MemoryStore(object):
+    """
+    An in-memory key/value store with a batched lookup function, to stand in
+    for an external store when testing expressions that use one.
+
+    :param data: the contents of the store
+    :type data: dict
+    """
+
+    def __init__(self, data=None):
+        self.data = dict(data or {})
+        self.round_trips = 0
+        self.keys_requested = 0
+
+    def get_many(self, keys):
+        """
+        Returns the values stored under the given keys (None for those that
+        aren't stored), as a single round trip.
+
+        :param keys: the keys to look up
+        :type keys: list
+        :rtype: list
+        """
+
+        self.round_trips += 1
+        self.keys_requested += len(keys)
+        return [self.data.get(key) for key in keys]
+
+    def lookup(self, calls):
+        """
+        A batched BEXL function that looks up the value stored under its
+        argument, for registering with ``FUNCTIONS.register(name,
+        batch=True)``.
+
+        :param calls: the argument tuples of the calls
+        :type calls: list of tuple
+        :rtype: list
+        """
+
+        return self.get_many([
+            bexl_to_python(arguments[0])
+            for arguments in calls
+        ])
@@ -0,0 +1,218 @@
+import hashlib
+import json
+
+from six import text_type
+
+from .analysis import is_pure
+from .interpreter import SHORT_CIRCUITS
+from .nodes import Binary, Unary, Literal, Function, Variable, Grouping, \
+    List, Indexing, Property
+from .token import TokenType
+from .types import Types
+
+
+# Operators whose result doesn't depend on the order of their operands. The
+# operands of those that short-circuit (see
+# bexl.interpreter.SHORT_CIRCUITS) are not reordered, though, since their
+# order decides which of them get evaluated.
+COMMUTATIVE = (
+    TokenType.PLUS,
+    TokenType.STAR,
+    TokenType.AMPERSAND,
+    TokenType.PIPE,
+    TokenType.CARET,
+)
+
+# Operators that are associative, so that a chain of them can be flattened
+# (and, if they are also commutative, reordered) as a whole. (+ and * are
+# left out because floating point arithmetic isn't associative.)
+ASSOCIATIVE = (
+    TokenType.AMPERSAND,
+    TokenType.PIPE,
+    TokenType.CARET,
+)
+
+
+def _format_literal(data_type, value):
+    if data_type == Types.UNTYPED:
+        return 'null'
+    if data_type == Types.FLOAT:
+        return repr(float(value))
+    if data_type == Types.STRING:
+        return json.dumps(text_type(value))
+    return json.dumps(value)
+
+
+class Canonicalizer(object):
+    """
+    Produces the canonical form of an AST, so that expressions which differ
+    only in whitespace, redundant parentheses, literal spelling or the order
+    of the operands of commutative operators end up with the same tree.
+
+    The visit methods return a ``(node, form)`` pair, where ``form`` is a
+    textual representation of the canonical node that is used both to order
+    operands and to fingerprint the tree.
+    """
+
+    def canonicalize(self, tree):
+        """
+        Returns the canonical form of the AST
+
+        :param tree: the parsed AST to canonicalize
+        :type tree: bexl.nodes.Expression
+        :rtype: bexl.nodes.Expression
+        """
+
+        return tree.accept(self)[0]
+
+    def form(self, tree):
+        """
+        Returns the textual representation of the canonical form of the AST
+
+        :param tree: the parsed AST to canonicalize
+        :type tree: bexl.nodes.Expression
+        :rtype: str
+        """
+
+        return tree.accept(self)[1]
+
+    def visit_literal(self, node):  # noqa: no-self-use
+        value = None if node.data_type == Types.UNTYPED else node.value
+        canonical = Literal(node.start_token, node.data_type, value=value)
+        return canonical, '(literal %s %s)' % (
+            node.data_type,
+            _format_literal(node.data_type, value),
+        )
+
+    def visit_grouping(self, node):
+        return node.expression.accept(self)
+
+    def visit_variable(self, node):  # noqa: no-self-use
+        return Variable(node.start_token), '(variable %s)' % (node.name,)
+
+    def visit_list(self, node):
+        elements = [element.accept(self) for element in node.elements]
+        return (
+            List(
+                node.start_token,
+                node.end_token,
+                [element for element, _ in elements],
+            ),
+            '(list %s)' % (' '.join([form for _, form in elements]),),
+        )
+
+    def visit_property(self, node):
+        expression, form = node.expression.accept(self)
+        return (
+            Property(node.start_token, node.end_token, expression),
+            '(property %s %s)' % (node.name, form),
+        )
+
+    def visit_indexing(self, node):
+        parts = dict([
+            (name, getattr(node, name).accept(self))
+            for name in ('expression', 'index', 'start', 'end')
+            if getattr(node, name) is not None
+        ])
+        canonical = Indexing(
+            node.start_token,
+            node.end_token,
+            parts['expression'][0],
+            **dict([
+                (name, part[0])
+                for name, part in parts.items()
+                if name != 'expression'
+            ])
+        )
+        return canonical, '(indexing %s)' % (' '.join([
+            '%s=%s' % (name, parts[name][1])
+            for name in ('expression', 'index', 'start', 'end')
+            if name in parts
+        ]),)
+
+    def visit_unary(self, node):
+        right, form = node.right.accept(self)
+        return (
+            Unary(node.operator, right),
+            '(%s %s)' % (node.name, form),
+        )
+
+    def visit_function(self, node):
+        arguments = [argument.accept(self) for argument in node.arguments]
+        return (
+            Function(
+                node.start_token,
+                node.end_token,
+                [argument for argument, _ in arguments],
+            ),
+            '(function %s %s)' % (
+                node.name,
+                ' '.join([form for _, form in arguments]),
+            ),
+        )
+
+    def visit_binary(self, node):
+        if node.name in ASSOCIATIVE:
+            operands = self._flatten(node, node.name)
+        else:
+            operands = [node.left, node.right]
+
+        if node.name in COMMUTATIVE \
+                and node.name not in SHORT_CIRCUITS \
+                and all([is_pure(operand) for operand in operands]):
+            operands = sorted(
+                [operand.accept(self) for operand in operands],
+                key=lambda operand: operand[1],
+            )
+        else:
+            operands = [operand.accept(self) for operand in operands]
+
+        return self._binary(node, operands)
+
+    def _flatten(self, node, name):
+        node = self._unwrap(node)
+        if isinstance(node, Binary) and node.name == name:
+            return self._flatten(node.left, name) \
+                + self._flatten(node.right, name)
+        return [node]
+
+    def _unwrap(self, node):  # noqa: no-self-use
+        while isinstance(node, Grouping):
+            node = node.expression
+        return node
+
+    def _binary(self, node, operands):  # noqa: no-self-use
+        canonical, form = operands[0]
+        for operand, operand_form in operands[1:]:
+            canonical = Binary(canonical, node.operator, operand)
+            form = '(%s %s %s)' % (node.name, form, operand_form)
+        return canonical, form
+
+
+def canonicalize(tree):
+    """
+    Returns the canonical form of the AST: Grouping nodes are removed, chains
+    of associative operators (&, |, ^) are flattened, the operands of
+    commutative operators that don't short-circuit (+, *, ^) are put in a
+    stable order when they are pure, and literal values are normalized.
+
+    :param tree: the parsed AST to canonicalize
+    :type tree: bexl.nodes.Expression
+    :rtype: bexl.nodes.Expression
+    """
+
+    return Canonicalizer().canonicalize(tree)
+
+
+def fingerprint(tree):
+    """
+    Returns a stable fingerprint of the canonical form of the AST. Expressions
+    that have the same canonical form have the same fingerprint.
+
+    :param tree: the parsed AST to fingerprint
+    :type tree: bexl.nodes.Expression
+    :rtype: str
+    """
+
+    form = Canonicalizer().form(tree)
+    return hashlib.sha256(form.encode('utf-8')).hexdigest()
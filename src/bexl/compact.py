@@ -0,0 +1,383 @@
+import sys
+
+from array import array
+
+from .nodes import Binary, Unary, Literal, Function, Variable, Grouping, \
+    List, Indexing, Property
+from .token import Token
+
+
+NODE_KINDS = (
+    Literal,
+    Unary,
+    Binary,
+    Function,
+    Variable,
+    Grouping,
+    List,
+    Indexing,
+    Property,
+)
+
+_KIND_CODES = dict([
+    (kind, code)
+    for code, kind in enumerate(NODE_KINDS)
+])
+
+# Flags stored for Indexing nodes describing which of the optional children
+# are present.
+INDEX = 1
+START = 2
+END = 4
+
+NONE = -1
+
+
+def _index_array(initial=()):
+    return array('i', initial)
+
+
+class CompactAST(object):
+    """
+    A compact, struct-of-arrays encoding of one or more parsed ASTs.
+
+    Nodes are stored in post-order in a set of parallel arrays, so that the
+    children of a node always precede it. Strings (names, lexemes, data types)
+    and literal values are interned in shared pools, and the Tokens that the
+    nodes reference are kept in a side table of source spans.
+    """
+
+    ARRAYS = (
+        'token_types',
+        'lexemes',
+        'literals',
+        'lines',
+        'columns',
+        'lengths',
+        'kinds',
+        'data',
+        'aux',
+        'start_tokens',
+        'end_tokens',
+        'child_offsets',
+        'children',
+        'roots',
+    )
+
+    def __init__(self):
+        # Pools
+        self.strings = []
+        self.values = []
+        self._string_index = {}
+        self._value_index = {}
+
+        # Token (source span) table
+        self.token_types = _index_array()
+        self.lexemes = _index_array()
+        self.literals = _index_array()
+        self.lines = _index_array()
+        self.columns = _index_array()
+        self.lengths = _index_array()
+
+        # Node table
+        self.kinds = array('B')
+        self.data = _index_array()
+        self.aux = _index_array()
+        self.start_tokens = _index_array()
+        self.end_tokens = _index_array()
+        self.child_offsets = _index_array([0])
+        self.children = _index_array()
+
+        self.roots = _index_array()
+
+    @classmethod
+    def from_trees(cls, trees):
+        """
+        Creates a CompactAST containing all of the given trees.
+
+        :param trees: the parsed ASTs to encode
+        :type trees: list of bexl.nodes.Expression
+        :rtype: CompactAST
+        """
+
+        compact = cls()
+        for tree in trees:
+            compact.add(tree)
+        return compact
+
+    @classmethod
+    def from_pools(cls, strings, values, arrays):
+        """
+        Creates a CompactAST from previously-encoded pools and arrays.
+
+        :param strings: the interned string pool
+        :type strings: list of str
+        :param values: the interned literal value pool
+        :type values: list
+        :param arrays: the node and token tables, keyed by their names in
+            CompactAST.ARRAYS
+        :type arrays: dict of array.array
+        :rtype: CompactAST
+        """
+
+        compact = cls()
+        compact.strings = list(strings)
+        compact.values = list(values)
+        compact._string_index = dict([
+            (string, position)
+            for position, string in enumerate(compact.strings)
+        ])
+        compact._value_index = dict([
+            ((type(value), value), position)
+            for position, value in enumerate(compact.values)
+        ])
+        for name in cls.ARRAYS:
+            setattr(compact, name, arrays[name])
+        return compact
+
+    def __len__(self):
+        return len(self.roots)
+
+    @property
+    def node_count(self):
+        return len(self.kinds)
+
+    @property
+    def nbytes(self):
+        """
+        The approximate number of bytes used by this encoding.
+        """
+
+        total = sum([
+            sys.getsizeof(getattr(self, name))
+            for name in self.ARRAYS
+        ])
+        total += sys.getsizeof(self.strings) + sum([
+            sys.getsizeof(string)
+            for string in self.strings
+        ])
+        total += sys.getsizeof(self.values) + sum([
+            sys.getsizeof(value)
+            for value in self.values
+        ])
+        return total
+
+    def add(self, tree):
+        """
+        Encodes the given AST and returns its position in this CompactAST.
+
+        :param tree: the parsed AST to encode
+        :type tree: bexl.nodes.Expression
+        :rtype: int
+        """
+
+        tokens = {}
+        root = self._add_node(tree, tokens)
+        self.roots.append(root)
+        return len(self.roots) - 1
+
+    def tree(self, position):
+        """
+        Decodes the AST at the given position back into bexl.nodes objects.
+
+        :param position: the position returned by add()
+        :type position: int
+        :rtype: bexl.nodes.Expression
+        """
+
+        return self._make_node(self.roots[position], {})
+
+    def trees(self):
+        """
+        Decodes all the ASTs contained in this CompactAST.
+
+        :rtype: list of bexl.nodes.Expression
+        """
+
+        return [
+            self.tree(position)
+            for position in range(len(self.roots))
+        ]
+
+    def _intern_string(self, string):
+        if string is None:
+            return NONE
+        position = self._string_index.get(string)
+        if position is None:
+            position = self._string_index[string] = len(self.strings)
+            self.strings.append(string)
+        return position
+
+    def _intern_value(self, value):
+        if value is None:
+            return NONE
+        key = (type(value), value)
+        position = self._value_index.get(key)
+        if position is None:
+            position = self._value_index[key] = len(self.values)
+            self.values.append(value)
+        return position
+
+    def _add_token(self, token, tokens):
+        # Tokens are only shared between the nodes of a single tree, which
+        # keeps their identity intact when the tree is decoded.
+        position = tokens.get(id(token))
+        if position is None:
+            position = tokens[id(token)] = len(self.token_types)
+            self.token_types.append(self._intern_string(token.token_type))
+            self.lexemes.append(self._intern_string(token.lexeme))
+            self.literals.append(self._intern_value(token.literal))
+            self.lines.append(token.line)
+            self.columns.append(token.column)
+            self.lengths.append(token.length)
+        return position
+
+    def _add_node(self, node, tokens):  # noqa: @mccabe
+        data = aux = NONE
+
+        if isinstance(node, Literal):
+            children = ()
+            data = self._intern_value(node.value)
+            aux = self._intern_string(node.data_type)
+        elif isinstance(node, (Unary, Binary)):
+            if isinstance(node, Unary):
+                children = (node.right,)
+            else:
+                children = (node.left, node.right)
+            aux = self._add_token(node.operator, tokens)
+        elif isinstance(node, Function):
+            children = node.arguments
+        elif isinstance(node, List):
+            children = node.elements
+        elif isinstance(node, Indexing):
+            children = [node.expression]
+            aux = 0
+            for flag, child in ((INDEX, node.index),
+                                (START, node.start),
+                                (END, node.end)):
+                if child is not None:
+                    aux |= flag
+                    children.append(child)
+        elif isinstance(node, (Grouping, Property)):
+            children = (node.expression,)
+        else:
+            children = ()
+
+        positions = [
+            self._add_node(child, tokens)
+            for child in children
+        ]
+
+        self.kinds.append(_KIND_CODES[type(node)])
+        self.data.append(data)
+        self.aux.append(aux)
+        self.start_tokens.append(self._add_token(node.start_token, tokens))
+        self.end_tokens.append(self._add_token(node.end_token, tokens))
+        self.children.extend(positions)
+        self.child_offsets.append(len(self.children))
+
+        return len(self.kinds) - 1
+
+    def _string(self, position):
+        if position == NONE:
+            return None
+        return self.strings[position]
+
+    def _value(self, position):
+        if position == NONE:
+            return None
+        return self.values[position]
+
+    def _make_token(self, position, tokens):
+        token = tokens.get(position)
+        if token is None:
+            token = tokens[position] = Token(
+                self._string(self.token_types[position]),
+                self._string(self.lexemes[position]),
+                self._value(self.literals[position]),
+                self.lines[position],
+                self.columns[position],
+                self.lengths[position],
+            )
+        return token
+
+    def _make_node(self, position, tokens):  # noqa: @mccabe
+        kind = NODE_KINDS[self.kinds[position]]
+        children = [
+            self._make_node(child, tokens)
+            for child in self.children[
+                self.child_offsets[position]:self.child_offsets[position + 1]
+            ]
+        ]
+        start = self._make_token(self.start_tokens[position], tokens)
+        end = self._make_token(self.end_tokens[position], tokens)
+        aux = self.aux[position]
+
+        if kind is Literal:
+            node = Literal(
+                start,
+                self._string(aux),
+                value=self._value(self.data[position]),
+            )
+        elif kind is Unary:
+            node = Unary(self._make_token(aux, tokens), children[0])
+        elif kind is Binary:
+            node = Binary(
+                children[0],
+                self._make_token(aux, tokens),
+                children[1],
+            )
+        elif kind is Variable:
+            node = Variable(start)
+        elif kind is Indexing:
+            optional = iter(children[1:])
+            node = Indexing(
+                start,
+                end,
+                children[0],
+                index=next(optional) if aux & INDEX else None,
+                start=next(optional) if aux & START else None,
+                end=next(optional) if aux & END else None,
+            )
+        elif kind in (Function, List):
+            node = kind(start, end, children)
+        else:
+            node = kind(start, end, children[0])
+
+        node.start_token = start
+        node.end_token = end
+        return node
+
+
+def _deep_sizeof(obj, seen):
+    if obj is None or id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple)):
+        return size + sum([_deep_sizeof(item, seen) for item in obj])
+
+    for cls in type(obj).__mro__:
+        for slot in getattr(cls, '__slots__', ()):
+            size += _deep_sizeof(getattr(obj, slot, None), seen)
+    if hasattr(obj, '__dict__'):
+        size += _deep_sizeof(obj.__dict__, seen)
+        size += sum([
+            _deep_sizeof(value, seen)
+            for value in obj.__dict__.values()
+        ])
+    return size
+
+
+def tree_nbytes(tree):
+    """
+    Returns the approximate number of bytes used by the given AST, including
+    the Tokens and values it references.
+
+    :param tree: the parsed AST to measure
+    :type tree: bexl.nodes.Expression
+    :rtype: int
+    """
+
+    return _deep_sizeof(tree, set())
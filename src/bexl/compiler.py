@@ -0,0 +1,376 @@
+from .dispatcher import DEFAULT_REGISTRY, DispatcherWrapper
+from .errors import InterpreterError
+from .functions.comparison import equal
+from .functions.logical import switch
+from .interpreter import wrap_and_raise, SHORT_CIRCUITS
+from .nodes import Literal, Grouping
+from .resolver import VariableResolver
+from .types import make_value, cast, Types
+
+
+# The data types whose equality is a plain comparison of their raw Python
+# values (and therefore safe to look up in a dict) when both sides of the
+# comparison are of the same type.
+HASHABLE_TYPES = (
+    Types.INTEGER,
+    Types.FLOAT,
+    Types.STRING,
+    Types.BOOLEAN,
+)
+
+
+def unwrap_grouping(node):
+    while isinstance(node, Grouping):
+        node = node.expression
+    return node
+
+
+def _compile_tree(tree, registry=None):
+    return Compiler(registry=registry).compile(tree)
+
+
+class EvaluationContext(object):
+    """
+    Holds the state of a single evaluation of a CompiledExpression.
+
+    :param resolver:
+        the mechanism used to retrieve the Value for variables referenced
+        in the expression
+    :type resolver: bexl.VariableResolver
+    :param budget:
+        the limits the evaluation is subject to, if any (see bexl.limits)
+    :type budget: bexl.limits.ExecutionBudget
+    """
+
+    __slots__ = (
+        'resolver',
+        'memo',
+        'budget',
+    )
+
+    def __init__(self, resolver, budget=None):
+        self.resolver = resolver
+        self.memo = None
+        self.budget = budget
+
+
+class CompiledExpression(object):
+    """
+    An expression that has been compiled into a tree of Python closures so
+    that it can be evaluated repeatedly without re-walking its abstract
+    syntax tree.
+
+    :param tree: the parsed AST the expression was compiled from
+    :type tree: bexl.nodes.Expression
+    :param function: the compiled closure that evaluates the expression
+    :type function: callable
+    :param registry:
+        the registry of the operators and functions the expression was
+        compiled with
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, tree, function, registry=DEFAULT_REGISTRY):
+        self.tree = tree
+        self.registry = registry
+        self._function = function
+
+    def evaluate(self, variable_resolver=None):
+        """
+        Evaluates the expression and returns the resulting value
+
+        :param variable_resolver:
+            the mechanism used to retrieve the Value for variables referenced
+            in the expression
+        :type variable_resolver: bexl.VariableResolver|dict
+        :rtype: bexl.Value
+        """
+
+        resolver = VariableResolver.make_from(variable_resolver)
+        return self._function(EvaluationContext(resolver))
+
+    __call__ = evaluate
+
+    def __reduce__(self):
+        # Closures can't be pickled, so the expression is recompiled from its
+        # tree when it is unpickled. Expressions compiled with a registry
+        # other than the default one can only be pickled if the registry can.
+        if self.registry is DEFAULT_REGISTRY:
+            return _compile_tree, (self.tree,)
+        return _compile_tree, (self.tree, self.registry)
+
+
+class Compiler(object):
+    """
+    A compiler for BEXL. Turns the output of a parser into a
+    CompiledExpression whose evaluation produces the same results as the
+    Interpreter.
+
+    The operators and functions are looked up in the given registry when the
+    compiled expression is evaluated. If the registry is frozen (see
+    FunctionRegistry.freeze()), the expression can be evaluated from many
+    threads at once, and is unaffected by functions registered after it was
+    compiled.
+
+    :param registry:
+        the registry of the operators and functions to use. If not
+        specified, bexl.dispatcher.DEFAULT_REGISTRY is used.
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry or DEFAULT_REGISTRY
+
+    def compile(self, tree):
+        """
+        Compiles the AST into a CompiledExpression
+
+        :param tree: the parsed AST to compile
+        :type tree: bexl.nodes.Expression
+        :rtype: CompiledExpression
+        """
+
+        return CompiledExpression(
+            tree,
+            self.compile_node(tree),
+            self.registry,
+        )
+
+    def compile_node(self, node):
+        """
+        Compiles a node of the AST into a closure that accepts an
+        EvaluationContext and returns the node's value.
+
+        :param node: the node to compile
+        :type node: bexl.nodes.Expression
+        :rtype: callable
+        """
+
+        return node.accept(self)
+
+    def visit_literal(self, node):  # noqa: no-self-use
+        value = make_value(node.data_type, node.value)
+        return lambda context: value
+
+    def visit_grouping(self, node):
+        return self.compile_node(node.expression)
+
+    def visit_list(self, node):
+        elements = [
+            self.compile_node(subnode)
+            for subnode in node.elements
+        ]
+
+        def compiled_list(context):
+            return make_value(Types.LIST, [
+                element(context)
+                for element in elements
+            ])
+        return compiled_list
+
+    def visit_variable(self, node):  # noqa: no-self-use
+        name = node.name
+
+        def variable(context):
+            try:
+                return context.resolver(name)
+            except InterpreterError:
+                wrap_and_raise(node)
+        return variable
+
+    def visit_property(self, node):
+        expression = self.compile_node(node.expression)
+        prop = make_value(Types.STRING, node.name)
+        functions = self.registry.functions
+
+        def compiled_property(context):
+            value = expression(context)
+            try:
+                return functions.call('property', value, prop)
+            except InterpreterError:
+                wrap_and_raise(node)
+        return compiled_property
+
+    def visit_indexing(self, node):
+        expression = self.compile_node(node.expression)
+        functions = self.registry.functions
+
+        if node.index is not None:
+            index = self.compile_node(node.index)
+
+            def indexing(context):
+                value = expression(context)
+                position = index(context)
+                try:
+                    return functions.call('at', value, position)
+                except InterpreterError:
+                    wrap_and_raise(node)
+            return indexing
+
+        zero = make_value(Types.INTEGER, 0)
+        start = self.compile_node(node.start) if node.start else None
+        end = self.compile_node(node.end) if node.end else None
+
+        def slicing(context):
+            value = expression(context)
+            start_value = start(context) if start else zero
+            end_value = end(context) if end else None
+            try:
+                if end_value:
+                    return functions.call(
+                        'slice',
+                        value,
+                        start_value,
+                        end_value,
+                    )
+                return functions.call('slice', value, start_value)
+            except InterpreterError:
+                wrap_and_raise(node)
+        return slicing
+
+    def visit_unary(self, node):
+        right = self.compile_node(node.right)
+        name = node.name
+        operators = self.registry.unary_operators
+
+        def unary(context):
+            value = right(context)
+            try:
+                return operators.call(name, value)
+            except InterpreterError:
+                wrap_and_raise(node)
+        return unary
+
+    def visit_binary(self, node):
+        left = self.compile_node(node.left)
+        right = self.compile_node(node.right)
+        name = node.name
+        operators = self.registry.binary_operators
+
+        if name in SHORT_CIRCUITS:
+            decider = SHORT_CIRCUITS[name]
+            decided = make_value(Types.BOOLEAN, decider)
+
+            def short_circuit(context):
+                left_value = left(context)
+                try:
+                    if cast(left_value, Types.BOOLEAN).raw_value is decider:
+                        return decided
+                except InterpreterError:
+                    wrap_and_raise(node)
+                right_value = right(context)
+                try:
+                    return operators.call(
+                        name,
+                        left_value,
+                        right_value,
+                    )
+                except InterpreterError:
+                    wrap_and_raise(node)
+            return short_circuit
+
+        def binary(context):
+            left_value = left(context)
+            right_value = right(context)
+            try:
+                return operators.call(name, left_value, right_value)
+            except InterpreterError:
+                wrap_and_raise(node)
+        return binary
+
+    def visit_function(self, node):
+        if node.name == 'switch':
+            compiled = self._compile_switch(node)
+            if compiled:
+                return compiled
+
+        arguments = [
+            self.compile_node(subnode)
+            for subnode in node.arguments
+        ]
+        name = node.name
+        functions = self.registry.functions
+
+        def function(context):
+            values = [
+                argument(context)
+                for argument in arguments
+            ]
+            try:
+                return functions.call(name, *values)
+            except InterpreterError:
+                wrap_and_raise(node)
+        return function
+
+    def _compile_switch(self, node):
+        """
+        Compiles a switch() whose case labels are all literals of the same
+        type into a dict-based jump table. Returns None if the call doesn't
+        qualify, in which case it is compiled like any other function.
+
+        The jump table doesn't invoke switch() through the Dispatcher, so
+        it isn't used when the calls made through the Dispatcher are
+        observed: the functions of instrumented compilers are wrapped (see
+        bexl.profiling and bexl.hooks), and when the Dispatcher has metrics
+        at the time of an evaluation, the call is made through it instead.
+        """
+
+        functions = self.registry.functions
+        if isinstance(functions, DispatcherWrapper):
+            return None
+        if getattr(functions.get('switch'), 'func', None) is not switch \
+                or functions.get('equal') is not equal:
+            return None
+
+        args = node.arguments
+        if len(args) < 4 or len(args) % 2 != 0:
+            return None
+
+        cases = [unwrap_grouping(arg) for arg in args[1:-1:2]]
+        if not all([isinstance(case, Literal) for case in cases]):
+            return None
+        case_type = cases[0].data_type
+        if case_type not in HASHABLE_TYPES \
+                or any([case.data_type != case_type for case in cases]):
+            return None
+
+        table = {}
+        for position, case in enumerate(cases):
+            table.setdefault(make_value(case_type, case.value).raw_value,
+                             position)
+        default = len(cases)
+
+        subject = self.compile_node(args[0])
+        labels = [self.compile_node(case) for case in cases]
+        outcomes = [unwrap_grouping(arg) for arg in args[2::2] + [args[-1]]]
+        results = [self.compile_node(outcome) for outcome in outcomes]
+        constants = None
+        if all([isinstance(outcome, Literal) for outcome in outcomes]):
+            constants = [
+                make_value(outcome.data_type, outcome.value)
+                for outcome in outcomes
+            ]
+
+        def jump_table(context):
+            value = subject(context)
+            if constants is not None:
+                values = constants
+            else:
+                values = [result(context) for result in results]
+
+            if value.data_type == case_type and functions.metrics is None:
+                return values[table.get(value.raw_value, default)]
+
+            # Equality across types involves casting the case labels to the
+            # type of the subject, so fall back to the sequential semantics.
+            # So do metered Dispatchers, so that the call is recorded.
+            sequential = [value]
+            for label, result in zip(labels, values):
+                sequential.append(label(context))
+                sequential.append(result)
+            sequential.append(values[-1])
+            try:
+                return functions.call('switch', *sequential)
+            except InterpreterError:
+                wrap_and_raise(node)
+        return jump_table
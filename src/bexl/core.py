@@ -1,4 +1,6 @@
+from .compiler import Compiler
 from .interpreter import Interpreter
+from .limits import LimitedCompiler, LimitedInterpreter
 from .parser import Parser
 from .lexer import Lexer
 from .types import bexl_to_python
@@ -9,7 +11,9 @@ def evaluate(
         variable_resolver=None,
         native=True,
         lexer=Lexer,
-        parser=Parser):
+        parser=Parser,
+        registry=None,
+        limits=None):
     """
     Evaluates the given BEXL expression and returns its result.
 
@@ -32,13 +36,70 @@ def evaluate(
         the Parser to use when parsing the expression. If not specified,
         defaults to bexl.Parser.
     :type parser: bexl.Parser
+    :param registry:
+        the registry of the operators and functions to use. If not
+        specified, bexl.dispatcher.DEFAULT_REGISTRY is used.
+    :type registry: bexl.dispatcher.FunctionRegistry
+    :param limits:
+        the limits the evaluation is subject to. If not specified, it is
+        unlimited.
+    :type limits: bexl.ExecutionLimits
     """
 
     tree = parser(lexer=lexer).parse(source)
 
-    result = Interpreter().interpret(tree, variable_resolver=variable_resolver)
+    if limits:
+        interpreter = LimitedInterpreter(limits, registry=registry)
+    else:
+        interpreter = Interpreter(registry=registry)
+    result = interpreter.interpret(
+        tree,
+        variable_resolver=variable_resolver,
+    )
 
     if native:
         return bexl_to_python(result)
     return result
 
+
+def compile(  # noqa: redefined-builtin
+        source,
+        lexer=Lexer,
+        parser=Parser,
+        compiler=Compiler,
+        registry=None,
+        limits=None):
+    """
+    Compiles the given BEXL expression so that it can be evaluated repeatedly.
+
+    :param source: the BEXL expression to compile
+    :type source: str
+    :param lexer:
+        the Lexer to use when parsing the expression. If not specified,
+        defaults to bexl.Lexer.
+    :type lexer: bexl.Lexer
+    :param parser:
+        the Parser to use when parsing the expression. If not specified,
+        defaults to bexl.Parser.
+    :type parser: bexl.Parser
+    :param compiler:
+        the Compiler to use when compiling the expression. If not specified,
+        defaults to bexl.Compiler.
+    :type compiler: bexl.Compiler
+    :param registry:
+        the registry of the operators and functions the expression is bound
+        to. If not specified, bexl.dispatcher.DEFAULT_REGISTRY is used.
+    :type registry: bexl.dispatcher.FunctionRegistry
+    :param limits:
+        the limits that evaluations of the expression are subject to. If
+        specified, the expression is compiled by a bexl.limits.LimitedCompiler
+        rather than the given compiler.
+    :type limits: bexl.ExecutionLimits
+    :rtype: bexl.CompiledExpression
+    """
+
+    tree = parser(lexer=lexer).parse(source)
+
+    if limits:
+        return LimitedCompiler(limits, registry=registry).compile(tree)
+    return compiler(registry=registry).compile(tree)
@@ -0,0 +1,317 @@
+from six import integer_types, iteritems, string_types
+
+from .dispatcher import FUNCTIONS
+from .lexer import Lexer
+from .nodes import Expression
+from .parser import Parser
+from .token import TokenType
+from .types import Types
+
+
+# The size assumed for the values of variables whose size isn't known.
+DEFAULT_VARIABLE_SIZE = 10
+
+
+def linear_cost(sizes, values=None):  # noqa: unused-argument
+    """
+    The cost of a function whose work is proportional to the sizes of its
+    arguments, for registering with ``FUNCTIONS.register(name,
+    cost=linear_cost)``.
+
+    :param sizes: the estimated sizes of the arguments
+    :type sizes: list of int
+    :param values: the values of the arguments that are literals
+    :type values: list
+    :rtype: int
+    """
+
+    return 1 + sum(sizes)
+
+
+def total_size(sizes, values=None):  # noqa: unused-argument
+    """
+    The size of the result of a function that combines its arguments, for
+    registering with ``FUNCTIONS.register(name, size=total_size)``.
+
+    :param sizes: the estimated sizes of the arguments
+    :type sizes: list of int
+    :param values: the values of the arguments that are literals
+    :type values: list
+    :rtype: int
+    """
+
+    return sum(sizes)
+
+
+def _is_position(value):
+    return isinstance(value, integer_types) \
+        and not isinstance(value, bool) \
+        and value >= 0
+
+
+class CostEstimate(object):
+    """
+    The estimated cost of evaluating a node of an AST.
+
+    :param node: the node
+    :type node: bexl.nodes.Expression
+    :param own_cost:
+        the cost of the node itself, not counting that of its children
+    :type own_cost: float
+    :param size:
+        the estimated size of the node's value, in characters or list
+        elements (1 for other values)
+    :type size: int
+    :param children: the estimates of the node's children
+    :type children: list of CostEstimate
+    :param value:
+        the value of the node, if it is a literal (or a grouping or
+        negation of one)
+    :type value: any
+    """
+
+    __slots__ = (
+        'node',
+        'own_cost',
+        'size',
+        'children',
+        'value',
+        'cost',
+    )
+
+    def __init__(self, node, own_cost, size, children=(), value=None):
+        self.node = node
+        self.own_cost = own_cost
+        self.size = size
+        self.children = list(children)
+        self.value = value
+        self.cost = own_cost + sum([child.cost for child in self.children])
+
+    def walk(self):
+        """
+        Iterates over the estimates of this node and all its descendants,
+        parents before their children.
+
+        :rtype: iterator of CostEstimate
+        """
+
+        pending = [self]
+        while pending:
+            estimate = pending.pop()
+            yield estimate
+            pending.extend(reversed(estimate.children))
+
+    def breakdown(self):
+        """
+        Returns the estimates of this node and all its descendants, the most
+        expensive first.
+
+        :rtype: list of CostEstimate
+        """
+
+        return sorted(
+            self.walk(),
+            key=lambda estimate: estimate.cost,
+            reverse=True,
+        )
+
+    def __repr__(self):
+        return '<%s %s cost=%s size=%s>' % (
+            self.__class__.__name__,
+            self.node.__class__.__name__,
+            self.cost,
+            self.size,
+        )
+
+
+class CostModel(object):
+    """
+    Estimates the cost of evaluating ASTs without evaluating them. Every
+    node costs 1, except for:
+
+    * Groupings, which cost nothing.
+    * Lists, which cost 1 more for each element.
+    * Function calls, which cost what the function was registered with as
+      its ``cost``: either a number, or a callable that accepts the
+      estimated sizes of the arguments and the values of those that are
+      literals (None for the others), and returns a number (see
+      linear_cost()). Functions registered without a cost cost 1.
+
+    The size of the result of a function call is what the function was
+    registered with as its ``size``, which is either a number or a callable
+    that accepts the same arguments as ``cost`` (see total_size()). The
+    size of a slice with literal bounds is the number of elements between
+    them.
+
+    Both operands of & and | are counted, so the estimate is of the worst
+    case.
+
+    :param functions: the Dispatcher the functions are registered with
+    :type functions: bexl.dispatcher.Dispatcher
+    :param variable_sizes:
+        the estimated sizes of the values of variables (in characters or
+        list elements), keyed by name
+    :type variable_sizes: dict
+    :param default_size:
+        the size assumed for the values of variables that aren't in
+        ``variable_sizes``, and for properties and list elements
+    :type default_size: int
+    """
+
+    def __init__(
+            self,
+            functions=FUNCTIONS,
+            variable_sizes=None,
+            default_size=DEFAULT_VARIABLE_SIZE):
+        self.functions = functions
+        self.variable_sizes = dict(variable_sizes or {})
+        self.default_size = default_size
+
+    def estimate(self, tree):
+        """
+        Estimates the cost of evaluating the AST.
+
+        :param tree: the parsed AST (or CompiledExpression) to examine
+        :type tree: bexl.nodes.Expression|bexl.CompiledExpression
+        :rtype: CostEstimate
+        """
+
+        if not isinstance(tree, Expression):
+            tree = tree.tree
+        return tree.accept(self)
+
+    def _children(self, nodes):
+        return [node.accept(self) for node in nodes if node is not None]
+
+    def visit_literal(self, node):  # noqa: no-self-use
+        if node.data_type == Types.STRING and node.value is not None:
+            return CostEstimate(node, 1, len(node.value), value=node.value)
+        return CostEstimate(node, 1, 1, value=node.value)
+
+    def visit_grouping(self, node):
+        inner = node.expression.accept(self)
+        return CostEstimate(node, 0, inner.size, [inner], value=inner.value)
+
+    def visit_list(self, node):
+        elements = self._children(node.elements)
+        return CostEstimate(node, 1 + len(elements), len(elements), elements)
+
+    def visit_variable(self, node):
+        return CostEstimate(
+            node,
+            1,
+            self.variable_sizes.get(node.name, self.default_size),
+        )
+
+    def visit_property(self, node):
+        expression = node.expression.accept(self)
+        return CostEstimate(node, 1, self.default_size, [expression])
+
+    def visit_indexing(self, node):
+        children = self._children([
+            node.expression,
+            node.index,
+            node.start,
+            node.end,
+        ])
+        if node.index is not None:
+            size = self.default_size
+        else:
+            size = children[0].size
+            start = children[1].value if node.start is not None else 0
+            end = children[-1].value if node.end is not None else None
+            if _is_position(start) and _is_position(end):
+                size = min(size, max(end - start, 0))
+        return CostEstimate(node, 1, size, children)
+
+    def visit_unary(self, node):
+        # The operators only produce numbers, dates, times and booleans.
+        operand = node.right.accept(self)
+        value = None
+        if node.name == TokenType.MINUS \
+                and isinstance(operand.value, integer_types + (float,)) \
+                and not isinstance(operand.value, bool):
+            value = -operand.value
+        return CostEstimate(node, 1, 1, [operand], value=value)
+
+    def visit_binary(self, node):  # noqa: no-self-use
+        return CostEstimate(
+            node,
+            1,
+            1,
+            self._children([node.left, node.right]),
+        )
+
+    def visit_function(self, node):
+        arguments = self._children(node.arguments)
+        sizes = [argument.size for argument in arguments]
+        values = [argument.value for argument in arguments]
+        metadata = self.functions.metadata(node.name)
+
+        cost = metadata.get('cost', 1)
+        if callable(cost):
+            cost = cost(sizes, values)
+
+        size = metadata.get('size')
+        if callable(size):
+            size = size(sizes, values)
+        elif size is None:
+            size = max(sizes) if sizes else 1
+
+        return CostEstimate(node, cost, size, arguments)
+
+
+def estimate_cost(
+        expression,
+        model=None,
+        lexer=Lexer,
+        parser=Parser):
+    """
+    Estimates the cost of evaluating the given BEXL expression.
+
+    :param expression:
+        the BEXL expression to examine, or its parsed AST or
+        CompiledExpression
+    :type expression: str|bexl.nodes.Expression|bexl.CompiledExpression
+    :param model:
+        the CostModel to estimate with. If not specified, a CostModel with
+        the default settings is used.
+    :type model: CostModel
+    :param lexer: the Lexer to use when parsing the expression
+    :type lexer: bexl.Lexer
+    :param parser: the Parser to use when parsing the expression
+    :type parser: bexl.Parser
+    :rtype: CostEstimate
+    """
+
+    if isinstance(expression, string_types):
+        expression = parser(lexer=lexer).parse(expression)
+    return (model or CostModel()).estimate(expression)
+
+
+def order_by_cost(rules, model=None, lexer=Lexer, parser=Parser):
+    """
+    Orders rules from the cheapest to the most expensive to evaluate, e.g.
+    to evaluate the cheap ones first when looking for the first rule that
+    matches. Rules of the same cost keep their order.
+
+    :param rules: the rules, as a mapping of names to BEXL expressions (or
+        their parsed ASTs or CompiledExpressions)
+    :type rules: dict
+    :param model:
+        the CostModel to estimate with. If not specified, a CostModel with
+        the default settings is used.
+    :type model: CostModel
+    :param lexer: the Lexer to use when parsing the rules
+    :type lexer: bexl.Lexer
+    :param parser: the Parser to use when parsing the rules
+    :type parser: bexl.Parser
+    :returns: the names of the rules
+    :rtype: list of str
+    """
+
+    costs = [
+        (estimate_cost(rule, model, lexer, parser).cost, position, name)
+        for position, (name, rule) in enumerate(iteritems(rules))
+    ]
+    return [name for _, _, name in sorted(costs)]
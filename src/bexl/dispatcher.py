@@ -1,65 +1,611 @@
 import inspect
 
-from .errors import DispatchError
+from .errors import DispatchError, ExecutionError
+from .types import python_to_bexl
+
+
+# The functions that implement property access, indexing and slicing.
+SYNTAX_FUNCTIONS = (
+    'property',
+    'at',
+    'slice',
+)
+
+
+def is_coroutine_function(func):
+    check = getattr(inspect, 'iscoroutinefunction', None)
+    return bool(check and check(func))
+
+
+def _arity(func):
+    # The minimum and maximum (None if unlimited) number of arguments the
+    # function accepts.
+    if isinstance(func, Delegate):
+        return 0, None
+    if isinstance(func, DelegatingFunction):
+        # Its implementation is first passed the Dispatcher.
+        minimum, maximum = _arity(func.func)
+        return max(minimum - 1, 0), None if maximum is None else maximum - 1
+    argspec = inspect.getargspec(func)
+    maximum = None if argspec.varargs else len(argspec.args)
+    return len(argspec.args) - len(argspec.defaults or []), maximum
+
+
+class Delegate(object):
+    """
+    An implementation of an operator that invokes a function, such as the
+    "add" function for the + operator. When a Dispatcher is frozen, its
+    Delegates are bound to the snapshot of the functions, so that operators
+    and functions always come from the same snapshot.
+
+    :param name: the name of the function to invoke
+    :type name: str
+    :param functions:
+        the Dispatcher the function is registered with. If not specified,
+        bexl.dispatcher.FUNCTIONS is used.
+    :type functions: Dispatcher
+    """
+
+    __slots__ = (
+        'name',
+        'functions',
+    )
+
+    def __init__(self, name, functions=None):
+        self.name = name
+        self.functions = functions
+
+    def __call__(self, *args):
+        return (self.functions or FUNCTIONS).call(self.name, *args)
+
+    def __getstate__(self):
+        return (self.name, self.functions)
+
+    def __setstate__(self, state):
+        self.name, self.functions = state
+
+    def bind(self, functions):
+        """
+        Returns a Delegate that invokes the function registered with the
+        given Dispatcher.
+
+        :param functions: the Dispatcher to invoke the function from
+        :type functions: Dispatcher
+        :rtype: Delegate
+        """
+
+        return Delegate(self.name, functions)
+
+
+class DelegatingFunction(object):
+    """
+    An implementation of a function that invokes other functions, such as
+    switch(), which compares its subject with its cases using "equal". Like
+    a Delegate, it is bound to the Dispatcher it invokes them from: a
+    derived or frozen Dispatcher binds it to itself, so that the functions
+    of a registry only ever invoke the functions of the same registry.
+
+    :param func:
+        the implementation, which is invoked with the Dispatcher followed by
+        the arguments
+    :type func: callable
+    :param names: the names of the functions it invokes
+    :type names: tuple of str
+    :param functions:
+        the Dispatcher the functions are registered with. If not specified,
+        bexl.dispatcher.FUNCTIONS is used.
+    :type functions: Dispatcher
+    """
+
+    __slots__ = (
+        'func',
+        'names',
+        'functions',
+    )
+
+    def __init__(self, func, names, functions=None):
+        self.func = func
+        self.names = names
+        self.functions = functions
+
+    def __call__(self, *args):
+        return self.func(self.functions or FUNCTIONS, *args)
+
+    def __getstate__(self):
+        return (self.func, self.names, self.functions)
+
+    def __setstate__(self, state):
+        self.func, self.names, self.functions = state
+
+    def bind(self, functions):
+        """
+        Returns a DelegatingFunction that invokes the functions registered
+        with the given Dispatcher.
+
+        :param functions: the Dispatcher to invoke the functions from
+        :type functions: Dispatcher
+        :rtype: DelegatingFunction
+        """
+
+        return DelegatingFunction(self.func, self.names, functions)
+
+
+def _rebind(func, functions, kinds=(Delegate, DelegatingFunction)):
+    if functions is None:
+        return func
+    if isinstance(func, dict):
+        return dict([
+            (signature, _rebind(implementation, functions, kinds))
+            for signature, implementation in func.items()
+        ])
+    if isinstance(func, kinds):
+        return func.bind(functions)
+    return func
+
+
+def _bind_to(functions, dispatcher, delegate_to):
+    # Binds the implementations to the Dispatcher they invoke functions
+    # from: the one given, or else (for DelegatingFunctions) the Dispatcher
+    # they're registered with.
+    if delegate_to is not None:
+        return dict([
+            (name, _rebind(func, delegate_to))
+            for name, func in list(functions.items())
+        ])
+    return dict([
+        (name, _rebind(func, dispatcher, (DelegatingFunction,)))
+        for name, func in list(functions.items())
+    ])
 
 
 class Dispatcher(object):
+    frozen = False
+
     def __init__(self):
         self._functions = {}
+        self._metadata = {}
+        self._metrics = None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop('call', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.metrics = state.get('_metrics')
+
+    @property
+    def metrics(self):
+        """
+        The bexl.metrics.DispatchMetrics that the calls made through call()
+        are recorded in, if any. A Dispatcher without metrics doesn't pay
+        for them, since call() is only replaced by one that records them
+        when they are assigned.
+        """
+
+        return self._metrics
 
-    def register(self, name, *signatures):
+    @metrics.setter
+    def metrics(self, metrics):
+        self._metrics = metrics
+        if metrics is None:
+            self.__dict__.pop('call', None)
+        else:
+            self.call = self._metered_call
+
+    def register(self, name, *signatures, **metadata):
         def wrapper(func):
-            if name not in self._functions:
-                self._functions[name] = {}
+            if is_coroutine_function(func):
+                metadata.setdefault('asynchronous', True)
+
+            # Entries are replaced rather than modified, so that a call made
+            # while a function is being registered sees either the old or the
+            # new implementations, never a partial set of them.
+            if metadata:
+                merged = dict(self._metadata.get(name, {}))
+                merged.update(metadata)
+                self._metadata[name] = merged
             if signatures:
+                implementations = self._functions.get(name)
+                if isinstance(implementations, dict):
+                    implementations = dict(implementations)
+                else:
+                    implementations = {}
                 for signature in signatures:
-                    self._functions[name][signature] = func
+                    implementations[signature] = func
+                self._functions[name] = implementations
             else:
                 self._functions[name] = func
             return func
         return wrapper
 
-    def call(self, name, *args):
-        if name not in self._functions:
+    def freeze(self, functions=None):
+        """
+        Returns an immutable snapshot of the implementations currently
+        registered with this Dispatcher. Functions registered afterward do
+        not affect the snapshot.
+
+        :param functions:
+            the Dispatcher that the Delegates and DelegatingFunctions in the
+            snapshot invoke functions from. If not specified, the Delegates
+            are left as they are, and the DelegatingFunctions invoke the
+            functions of the snapshot.
+        :type functions: Dispatcher
+        :rtype: FrozenDispatcher
+        """
+
+        frozen = FrozenDispatcher(self._functions, self._metadata, functions)
+        frozen.metrics = self.metrics
+        return frozen
+
+    def derive(self, names=None, functions=None):
+        """
+        Returns a new Dispatcher that starts out with the implementations
+        registered with this one. Implementations registered with either
+        Dispatcher afterward don't affect the other, but the existing ones
+        are shared rather than copied.
+
+        :param names:
+            the names of the implementations to start out with. If not
+            specified, all of them are included.
+        :type names: iterable of str
+        :param functions:
+            the Dispatcher that the Delegates and DelegatingFunctions of the
+            new Dispatcher invoke functions from. If not specified, the
+            Delegates are left as they are, and the DelegatingFunctions
+            invoke the functions of the new Dispatcher.
+        :type functions: Dispatcher
+        :raises: DispatchError if there is no implementation for one of the
+            names
+        :rtype: Dispatcher
+        """
+
+        if names is None:
+            names = list(self._functions)
+        dispatcher = Dispatcher()
+        selected = {}
+        for name in names:
+            if name not in self._functions:
+                raise DispatchError(
+                    'No implementation exists for "%s"' % (name,)
+                )
+            selected[name] = self._functions[name]
+            if name in self._metadata:
+                dispatcher._metadata[name] = self._metadata[name]
+        dispatcher._functions = _bind_to(selected, dispatcher, functions)
+        return dispatcher
+
+    def delegated_names(self):
+        """
+        Returns the names of the functions invoked by the Delegates and
+        DelegatingFunctions registered with this Dispatcher.
+
+        :rtype: set of str
+        """
+
+        names = set()
+        for func in list(self._functions.values()):
+            implementations = func.values() if isinstance(func, dict) \
+                else [func]
+            for implementation in implementations:
+                if isinstance(implementation, Delegate):
+                    names.add(implementation.name)
+                elif isinstance(implementation, DelegatingFunction):
+                    names.update(implementation.names)
+        return names
+
+    def names(self):
+        """
+        Returns the names of the functions registered with this Dispatcher.
+
+        :rtype: list of str
+        """
+
+        return sorted(self._functions)
+
+    def get(self, name):
+        return self._functions.get(name)
+
+    def metadata(self, name):
+        """
+        Returns the metadata that was specified when implementations were
+        registered under the given name. Recognized keys are:
+
+        pure
+            whether the function always returns the same result for the same
+            arguments (defaults to True)
+        total
+            whether the function never raises an error, whatever arguments
+            it is invoked with, such as and() (defaults to False)
+        batch
+            whether the function is invoked with a list of argument tuples,
+            returning a list of results, so that many calls can be made at
+            once (see bexl.batch; defaults to False)
+        asynchronous
+            whether the function is a coroutine function, which can only be
+            invoked by bexl.asynchronous (set automatically)
+        timeout
+            the number of seconds after which bexl.asynchronous abandons a
+            call to an asynchronous function
+        allocation
+            a callable that accepts the same arguments as the function and
+            returns the estimated size (in characters or list elements) of
+            its result, which bexl.limits checks before invoking it
+        cost
+            the cost of a call relative to other functions (defaults to 1),
+            or a callable that accepts the estimated sizes of the arguments
+            and the values of those that are literals, and returns it (see
+            bexl.cost)
+        size
+            the estimated size of the result, or a callable that accepts the
+            same arguments as ``cost`` and returns it (see bexl.cost)
+        """
+
+        return self._metadata.get(name, {})
+
+    def resolve(self, name, *args):
+        """
+        Returns the implementation registered under the given name that
+        accepts the given arguments.
+
+        :raises: DispatchError if there is no such implementation
+        """
+
+        func = self._functions.get(name)
+        if func is None:
             raise DispatchError(
                 'No implementation exists for "%s"' % (name,)
             )
 
-        func = self._functions[name]
         arg_types = tuple([
             arg.data_type
             for arg in args
         ])
 
+        if isinstance(func, dict):
+            func = func.get(arg_types)
+            if not func:
+                raise self._signature_error(name, arg_types)
+
+        elif not self.metadata(name).get('batch', False):
+            minimum, maximum = self._arity(name, func)
+            if len(arg_types) < minimum:
+                raise self._signature_error(name, arg_types)
+
+            elif maximum is not None and len(arg_types) > maximum:
+                raise self._signature_error(name, arg_types)
+
+        return func
+
+    def _signature_error(self, name, arg_types):  # noqa: no-self-use
         if arg_types:
-            error = DispatchError(
+            return DispatchError(
                 '"%s" cannot be invoked on arguments of type: %s' % (
                     name,
                     ', '.join(arg_types),
                 ),
             )
-        else:
-            error = DispatchError(
-                '"%s" cannot be invoked without arguments' % (
+        return DispatchError(
+            '"%s" cannot be invoked without arguments' % (
+                name,
+            )
+        )
+
+    def _arity(self, name, func):  # noqa: no-self-use,unused-argument
+        return _arity(func)
+
+    def _metered_call(self, name, *args):
+        return self._metrics.observe(self._unmetered_call, name, args)
+
+    def _unmetered_call(self, name, *args):
+        return type(self).call(self, name, *args)
+
+    def call(self, name, *args):
+        func = self.resolve(name, *args)
+        metadata = self.metadata(name)
+        if metadata.get('batch', False):
+            return python_to_bexl(func([args])[0])
+        if metadata.get('asynchronous', False):
+            raise ExecutionError(
+                '"%s" is asynchronous and can only be invoked by'
+                ' bexl.asynchronous' % (
                     name,
                 )
             )
+        return func(*args)
+
 
+class FrozenDispatcher(Dispatcher):
+    """
+    An immutable snapshot of the implementations registered with a
+    Dispatcher, produced by Dispatcher.freeze(). Since nothing can change
+    it, it can be used by any number of threads at once without locking.
+
+    :param functions: the implementations, keyed by name
+    :type functions: dict
+    :param metadata: the metadata of the implementations, keyed by name
+    :type metadata: dict
+    :param delegate_to:
+        the Dispatcher that Delegates and DelegatingFunctions invoke
+        functions from. If not specified, the Delegates keep the one they
+        were bound to, and the DelegatingFunctions use the snapshot.
+    :type delegate_to: Dispatcher
+    """
+
+    frozen = True
+
+    def __init__(self, functions, metadata, delegate_to=None):
+        super(FrozenDispatcher, self).__init__()
+        self._functions = _bind_to(functions, self, delegate_to)
+        self._metadata = dict([
+            (name, dict(values))
+            for name, values in list(metadata.items())
+        ])
+        # Inspecting the signature of a function is slow, so it's done once
+        # here rather than on every call.
+        self._arities = dict([
+            (name, _arity(func))
+            for name, func in self._functions.items()
+            if not isinstance(func, dict)
+            and not self._metadata.get(name, {}).get('batch', False)
+        ])
+
+    def register(self, name, *signatures, **metadata):
+        raise TypeError(
+            'Cannot register "%s" with a frozen Dispatcher' % (
+                name,
+            )
+        )
+
+    def freeze(self, functions=None):
+        if functions is None:
+            return self
+        frozen = FrozenDispatcher(self._functions, self._metadata, functions)
+        frozen.metrics = self.metrics
+        return frozen
+
+    def get(self, name):
+        func = self._functions.get(name)
         if isinstance(func, dict):
-            func = func.get(arg_types)
-            if not func:
-                raise error
+            return dict(func)
+        return func
 
-        else:
-            argspec = inspect.getargspec(func)
-            num_reqd_args = len(argspec.args) - len(argspec.defaults or [])
-            if len(arg_types) < num_reqd_args:
-                raise error
+    def metadata(self, name):
+        return dict(self._metadata.get(name, {}))
 
-            elif len(arg_types) > len(argspec.args) and not argspec.varargs:
-                raise error
+    def _arity(self, name, func):
+        return self._arities[name]
 
-        return func(*args)
+
+class DispatcherWrapper(object):
+    """
+    Wraps a Dispatcher, forwarding everything to it. Subclasses override
+    call() to observe the calls made through it (see bexl.profiling and
+    bexl.hooks).
+
+    :param dispatcher: the Dispatcher to wrap
+    :type dispatcher: Dispatcher
+    """
+
+    def __init__(self, dispatcher):
+        self.dispatcher = dispatcher
+
+    @property
+    def frozen(self):
+        return self.dispatcher.frozen
+
+    def names(self):
+        return self.dispatcher.names()
+
+    def get(self, name):
+        return self.dispatcher.get(name)
+
+    def metadata(self, name):
+        return self.dispatcher.metadata(name)
+
+    def resolve(self, name, *args):
+        return self.dispatcher.resolve(name, *args)
+
+    def delegated_names(self):
+        return self.dispatcher.delegated_names()
+
+    def call(self, name, *args):
+        return self.dispatcher.call(name, *args)
+
+
+class FunctionRegistry(object):
+    """
+    The Dispatchers of the unary operators, binary operators and functions
+    that expressions are evaluated with.
+
+    Applications that need different sets of functions (e.g., one per tenant
+    of a service) can derive a registry of their own from
+    bexl.STANDARD_REGISTRY, register their functions with it, and then
+    freeze it, rather than registering them with the global Dispatchers.
+
+    :param unary_operators: the Dispatcher of the unary operators
+    :type unary_operators: Dispatcher
+    :param binary_operators: the Dispatcher of the binary operators
+    :type binary_operators: Dispatcher
+    :param functions: the Dispatcher of the functions
+    :type functions: Dispatcher
+    """
+
+    def __init__(self, unary_operators, binary_operators, functions):
+        self.unary_operators = unary_operators
+        self.binary_operators = binary_operators
+        self.functions = functions
+
+    @property
+    def frozen(self):
+        """
+        Whether none of the Dispatchers of the registry can change.
+        """
+
+        return self.unary_operators.frozen \
+            and self.binary_operators.frozen \
+            and self.functions.frozen
+
+    def freeze(self):
+        """
+        Returns an immutable snapshot of the registry, whose operators invoke
+        the functions of the same snapshot. Expressions compiled with a
+        frozen registry can be evaluated from many threads at once, even
+        while other functions are being registered.
+
+        :rtype: FunctionRegistry
+        """
+
+        if self.frozen:
+            return self
+        functions = self.functions.freeze()
+        return FunctionRegistry(
+            self.unary_operators.freeze(functions),
+            self.binary_operators.freeze(functions),
+            functions,
+        )
+
+    def rebind(self, functions):
+        """
+        Returns a registry with the same operators as this one, whose
+        operators invoke the functions of the given Dispatcher (e.g. one that
+        wraps the functions of this registry).
+
+        :param functions: the Dispatcher of the functions
+        :type functions: Dispatcher
+        :rtype: FunctionRegistry
+        """
+
+        return FunctionRegistry(
+            self.unary_operators.derive(functions=functions),
+            self.binary_operators.derive(functions=functions),
+            functions,
+        )
+
+    def derive(self, names=None):
+        """
+        Returns a new registry that starts out with the operators and
+        functions of this one. Functions registered with either registry
+        afterward don't affect the other.
+
+        :param names:
+            the names of the functions to start out with. The functions that
+            implement the operators, property access, indexing and slicing
+            are always included. If not specified, all functions are
+            included.
+        :type names: iterable of str
+        :raises: DispatchError if there is no function for one of the names
+        :rtype: FunctionRegistry
+        """
+
+        if names is not None:
+            names = set(names)
+            names.update(SYNTAX_FUNCTIONS)
+            names.update(self.unary_operators.delegated_names())
+            names.update(self.binary_operators.delegated_names())
+            names.update(self.functions.delegated_names())
+        return self.rebind(self.functions.derive(names))
 
 
 class Registry(object):
@@ -79,3 +625,11 @@ UNARY_OPERATORS = get_dispatcher('unary_operators')
 BINARY_OPERATORS = get_dispatcher('binary_operators')
 FUNCTIONS = get_dispatcher('functions')
 
+# The registry of the operators and functions that are used when no other
+# registry is specified. It changes whenever functions are registered.
+DEFAULT_REGISTRY = FunctionRegistry(
+    UNARY_OPERATORS,
+    BINARY_OPERATORS,
+    FUNCTIONS,
+)
+
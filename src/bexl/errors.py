@@ -67,6 +67,17 @@ class ExecutionError(InterpreterError):
     """
 
 
+class LimitExceededError(ExecutionError):
+    """
+    Represents an evaluation that was stopped because it exceeded one of the
+    limits it was evaluated with.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.limit = kwargs.pop('limit', None)
+        super(LimitExceededError, self).__init__(*args, **kwargs)
+
+
 class ConversionError(InterpreterError):
     """
     Represents an error that occurred while trying to convert a value of one
@@ -78,3 +89,9 @@ class ConversionError(InterpreterError):
         self.target_type = kwargs.pop('target_type', None)
         super(ConversionError, self).__init__(*args, **kwargs)
 
+
+class SerializationError(BexlError):
+    """
+    Represents an error that occurred while serializing or deserializing an
+    expression.
+    """
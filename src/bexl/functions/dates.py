@@ -98,6 +98,7 @@ def make_datetime(year, month, day, hour, minute, second, millisecond=None):
 
 @FUNCTIONS.register(
     'today',
+    pure=False,
 )
 def today():
     return make_value(Types.DATE, date.today())
@@ -105,6 +106,7 @@ def today():
 
 @FUNCTIONS.register(
     'now',
+    pure=False,
 )
 def now():
     return make_value(Types.DATETIME, datetime.now())
@@ -1,5 +1,6 @@
 import datetime
 
+from ..cost import linear_cost
 from ..dispatcher import FUNCTIONS, DispatchError
 from ..types import Types, make_value, NULL, TRUE, FALSE, cast, \
     is_consistently_typed
@@ -14,7 +15,9 @@ def dtkey(val):
 
 @FUNCTIONS.register(
     'min',
-    (Types.LIST,)
+    (Types.LIST,),
+    cost=linear_cost,
+    size=1,
 )
 def min_list(values):
     if values.is_null:
@@ -49,7 +52,9 @@ def min_list(values):
 
 @FUNCTIONS.register(
     'max',
-    (Types.LIST,)
+    (Types.LIST,),
+    cost=linear_cost,
+    size=1,
 )
 def max_list(values):
     if values.is_null:
@@ -84,7 +89,9 @@ def max_list(values):
 
 @FUNCTIONS.register(
     'sum',
-    (Types.LIST,)
+    (Types.LIST,),
+    cost=linear_cost,
+    size=1,
 )
 def sum_list(values):
     if values.is_null:
@@ -114,7 +121,9 @@ def sum_list(values):
 
 @FUNCTIONS.register(
     'average',
-    (Types.LIST,)
+    (Types.LIST,),
+    cost=linear_cost,
+    size=1,
 )
 def average_list(values):
     if values.is_null:
@@ -143,7 +152,9 @@ def average_list(values):
 
 @FUNCTIONS.register(
     'all',
-    (Types.LIST,)
+    (Types.LIST,),
+    cost=linear_cost,
+    size=1,
 )
 def all_list(values):
     if values.is_empty:
@@ -159,7 +170,9 @@ def all_list(values):
 
 @FUNCTIONS.register(
     'any',
-    (Types.LIST,)
+    (Types.LIST,),
+    cost=linear_cost,
+    size=1,
 )
 def any_list(values):
     if values.is_empty:
@@ -175,7 +188,9 @@ def any_list(values):
 
 @FUNCTIONS.register(
     'none',
-    (Types.LIST,)
+    (Types.LIST,),
+    cost=linear_cost,
+    size=1,
 )
 def none_list(values):
     if values.is_empty:
@@ -191,7 +206,9 @@ def none_list(values):
 
 @FUNCTIONS.register(
     'count',
-    (Types.LIST,)
+    (Types.LIST,),
+    cost=linear_cost,
+    size=1,
 )
 def count_list(values):
     if values.is_empty:
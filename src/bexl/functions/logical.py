@@ -1,4 +1,4 @@
-from ..dispatcher import FUNCTIONS
+from ..dispatcher import FUNCTIONS, DelegatingFunction
 from ..errors import ExecutionError
 from ..types import Types, make_value, cast
 
@@ -13,6 +13,7 @@ def logical_not(value):
 
 @FUNCTIONS.register(
     'and',
+    total=True,
 )
 def logical_and(left, right):
     left = cast(left, Types.BOOLEAN)
@@ -22,6 +23,7 @@ def logical_and(left, right):
 
 @FUNCTIONS.register(
     'or',
+    total=True,
 )
 def logical_or(left, right):
     left = cast(left, Types.BOOLEAN)
@@ -31,6 +33,7 @@ def logical_or(left, right):
 
 @FUNCTIONS.register(
     'xor',
+    total=True,
 )
 def logical_xor(left, right):
     left = cast(left, Types.BOOLEAN)
@@ -55,10 +58,7 @@ def if_func(*args):
     return args[-1]
 
 
-@FUNCTIONS.register(
-    'switch',
-)
-def switch(*args):
+def switch(functions, *args):
     if len(args) < 4 or len(args) % 2 != 0:
         raise ExecutionError(
             'Incorrect number of arguments'
@@ -67,9 +67,16 @@ def switch(*args):
     value = args[0]
 
     for i in range(1, len(args) - 1, 2):
-        result = FUNCTIONS.call('equal', value, args[i])
+        result = functions.call('equal', value, args[i])
         if result.raw_value:
             return args[i + 1]
 
     return args[-1]
 
+
+# The cases are compared using the "equal" of the registry switch() is
+# invoked from.
+FUNCTIONS.register(
+    'switch',
+)(DelegatingFunction(switch, ('equal',)))
+
@@ -1,5 +1,6 @@
 import six
 
+from ..cost import linear_cost, total_size
 from ..dispatcher import FUNCTIONS
 from ..errors import DispatchError, ExecutionError
 from ..types import Types, make_value, TRUE, FALSE, NULL
@@ -7,6 +8,8 @@ from ..types import Types, make_value, TRUE, FALSE, NULL
 
 @FUNCTIONS.register(
     'in',
+    cost=linear_cost,
+    size=1,
 )
 def value_in(needle, haystack):
     if haystack.data_type == Types.LIST:
@@ -34,6 +37,7 @@ def value_in(needle, haystack):
     'length',
     (Types.STRING,),
     (Types.LIST,),
+    size=1,
 )
 def seq_length(value):
     if value.is_empty:
@@ -43,6 +47,19 @@ def seq_length(value):
     return make_value(Types.INTEGER, int(vlen))
 
 
+def _end_size(sizes, values):
+    if not sizes:
+        return 1
+    if len(values) < 2:
+        length = 1
+    elif isinstance(values[1], (six.integer_types, float)) \
+            and not isinstance(values[1], bool):
+        length = max(int(values[1]), 0)
+    else:
+        return sizes[0]
+    return min(sizes[0], length)
+
+
 @FUNCTIONS.register(
     'head',
     (Types.STRING,),
@@ -51,6 +68,7 @@ def seq_length(value):
     (Types.LIST,),
     (Types.LIST, Types.INTEGER),
     (Types.LIST, Types.FLOAT),
+    size=_end_size,
 )
 def head(value, length=None):
     if value.is_null:
@@ -72,6 +90,7 @@ def head(value, length=None):
     (Types.LIST,),
     (Types.LIST, Types.INTEGER),
     (Types.LIST, Types.FLOAT),
+    size=_end_size,
 )
 def tail(value, length=None):
     if value.is_null:
@@ -85,8 +104,19 @@ def tail(value, length=None):
     return make_value(value.data_type, value.raw_value[-1 * length:])
 
 
+def _concat_size(*values):
+    return sum([
+        len(val.raw_value)
+        for val in values
+        if val.data_type in (Types.STRING, Types.LIST) and not val.is_null
+    ])
+
+
 @FUNCTIONS.register(
     'concat',
+    allocation=_concat_size,
+    cost=linear_cost,
+    size=total_size,
 )
 def concat(value, *values):
     values = [value] + list(values)
@@ -1,3 +1,6 @@
+import six
+
+from ..cost import DEFAULT_VARIABLE_SIZE, linear_cost
 from ..dispatcher import FUNCTIONS
 from ..errors import ExecutionError
 from ..types import Types, make_value
@@ -6,6 +9,7 @@ from ..types import Types, make_value
 @FUNCTIONS.register(
     'upper',
     (Types.STRING,),
+    cost=linear_cost,
 )
 def upper(value):
     if value.is_empty:
@@ -16,6 +20,7 @@ def upper(value):
 @FUNCTIONS.register(
     'lower',
     (Types.STRING,),
+    cost=linear_cost,
 )
 def lower(value):
     if value.is_empty:
@@ -26,6 +31,7 @@ def lower(value):
 @FUNCTIONS.register(
     'trim',
     (Types.STRING,),
+    cost=linear_cost,
 )
 def trim(value):
     if value.is_empty:
@@ -36,6 +42,7 @@ def trim(value):
 @FUNCTIONS.register(
     'ltrim',
     (Types.STRING,),
+    cost=linear_cost,
 )
 def ltrim(value):
     if value.is_empty:
@@ -46,6 +53,7 @@ def ltrim(value):
 @FUNCTIONS.register(
     'rtrim',
     (Types.STRING,),
+    cost=linear_cost,
 )
 def rtrim(value):
     if value.is_empty:
@@ -53,9 +61,19 @@ def rtrim(value):
     return make_value(Types.STRING, value.raw_value.rstrip())
 
 
+def _replace_size(value, needle, replacement):
+    if value.is_empty or needle.is_empty:
+        return 0
+    growth = len(replacement.raw_value or '') - len(needle.raw_value)
+    return len(value.raw_value) \
+        + max(growth, 0) * value.raw_value.count(needle.raw_value)
+
+
 @FUNCTIONS.register(
     'replace',
     (Types.STRING, Types.STRING, Types.STRING),
+    allocation=_replace_size,
+    cost=linear_cost,
 )
 def replace(value, needle, replacement):
     if value.is_empty or needle.is_empty:
@@ -66,9 +84,34 @@ def replace(value, needle, replacement):
     )
 
 
+def _repeat_size(value, repetitions):
+    if value.is_empty or repetitions.is_null:
+        return 0
+    return len(value.raw_value) * max(repetitions.raw_value, 0)
+
+
+def _repeat_estimate(sizes, values):
+    if len(sizes) < 2:
+        return max(sizes) if sizes else 1
+    repetitions = values[1]
+    if not isinstance(repetitions, six.integer_types) \
+            or isinstance(repetitions, bool):
+        repetitions = DEFAULT_VARIABLE_SIZE
+    return sizes[0] * max(repetitions, 0)
+
+
+def _repeat_cost(sizes, values):
+    if len(sizes) < 2:
+        return linear_cost(sizes)
+    return linear_cost(sizes) + _repeat_estimate(sizes, values)
+
+
 @FUNCTIONS.register(
     'repeat',
     (Types.STRING, Types.INTEGER),
+    allocation=_repeat_size,
+    cost=_repeat_cost,
+    size=_repeat_estimate,
 )
 def repeat(value, repetitions):
     if value.is_empty or repetitions.is_null:
@@ -24,7 +24,7 @@ for name, data_type in FULL_SPECS:
     )
 
 for name, data_type in FULL_SPECS + IS_SPECS:
-    FUNCTIONS.register('is%s' % (name.capitalize(),))(
+    FUNCTIONS.register('is%s' % (name.capitalize(),), total=True)(
         lambda value, data_type=data_type:
         TRUE if value.data_type == data_type else FALSE
     )
@@ -32,6 +32,7 @@ for name, data_type in FULL_SPECS + IS_SPECS:
 
 @FUNCTIONS.register(
     'isNull',
+    total=True,
 )
 def is_null(value):
     return TRUE if value.is_null else FALSE
@@ -39,6 +40,7 @@ def is_null(value):
 
 @FUNCTIONS.register(
     'list',
+    total=True,
 )
 def type_list(*values):
     return make_value(Types.LIST, values)
@@ -143,6 +145,7 @@ def property_access(record, prop):
 
 @FUNCTIONS.register(
     'coalesce',
+    total=True,
 )
 def coalesce(*values):
     for value in values:
@@ -0,0 +1,1130 @@
+import datetime
+import itertools
+import math
+import random
+import string
+import time
+
+from .dispatcher import DEFAULT_REGISTRY, SYNTAX_FUNCTIONS, _arity
+from .errors import BexlError, InterpreterError
+from .interpreter import Interpreter
+from .lexer import Lexer
+from .nodes import Expression
+from .parser import Parser
+from .resolver import VariableResolver
+from .types import is_consistently_typed, make_value, Types
+
+
+# The types of the values that expressions are generated for.
+VALUE_TYPES = (
+    Types.INTEGER,
+    Types.FLOAT,
+    Types.STRING,
+    Types.BOOLEAN,
+    Types.DATE,
+    Types.TIME,
+    Types.DATETIME,
+    Types.LIST,
+    Types.RECORD,
+)
+
+# The types that have literals.
+LITERAL_TYPES = (
+    Types.INTEGER,
+    Types.FLOAT,
+    Types.STRING,
+    Types.BOOLEAN,
+)
+
+# The variables that expressions are generated with, if not specified. A
+# record is described by a dict of the types of its fields, and a list by a
+# list of the type of its elements.
+DEFAULT_SCHEMA = {
+    'i': Types.INTEGER,
+    'f': Types.FLOAT,
+    's': Types.STRING,
+    'b': Types.BOOLEAN,
+    'd': Types.DATE,
+    't': Types.TIME,
+    'dt': Types.DATETIME,
+    'l': [Types.INTEGER],
+    'r': {
+        'name': Types.STRING,
+        'count': Types.INTEGER,
+        'tags': [Types.STRING],
+    },
+}
+
+# The relative likelihood of each kind of node, if not specified.
+DEFAULT_WEIGHTS = {
+    'literal': 2.0,
+    'variable': 3.0,
+    'operator': 3.0,
+    'function': 2.0,
+    'list': 0.3,
+    'grouping': 0.2,
+}
+
+# The functions and operators that aren't used unless asked for, since
+# nesting them can take unbounded time and memory on random arguments.
+DEFAULT_EXCLUDED = (
+    '**',
+    'repeat',
+)
+
+# The largest number of arguments that functions accepting any number of
+# them are probed with.
+MAX_PROBED_ARITY = 3
+
+_timer = getattr(time, 'perf_counter', time.time)  # noqa: invalid-name
+
+
+def _type_of(spec):
+    if isinstance(spec, dict):
+        return Types.RECORD
+    if isinstance(spec, list):
+        return Types.LIST
+    return spec
+
+
+def _sample_values():
+    # Two values of each type, the second of which is falsy where the type
+    # allows, so that functions whose result depends on the truthiness of an
+    # argument (e.g. if()) are seen to return values of different types.
+    integer = make_value(Types.INTEGER, 2)
+    date = make_value(Types.DATE, datetime.date(2019, 1, 2))
+    time_ = make_value(Types.TIME, datetime.time(3, 4, 5))
+    datetime_ = make_value(
+        Types.DATETIME,
+        datetime.datetime(2019, 1, 2, 3, 4, 5),
+    )
+    return (
+        {
+            Types.INTEGER: integer,
+            Types.FLOAT: make_value(Types.FLOAT, 1.5),
+            Types.STRING: make_value(Types.STRING, u'ab'),
+            Types.BOOLEAN: make_value(Types.BOOLEAN, True),
+            Types.DATE: date,
+            Types.TIME: time_,
+            Types.DATETIME: datetime_,
+            Types.LIST: make_value(Types.LIST, [integer, integer]),
+            Types.RECORD: make_value(Types.RECORD, {u'a': integer}),
+        },
+        {
+            Types.INTEGER: make_value(Types.INTEGER, 0),
+            Types.FLOAT: make_value(Types.FLOAT, 0.0),
+            Types.STRING: make_value(Types.STRING, u''),
+            Types.BOOLEAN: make_value(Types.BOOLEAN, False),
+            Types.DATE: date,
+            Types.TIME: time_,
+            Types.DATETIME: datetime_,
+            Types.LIST: make_value(Types.LIST, []),
+            Types.RECORD: make_value(Types.RECORD, {}),
+        },
+    )
+
+
+def _mix(names):
+    if names is not None and not isinstance(names, dict):
+        names = dict([(name, 1.0) for name in names])
+    return names
+
+
+class Mix(object):
+    """
+    The relative likelihood of the kinds of nodes, the functions and the
+    operators in the expressions an ExpressionGenerator generates.
+
+    :param weights:
+        the relative likelihood of each kind of node: "literal",
+        "variable", "operator", "function", "list" and "grouping". Kinds that
+        aren't specified keep their default likelihood.
+    :type weights: dict
+    :param functions:
+        the functions that may be invoked: either a list of their names, or
+        a dict of their names to their relative likelihood. If not
+        specified, every function but those in DEFAULT_EXCLUDED may be,
+        equally likely.
+    :type functions: list|dict
+    :param operators:
+        the operators that may be used, like the functions
+    :type operators: list|dict
+    """
+
+    __slots__ = (
+        'weights',
+        'functions',
+        'operators',
+    )
+
+    def __init__(self, weights=None, functions=None, operators=None):
+        self.weights = weights
+        self.functions = functions
+        self.operators = operators
+
+
+class Signature(object):
+    """
+    A way of producing a value of one type from values of others: a
+    function, or a unary or binary operator.
+
+    :param kind: "function", "unary" or "binary"
+    :type kind: str
+    :param name: the name of the function, or the operator
+    :type name: str
+    :param arguments: the types of the arguments
+    :type arguments: tuple of str
+    :param result: the type of the result
+    :type result: str
+    """
+
+    __slots__ = (
+        'kind',
+        'name',
+        'arguments',
+        'result',
+    )
+
+    def __init__(self, kind, name, arguments, result):
+        self.kind = kind
+        self.name = name
+        self.arguments = arguments
+        self.result = result
+
+    def render(self, arguments):
+        """
+        Returns the source of an invocation with the given arguments.
+
+        :param arguments:
+            the source of each argument, and whether it needs no
+            parentheses to be an operand
+        :type arguments: list of tuple(str, bool)
+        :rtype: str
+        """
+
+        if self.kind == 'function':
+            return '%s(%s)' % (
+                self.name,
+                ', '.join([source for source, _ in arguments]),
+            )
+        operands = [
+            source if atomic else '(%s)' % (source,)
+            for source, atomic in arguments
+        ]
+        if self.kind == 'unary':
+            return self.name + operands[0]
+        return '%s %s %s' % (operands[0], self.name, operands[1])
+
+    def __repr__(self):
+        return '<%s %s %s(%s) -> %s>' % (
+            self.__class__.__name__,
+            self.kind,
+            self.name,
+            ', '.join(self.arguments),
+            self.result,
+        )
+
+
+def _invoke(call, name, arguments, values):
+    try:
+        value = call(name, *[values[argument] for argument in arguments])
+    except Exception:  # noqa: broad-except
+        # Any error means the implementation doesn't accept the arguments
+        # (or, for the falsy samples, their values).
+        return None
+    data_type = getattr(value, 'data_type', None)
+    if data_type not in VALUE_TYPES:
+        return None
+    if data_type == Types.LIST and not is_consistently_typed(
+            value.raw_value,
+            (Types.INTEGER,)):
+        # Lists are assumed to be of integers, like the sample lists.
+        return None
+    return data_type
+
+
+def _probe(call, name, arguments, samples):
+    # The type of the result, if the implementation accepts the arguments
+    # and its result is always of the same type.
+    typical, falsy = samples
+    result = _invoke(call, name, arguments, typical)
+    if result is None:
+        return None
+    other = _invoke(call, name, arguments, falsy)
+    if other is not None and other != result:
+        return None
+    return result
+
+
+def _candidate_arguments(dispatcher, name, fixed_arity=None):
+    func = dispatcher.get(name)
+    if isinstance(func, dict):
+        return [
+            signature
+            for signature in func
+            if all([argument in VALUE_TYPES for argument in signature])
+        ]
+    if fixed_arity is not None:
+        arities = [fixed_arity]
+    else:
+        try:
+            minimum, maximum = _arity(func)
+        except TypeError:
+            return []
+        if maximum is None:
+            maximum = max(minimum, MAX_PROBED_ARITY)
+        arities = range(minimum, min(maximum, MAX_PROBED_ARITY) + 1)
+    return [
+        signature
+        for arity in arities
+        for signature in itertools.product(VALUE_TYPES, repeat=arity)
+    ]
+
+
+def probe_signatures(registry=None):
+    """
+    Determines the types of the results of the operators and functions of a
+    registry, by invoking them on sample values of each combination of the
+    types of arguments they accept, since the registry doesn't record them.
+    Functions registered without signatures are invoked on every
+    combination of types (of up to three arguments). Functions that raise
+    errors on a combination are assumed not to accept it, and those whose
+    result is of a different type for falsy arguments (e.g. if()) are
+    assumed not to be well-typed for it. Lists are assumed to be of
+    integers, so functions that return lists of anything else (e.g. list()
+    of strings) are too. Functions that are batch or
+    asynchronous are skipped, as are the
+    functions that implement the operators, property access, indexing and
+    slicing.
+
+    :param registry:
+        the registry of the operators and functions. If not specified,
+        bexl.dispatcher.DEFAULT_REGISTRY is used.
+    :type registry: bexl.dispatcher.FunctionRegistry
+    :rtype: list of Signature
+    """
+
+    registry = registry or DEFAULT_REGISTRY
+    samples = _sample_values()
+    signatures = []
+
+    for kind, dispatcher, arity in (
+            ('unary', registry.unary_operators, 1),
+            ('binary', registry.binary_operators, 2)):
+        for name in dispatcher.names():
+            for arguments in _candidate_arguments(dispatcher, name, arity):
+                result = _probe(dispatcher.call, name, arguments, samples)
+                if result:
+                    signatures.append(
+                        Signature(kind, name, arguments, result),
+                    )
+
+    functions = registry.functions
+    excluded = set(SYNTAX_FUNCTIONS)
+    excluded.update(registry.unary_operators.delegated_names())
+    excluded.update(registry.binary_operators.delegated_names())
+    for name in functions.names():
+        metadata = functions.metadata(name)
+        if name in excluded or metadata.get('batch') \
+                or metadata.get('asynchronous'):
+            continue
+        for arguments in _candidate_arguments(functions, name):
+            result = _probe(functions.call, name, arguments, samples)
+            if result:
+                signatures.append(
+                    Signature('function', name, arguments, result),
+                )
+
+    return signatures
+
+
+class ExpressionGenerator(object):
+    """
+    Generates random, well-typed BEXL expressions and random variables to
+    evaluate them with, e.g. for load testing or for looking for
+    performance cliffs (see find_pathological()).
+
+    An expression is well-typed if every operator and function in it is
+    invoked on arguments of types it accepts. Such expressions can still
+    raise errors when evaluated (e.g. when dividing by zero, or when a
+    function returns null). Since the types of the elements of lists are
+    unknown to the registry, lists are assumed to be of integers: the
+    list-typed values are list literals of integers, variables that are
+    lists of integers, and the results of functions that return lists of
+    integers (see probe_signatures()).
+
+    :param schema:
+        the variables that expressions may reference, mapped to their types.
+        A record is described by a dict of the types of its fields, and a
+        list by a list of one element, the type of its elements. If not
+        specified, a variable of each type is available.
+    :type schema: dict
+    :param registry:
+        the registry of the operators and functions to use. If not
+        specified, bexl.dispatcher.DEFAULT_REGISTRY is used.
+    :type registry: bexl.dispatcher.FunctionRegistry
+    :param max_depth: the maximum depth of the expressions generated
+    :type max_depth: int
+    :param max_width:
+        the maximum number of elements of the lists (both the literals in the
+        expressions and the values of the variables)
+    :type max_width: int
+    :param mix:
+        the relative likelihood of the kinds of nodes, the functions and the
+        operators. If not specified, the defaults of Mix are used.
+    :type mix: Mix
+    :param seed: the seed of the random choices
+    :type seed: int
+    """
+
+    def __init__(
+            self,
+            schema=None,
+            registry=None,
+            max_depth=4,
+            max_width=3,
+            mix=None,
+            seed=None):
+        self.mix = mix or Mix()
+        self.schema = DEFAULT_SCHEMA if schema is None else schema
+        self.max_depth = max_depth
+        self.max_width = max_width
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(self.mix.weights or {})
+        self.random = random.Random(seed)
+
+        self._names = {
+            'function': _mix(self.mix.functions),
+            'unary': _mix(self.mix.operators),
+            'binary': _mix(self.mix.operators),
+        }
+        self.signatures = [
+            signature
+            for signature in probe_signatures(registry)
+            if self._name_weight(signature.kind, signature.name) > 0
+        ]
+
+        self.accessors = dict([(data_type, []) for data_type in VALUE_TYPES])
+        for name in sorted(self.schema):
+            self._add_accessors('$' + name, self.schema[name])
+
+        self.min_depths = self._min_depths()
+
+    def _add_accessors(self, source, spec):
+        data_type = _type_of(spec)
+        # Only lists of integers are used as lists, but the elements of
+        # others still are.
+        if data_type != Types.LIST or spec == [Types.INTEGER]:
+            self.accessors[data_type].append(source)
+        if isinstance(spec, dict):
+            for field in sorted(spec):
+                self._add_accessors('%s.%s' % (source, field), spec[field])
+        elif isinstance(spec, list):
+            # The values of list variables are never empty.
+            self._add_accessors(source + '[0]', spec[0])
+            self._add_accessors(source + '[-1]', spec[0])
+
+    def _min_depths(self):
+        # The smallest depth of an expression of each type.
+        depths = {}
+        for data_type in VALUE_TYPES:
+            if data_type in LITERAL_TYPES or self.accessors[data_type] \
+                    or data_type == Types.LIST:
+                depths[data_type] = 0
+        changed = True
+        while changed:
+            changed = False
+            for signature in self.signatures:
+                if not all([arg in depths for arg in signature.arguments]):
+                    continue
+                depth = 1 + max(
+                    [depths[arg] for arg in signature.arguments] or [0]
+                )
+                if depth < depths.get(signature.result, depth + 1):
+                    depths[signature.result] = depth
+                    changed = True
+        return depths
+
+    @property
+    def types(self):
+        """
+        The types of the expressions that can be generated within the
+        maximum depth.
+
+        :rtype: list of str
+        """
+
+        return [
+            data_type
+            for data_type in VALUE_TYPES
+            if self.min_depths.get(data_type, self.max_depth + 1)
+            <= self.max_depth
+        ]
+
+    def expression(self, data_type=None):
+        """
+        Generates an expression.
+
+        :param data_type:
+            the type of the value the expression produces. If not specified,
+            a random one is used.
+        :type data_type: str
+        :raises: ValueError if no expression of the type can be generated
+        :rtype: str
+        """
+
+        if data_type is None:
+            data_type = self.random.choice(self.types)
+        elif data_type not in self.types:
+            raise ValueError(
+                'Cannot generate an expression of type %s' % (data_type,)
+            )
+        return self._generate(data_type, self.max_depth)[0]
+
+    def _choose(self, options):
+        total = sum([weight for weight, _ in options])
+        point = self.random.uniform(0, total)
+        for weight, option in options:
+            point -= weight
+            if point <= 0:
+                return option
+        return options[-1][1]
+
+    def _name_weight(self, kind, name):
+        names = self._names[kind]
+        if names is None:
+            return 0.0 if name in DEFAULT_EXCLUDED else 1.0
+        return names.get(name, 0.0)
+
+    def _generate(self, data_type, depth):
+        # Returns the source of an expression, and whether it needs no
+        # parentheses to be an operand.
+        options = []
+        if data_type in LITERAL_TYPES:
+            options.append((self.weights['literal'], 'literal'))
+        if self.accessors[data_type]:
+            options.append((self.weights['variable'], 'variable'))
+        if data_type == Types.LIST:
+            options.append((self.weights['list'], 'list'))
+
+        signatures = {}
+        if depth > 0:
+            for signature in self.signatures:
+                if signature.result == data_type and all([
+                        self.min_depths.get(arg, depth) < depth
+                        for arg in signature.arguments]):
+                    kind = 'function' if signature.kind == 'function' \
+                        else 'operator'
+                    signatures.setdefault(kind, []).append(signature)
+            for kind in sorted(signatures):
+                options.append((self.weights[kind], kind))
+            options.append((self.weights['grouping'], 'grouping'))
+
+        options = [(weight, kind) for weight, kind in options if weight > 0]
+        if not options:
+            raise ValueError(
+                'Cannot generate an expression of type %s' % (data_type,)
+            )
+        kind = self._choose(options)
+
+        if kind == 'literal':
+            return self._literal(data_type), True
+        if kind == 'variable':
+            return self.random.choice(self.accessors[data_type]), True
+        if kind == 'list':
+            elements = [
+                self._generate(Types.INTEGER, max(depth - 1, 0))[0]
+                for _ in range(self.random.randint(1, max(self.max_width, 1)))
+            ]
+            return '[%s]' % (', '.join(elements),), True
+        if kind == 'grouping':
+            return '(%s)' % (self._generate(data_type, depth - 1)[0],), True
+
+        # The function or operator is chosen before its signature, so that
+        # those with many signatures (e.g. coalesce()) aren't favored.
+        by_name = {}
+        for signature in signatures[kind]:
+            by_name.setdefault(signature.name, []).append(signature)
+        name = self._choose([
+            (self._name_weight(by_name[name][0].kind, name), name)
+            for name in sorted(by_name)
+        ])
+        signature = self.random.choice(by_name[name])
+        arguments = [
+            self._generate(argument, depth - 1)
+            for argument in signature.arguments
+        ]
+        return signature.render(arguments), signature.kind == 'function'
+
+    def _literal(self, data_type):
+        rand = self.random
+        if data_type == Types.INTEGER:
+            return str(rand.randint(0, 100))
+        if data_type == Types.FLOAT:
+            return '%d.%d' % (rand.randint(0, 100), rand.randint(0, 99))
+        if data_type == Types.BOOLEAN:
+            return rand.choice(('True', 'False'))
+        return "'%s'" % (self._string(),)
+
+    def _string(self, size=None):
+        if size is None:
+            size = self.random.randint(0, 8)
+        return ''.join([
+            self.random.choice(string.ascii_letters)
+            for _ in range(size)
+        ])
+
+    def value(self, spec, size=None):
+        """
+        Generates a random value.
+
+        :param spec:
+            the type of the value, or the description of a record or list
+            (see the schema)
+        :type spec: str|dict|list
+        :param size:
+            the number of characters of strings and of elements of lists. If
+            not specified, it is random (lists have at least one element).
+        :type size: int
+        :rtype: bexl.Value
+        """
+
+        rand = self.random
+        data_type = _type_of(spec)
+        if data_type == Types.INTEGER:
+            raw = rand.randint(-1000, 1000)
+        elif data_type == Types.FLOAT:
+            raw = rand.uniform(-1000, 1000)
+        elif data_type == Types.STRING:
+            raw = self._string(size)
+        elif data_type == Types.BOOLEAN:
+            raw = rand.random() < 0.5
+        elif data_type == Types.DATE:
+            raw = datetime.date(2000, 1, 1) \
+                + datetime.timedelta(days=rand.randint(0, 10000))
+        elif data_type == Types.TIME:
+            raw = datetime.time(
+                rand.randint(0, 23),
+                rand.randint(0, 59),
+                rand.randint(0, 59),
+            )
+        elif data_type == Types.DATETIME:
+            raw = datetime.datetime(2000, 1, 1) \
+                + datetime.timedelta(seconds=rand.randint(0, 10 ** 9))
+        elif data_type == Types.LIST:
+            count = size if size is not None \
+                else rand.randint(1, max(self.max_width, 1))
+            raw = [self.value(spec[0], size) for _ in range(count)]
+        else:
+            raw = dict([
+                (field, self.value(spec[field], size))
+                for field in spec
+            ])
+        return make_value(data_type, raw)
+
+    def row(self, size=None):
+        """
+        Generates random values of the variables of the schema.
+
+        :param size:
+            the number of characters of strings and of elements of lists. If
+            not specified, it is random.
+        :type size: int
+        :rtype: dict
+        """
+
+        return dict([
+            (name, self.value(spec, size))
+            for name, spec in self.schema.items()
+        ])
+
+    def rows(self, count, size=None):
+        """
+        Generates random values of the variables of the schema for many
+        evaluations.
+
+        :param count: the number of rows to generate
+        :type count: int
+        :param size:
+            the number of characters of strings and of elements of lists. If
+            not specified, it is random.
+        :type size: int
+        :rtype: list of dict
+        """
+
+        return [self.row(size) for _ in range(count)]
+
+
+class Timings(object):
+    """
+    The time a stage took at increasing sizes of an expression.
+
+    :param sizes: the sizes it was to be measured at
+    :type sizes: list of int
+    :param seconds:
+        the time the stage took at each size, up to the first one it failed
+        at (if any)
+    :type seconds: list of float
+    """
+
+    __slots__ = (
+        'sizes',
+        'seconds',
+    )
+
+    def __init__(self, sizes, seconds):
+        self.sizes = sizes
+        self.seconds = seconds
+
+    @property
+    def failed_size(self):
+        """
+        The size the stage failed at, or None if it never did.
+        """
+
+        if len(self.seconds) < len(self.sizes):
+            return self.sizes[len(self.seconds)]
+        return None
+
+    @property
+    def exponent(self):
+        """
+        The estimated exponent of the growth of the time (1 is linear), or
+        None if the stage failed at one of the sizes (see growth_exponent()).
+        """
+
+        if self.failed_size is not None:
+            return None
+        return growth_exponent(self.sizes, self.seconds)
+
+
+class Reproducer(object):
+    """
+    An expression whose lexing, parsing or evaluation takes time that grows
+    faster than linearly with its size, or that fails once it is big enough.
+
+    :param stage: "lex", "parse" or "evaluate"
+    :type stage: str
+    :param family:
+        how the expression grows: "chain" (a longer chain of an operator),
+        "nesting" (deeper nesting of a function or operator), "grouping"
+        (deeper nesting of parentheses) or "data" (larger values of
+        variables)
+    :type family: str
+    :param base: the expression that grows
+    :type base: str
+    :param timings: the time the stage took at each size
+    :type timings: Timings
+    :param failure: the error raised at the smallest size that failed
+    :type failure: Exception
+    :param example: the smallest expression that reproduces the problem
+    :type example: str
+    """
+
+    def __init__(
+            self,
+            stage,
+            family,
+            base,
+            timings,
+            failure=None,
+            example=None):
+        self.stage = stage
+        self.family = family
+        self.base = base
+        self.timings = timings
+        self.failure = failure
+        self.example = example
+
+    def describe(self):
+        """
+        Describes the problem for a human.
+
+        :rtype: str
+        """
+
+        if self.failure is not None:
+            summary = '%s fails at size %s with %s: %s' % (
+                self.stage,
+                self.timings.failed_size,
+                self.failure.__class__.__name__,
+                self.failure,
+            )
+        else:
+            summary = '%s time grows as size^%.2f' % (
+                self.stage,
+                self.timings.exponent,
+            )
+        timings = ', '.join([
+            '%s: %.3fms' % (size, seconds * 1000)
+            for size, seconds in zip(
+                self.timings.sizes,
+                self.timings.seconds,
+            )
+        ])
+        example = self.example or ''
+        if len(example) > 200:
+            example = example[:200] + '...'
+        return '%s (%s of %s)\n  timings: %s\n  example: %s' % (
+            summary,
+            self.family,
+            self.base,
+            timings,
+            example,
+        )
+
+    def __repr__(self):
+        return '<%s %s %s %r>' % (
+            self.__class__.__name__,
+            self.stage,
+            self.family,
+            self.base,
+        )
+
+
+def _measure(func, min_time):
+    # The time of one invocation, as the best of a few loops that take at
+    # least min_time each.
+    loops = 1
+    while True:
+        started = _timer()
+        for _ in range(loops):
+            func()
+        elapsed = _timer() - started
+        if elapsed >= min_time or loops >= 2 ** 16:
+            break
+        loops *= 2
+    best = elapsed
+    for _ in range(2):
+        started = _timer()
+        for _ in range(loops):
+            func()
+        best = min(best, _timer() - started)
+    return best / loops
+
+
+def growth_exponent(sizes, seconds):
+    """
+    Estimates the exponent k of the growth of time with size (seconds ~
+    size ** k), by least squares on a log-log scale.
+
+    :param sizes: the sizes
+    :type sizes: list of int
+    :param seconds: the time taken at each size
+    :type seconds: list of float
+    :rtype: float
+    """
+
+    points = [
+        (math.log(size), math.log(max(elapsed, 1e-9)))
+        for size, elapsed in zip(sizes, seconds)
+    ]
+    mean_x = sum([x for x, _ in points]) / len(points)
+    mean_y = sum([y for _, y in points]) / len(points)
+    variance = sum([(x - mean_x) ** 2 for x, _ in points])
+    if not variance:
+        return 0.0
+    return sum([
+        (x - mean_x) * (y - mean_y)
+        for x, y in points
+    ]) / variance
+
+
+class PathologicalSearch(object):
+    """
+    Looks for expressions whose lexing, parsing or evaluation takes time
+    that grows faster than linearly with their size (or that fail once they
+    are big enough), by growing random expressions in several ways and
+    timing each stage at increasing sizes. The expressions found are
+    minimized by replacing them with the smallest of their subexpressions
+    that still reproduces the problem.
+
+    :param generator: the generator of the expressions to grow
+    :type generator: ExpressionGenerator
+    :param sizes: the sizes to grow the expressions to
+    :type sizes: list of int
+    :param threshold:
+        the exponent of the growth of time above which it is considered a
+        problem
+    :type threshold: float
+    :param stages: the stages to time: "lex", "parse" and/or "evaluate"
+    :type stages: list of str
+    :param min_time:
+        the minimum number of seconds each timing should take, for accuracy
+    :type min_time: float
+    """
+
+    def __init__(
+            self,
+            generator,
+            sizes=(16, 32, 64, 128),
+            threshold=1.5,
+            stages=('lex', 'parse', 'evaluate'),
+            min_time=0.005):
+        self.generator = generator
+        self.sizes = list(sizes)
+        self.threshold = threshold
+        self.stages = stages
+        self.min_time = min_time
+        self.row = VariableResolver.make_from(generator.row())
+
+    def _growers(self, data_type):
+        # The ways an expression of the given type can be grown, as a family
+        # name and a function of the expression and the size.
+        growers = [(
+            'grouping',
+            lambda base, size: '(' * size + base + ')' * size,
+        )]
+        chains = [
+            signature
+            for signature in self.generator.signatures
+            if signature.kind == 'binary'
+            and signature.result == data_type
+            and signature.arguments == (data_type, data_type)
+        ]
+        if chains:
+            growers.append((
+                'chain',
+                _chain(self.generator.random.choice(chains)),
+            ))
+        nestings = [
+            signature
+            for signature in self.generator.signatures
+            if signature.result == data_type
+            and signature.arguments == (data_type,)
+        ]
+        if nestings:
+            growers.append((
+                'nesting',
+                _nest(self.generator.random.choice(nestings)),
+            ))
+        return growers
+
+    def _stage(self, stage, source, row):
+        if stage == 'lex':
+            return lambda: list(Lexer(source))
+        tree = Parser().parse(source)
+        if stage == 'parse':
+            return lambda: Parser().parse(source)
+        interpreter = Interpreter()
+
+        def evaluate():
+            try:
+                interpreter.interpret(tree, row)
+            except InterpreterError:
+                pass
+        return evaluate
+
+    def _time(self, stage, sources, rows):
+        # The time of the stage for each source, stopping at the first one
+        # that fails (other than by raising an InterpreterError when
+        # evaluated, which is the expression's business).
+        seconds = []
+        for source, row in zip(sources, rows):
+            try:
+                seconds.append(
+                    _measure(self._stage(stage, source, row), self.min_time),
+                )
+            except Exception as exc:  # noqa: broad-except
+                return seconds, exc, source
+        return seconds, None, None
+
+    def _check(self, stage, family, base, grow):
+        if family == 'data':
+            sources = [base] * len(self.sizes)
+            rows = [
+                VariableResolver.make_from(self.generator.row(size))
+                for size in self.sizes
+            ]
+        else:
+            sources = [grow(base, size) for size in self.sizes]
+            rows = [self.row] * len(self.sizes)
+
+        seconds, failure, failed = self._time(stage, sources, rows)
+        if failure is not None and (not seconds or family == 'data'):
+            # It fails at the smallest size, or with other random variables,
+            # so because of its values rather than its size.
+            return None
+        timings = Timings(self.sizes, seconds)
+        if failure is not None:
+            return Reproducer(stage, family, base, timings, failure, failed)
+        if timings.exponent > self.threshold:
+            return Reproducer(stage, family, base, timings, None, sources[0])
+        return None
+
+    def _type_of(self, source):
+        # The type of the value of the expression, or None if it fails (with
+        # any error, since the functions don't always guard against random
+        # values), in which case it isn't grown.
+        try:
+            return Interpreter().interpret(
+                Parser().parse(source),
+                self.row,
+            ).data_type
+        except Exception:  # noqa: broad-except
+            return None
+
+    def _minimize(self, reproducer, data_type, grow):
+        # Replaces the base of the reproducer with the smallest of its
+        # subexpressions (of the same type) that still reproduces it.
+        while True:
+            candidates = sorted(
+                set(_subexpressions(reproducer.base)),
+                key=len,
+            )
+            for candidate in candidates:
+                if len(candidate) >= len(reproducer.base) \
+                        or self._type_of(candidate) != data_type:
+                    continue
+                smaller = self._check(
+                    reproducer.stage,
+                    reproducer.family,
+                    candidate,
+                    grow,
+                )
+                if smaller is not None:
+                    reproducer = smaller
+                    break
+            else:
+                return reproducer
+
+    def check(self, base):
+        """
+        Grows the given expression in every way it can be, and times each
+        stage.
+
+        :param base: the expression
+        :type base: str
+        :returns: the (minimized) problems found
+        :rtype: list of Reproducer
+        """
+
+        data_type = self._type_of(base)
+        if data_type is None:
+            return []
+
+        found = []
+        growers = self._growers(data_type) \
+            + [('data', lambda base, size: base)]
+        for family, grow in growers:
+            for stage in self.stages:
+                if family == 'data' and stage != 'evaluate':
+                    continue
+                reproducer = self._check(stage, family, base, grow)
+                if reproducer is None:
+                    continue
+                found.append(self._minimize(reproducer, data_type, grow))
+                if reproducer.failure is not None:
+                    # The later stages need the result of this one.
+                    break
+        return found
+
+    def run(self, count=10):
+        """
+        Checks the given number of random expressions.
+
+        :param count: the number of expressions to check
+        :type count: int
+        :returns: the (minimized) problems found, without duplicates
+        :rtype: list of Reproducer
+        """
+
+        found = {}
+        for _ in range(count):
+            for reproducer in self.check(self.generator.expression()):
+                # Failures of a stage are the same problem whatever grows,
+                # so only the one with the smallest example is kept.
+                key = (
+                    reproducer.stage,
+                    reproducer.family,
+                    reproducer.failure.__class__
+                    if reproducer.failure is not None
+                    else reproducer.base,
+                )
+                if key not in found \
+                        or len(reproducer.example) < len(found[key].example):
+                    found[key] = reproducer
+        return [found[key] for key in sorted(found, key=str)]
+
+
+def _chain(signature):
+    def grow(base, size):
+        return (' %s ' % (signature.name,)).join(['(%s)' % (base,)] * size)
+    return grow
+
+
+def _nest(signature):
+    def grow(base, size):
+        source = base
+        atomic = False
+        for _ in range(size):
+            source = signature.render([(source, atomic)])
+            atomic = signature.kind == 'function'
+        return source
+    return grow
+
+
+def _subexpressions(source):
+    # The source of every node of the expression's AST.
+    try:
+        tree = Parser().parse(source)
+    except BexlError:
+        return []
+    lines = source.splitlines(True)
+    found = []
+    pending = [tree]
+    while pending:
+        node = pending.pop()
+        if not isinstance(node, Expression):
+            continue
+        start, end = node.start_token, node.end_token
+        if start.line == end.line:
+            line = lines[start.line]
+            column = start.column
+            if column and line[column - 1] == '$':
+                # The tokens of variables don't include the "$".
+                column -= 1
+            found.append(line[column:end.column + end.length])
+        pending.extend(node.children)
+    return found
+
+
+def find_pathological(
+        generator=None,
+        count=10,
+        sizes=(16, 32, 64, 128),
+        threshold=1.5,
+        stages=('lex', 'parse', 'evaluate'),
+        min_time=0.005):
+    """
+    Looks for expressions whose lexing, parsing or evaluation takes time
+    that grows faster than linearly with their size, or that fail once they
+    are big enough (see PathologicalSearch).
+
+    :param generator:
+        the generator of the expressions to grow. If not specified, one with
+        the default settings is used.
+    :type generator: ExpressionGenerator
+    :param count: the number of random expressions to check
+    :type count: int
+    :param sizes: the sizes to grow the expressions to
+    :type sizes: list of int
+    :param threshold:
+        the exponent of the growth of time above which it is considered a
+        problem
+    :type threshold: float
+    :param stages: the stages to time: "lex", "parse" and/or "evaluate"
+    :type stages: list of str
+    :param min_time:
+        the minimum number of seconds each timing should take, for accuracy
+    :type min_time: float
+    :rtype: list of Reproducer
+    """
+
+    return PathologicalSearch(
+        generator or ExpressionGenerator(),
+        sizes=sizes,
+        threshold=threshold,
+        stages=stages,
+        min_time=min_time,
+    ).run(count)
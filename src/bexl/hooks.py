@@ -0,0 +1,352 @@
+from .compiler import CompiledExpression, Compiler
+from .dispatcher import DEFAULT_REGISTRY, DispatcherWrapper
+from .errors import InterpreterError
+from .interpreter import Interpreter
+
+
+# The events that hooks can be notified of.
+EVENTS = (
+    'enter',
+    'exit',
+    'variable',
+    'dispatch',
+    'error',
+)
+
+
+def _compile_hooked(tree, hooks, registry=None):
+    return HookedCompiler(hooks, registry=registry).compile(tree)
+
+
+class EvaluationHooks(object):
+    """
+    The callbacks that a HookedInterpreter or HookedCompiler invokes as it
+    evaluates an expression, for building tracers, profilers, coverage tools
+    and the like. Subclasses override the callbacks for the events they're
+    interested in; only the overridden callbacks are invoked, and evaluation
+    doesn't pay for the others.
+
+    Every node that is entered is then either exited or has an error raised
+    from it.
+    """
+
+    def enter(self, node):
+        """
+        Invoked before a node of the AST is evaluated.
+
+        :param node: the node
+        :type node: bexl.nodes.Expression
+        """
+
+    def exit(self, node, value):
+        """
+        Invoked after a node of the AST was evaluated.
+
+        :param node: the node
+        :type node: bexl.nodes.Expression
+        :param value: the value of the node
+        :type value: bexl.Value
+        """
+
+    def variable(self, node, value):
+        """
+        Invoked after a variable was resolved.
+
+        :param node: the node of the variable
+        :type node: bexl.nodes.Variable
+        :param value: the value of the variable
+        :type value: bexl.Value
+        """
+
+    def dispatch(self, name, implementation, arguments):
+        """
+        Invoked before a function is invoked, including those that operators,
+        property access, indexing and slicing are implemented by.
+
+        :param name: the name of the function
+        :type name: str
+        :param implementation:
+            the implementation the function was dispatched to
+        :type implementation: callable
+        :param arguments: the arguments it is invoked with
+        :type arguments: tuple of bexl.Value
+        """
+
+    def error(self, node, error):
+        """
+        Invoked when an error is raised from the evaluation of a node of the
+        AST. It is invoked for the node the error is attributed to, and then
+        for each of the nodes it propagates through.
+
+        :param node: the node
+        :type node: bexl.nodes.Expression
+        :param error: the error
+        :type error: bexl.InterpreterError
+        """
+
+
+def _callback(hooks, event):
+    # A callable that invokes the given callback of all the hooks that
+    # override it, or None if none do.
+    default = getattr(EvaluationHooks, event)
+    callbacks = [
+        getattr(hook, event)
+        for hook in hooks
+        if getattr(type(hook), event, default) is not default
+    ]
+    if not callbacks:
+        return None
+    if len(callbacks) == 1:
+        return callbacks[0]
+
+    def broadcast(*args):
+        for callback in callbacks:
+            callback(*args)
+    return broadcast
+
+
+class HookSet(object):
+    """
+    The callbacks of a sequence of EvaluationHooks, combined.
+
+    :param hooks: the hooks
+    :type hooks: EvaluationHooks|list of EvaluationHooks
+    """
+
+    def __init__(self, hooks=None):
+        if isinstance(hooks, EvaluationHooks):
+            hooks = [hooks]
+        self.hooks = list(hooks or [])
+        for event in EVENTS:
+            setattr(self, event, _callback(self.hooks, event))
+
+    def __bool__(self):
+        return any([getattr(self, event) is not None for event in EVENTS])
+
+    __nonzero__ = __bool__
+
+    def instrument(self, registry):
+        """
+        Returns a registry with the same operators and functions as the given
+        one, which notifies the hooks of the functions it dispatches to. If
+        no hook is interested, the registry itself is returned.
+
+        :param registry: the registry to instrument
+        :type registry: bexl.dispatcher.FunctionRegistry
+        :rtype: bexl.dispatcher.FunctionRegistry
+        """
+
+        if self.dispatch is None:
+            return registry
+        return registry.rebind(
+            HookedDispatcher(registry.functions, self.dispatch),
+        )
+
+
+class HookedDispatcher(DispatcherWrapper):
+    """
+    Wraps a Dispatcher so that a callback is notified of the implementation
+    that each call is dispatched to.
+
+    :param dispatcher: the Dispatcher to wrap
+    :type dispatcher: bexl.dispatcher.Dispatcher
+    :param callback: the callback (see EvaluationHooks.dispatch())
+    :type callback: callable
+    """
+
+    def __init__(self, dispatcher, callback):
+        super(HookedDispatcher, self).__init__(dispatcher)
+        self.callback = callback
+
+    def call(self, name, *args):
+        self.callback(name, self.dispatcher.resolve(name, *args), args)
+        return self.dispatcher.call(name, *args)
+
+
+class HookedInterpreter(Interpreter):
+    """
+    An Interpreter that notifies EvaluationHooks of its progress.
+
+    :param hooks: the hooks to notify
+    :type hooks: EvaluationHooks|list of EvaluationHooks
+    :param registry: the registry of the operators and functions to use
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, hooks, registry=None):
+        super(HookedInterpreter, self).__init__(registry=registry)
+        self.hooks = HookSet(hooks)
+        self.registry = self.hooks.instrument(self.registry)
+
+    def _visit(self, visit, node, resolver):
+        hooks = self.hooks
+        if hooks.enter is not None:
+            hooks.enter(node)
+        try:
+            value = visit(node, resolver)
+        except InterpreterError as exc:
+            if hooks.error is not None:
+                hooks.error(node, exc)
+            raise
+        if hooks.exit is not None:
+            hooks.exit(node, value)
+        return value
+
+    def visit_literal(self, node, resolver):
+        return self._visit(
+            super(HookedInterpreter, self).visit_literal,
+            node,
+            resolver,
+        )
+
+    def visit_grouping(self, node, resolver):
+        return self._visit(
+            super(HookedInterpreter, self).visit_grouping,
+            node,
+            resolver,
+        )
+
+    def visit_list(self, node, resolver):
+        return self._visit(
+            super(HookedInterpreter, self).visit_list,
+            node,
+            resolver,
+        )
+
+    def _visit_variable(self, node, resolver):
+        value = super(HookedInterpreter, self).visit_variable(node, resolver)
+        if self.hooks.variable is not None:
+            self.hooks.variable(node, value)
+        return value
+
+    def visit_variable(self, node, resolver):
+        return self._visit(self._visit_variable, node, resolver)
+
+    def visit_property(self, node, resolver):
+        return self._visit(
+            super(HookedInterpreter, self).visit_property,
+            node,
+            resolver,
+        )
+
+    def visit_indexing(self, node, resolver):
+        return self._visit(
+            super(HookedInterpreter, self).visit_indexing,
+            node,
+            resolver,
+        )
+
+    def visit_unary(self, node, resolver):
+        return self._visit(
+            super(HookedInterpreter, self).visit_unary,
+            node,
+            resolver,
+        )
+
+    def visit_binary(self, node, resolver):
+        return self._visit(
+            super(HookedInterpreter, self).visit_binary,
+            node,
+            resolver,
+        )
+
+    def visit_function(self, node, resolver):
+        return self._visit(
+            super(HookedInterpreter, self).visit_function,
+            node,
+            resolver,
+        )
+
+
+class HookedExpression(CompiledExpression):
+    """
+    A CompiledExpression that notifies EvaluationHooks of the progress of its
+    evaluations.
+
+    :param tree: the parsed AST the expression was compiled from
+    :type tree: bexl.nodes.Expression
+    :param function: the compiled closure that evaluates the expression
+    :type function: callable
+    :param registry:
+        the registry of the operators and functions the expression was
+        compiled with
+    :type registry: bexl.dispatcher.FunctionRegistry
+    :param hooks: the hooks to notify
+    :type hooks: HookSet
+    """
+
+    def __init__(self, tree, function, registry, hooks):
+        super(HookedExpression, self).__init__(tree, function, registry)
+        self.hooks = hooks
+
+    def __reduce__(self):
+        if self.registry is DEFAULT_REGISTRY:
+            return _compile_hooked, (self.tree, self.hooks.hooks)
+        return _compile_hooked, (self.tree, self.hooks.hooks, self.registry)
+
+
+class HookedCompiler(Compiler):
+    """
+    A Compiler whose expressions notify EvaluationHooks of the progress of
+    their evaluations.
+
+    The callbacks are compiled into the expression, rather than checked for
+    as it is evaluated: nodes are only wrapped for the events that the hooks
+    are interested in, and if they aren't interested in any, the expression
+    is the same as one produced by the Compiler, so it carries no overhead.
+
+    :param hooks: the hooks to notify
+    :type hooks: EvaluationHooks|list of EvaluationHooks
+    :param registry: the registry of the operators and functions to use
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, hooks, registry=None):
+        super(HookedCompiler, self).__init__(registry=registry)
+        self.hooks = HookSet(hooks)
+        self.uninstrumented_registry = self.registry
+        self.registry = self.hooks.instrument(self.registry)
+
+    def compile(self, tree):
+        if not self.hooks:
+            return Compiler(registry=self.registry).compile(tree)
+        return HookedExpression(
+            tree,
+            self.compile_node(tree),
+            self.uninstrumented_registry,
+            self.hooks,
+        )
+
+    def compile_node(self, node):
+        compiled = super(HookedCompiler, self).compile_node(node)
+        enter = self.hooks.enter
+        exit_ = self.hooks.exit
+        error = self.hooks.error
+        if enter is None and exit_ is None and error is None:
+            return compiled
+
+        def hooked(context):
+            if enter is not None:
+                enter(node)
+            try:
+                value = compiled(context)
+            except InterpreterError as exc:
+                if error is not None:
+                    error(node, exc)
+                raise
+            if exit_ is not None:
+                exit_(node, value)
+            return value
+        return hooked
+
+    def visit_variable(self, node):
+        compiled = super(HookedCompiler, self).visit_variable(node)
+        callback = self.hooks.variable
+        if callback is None:
+            return compiled
+
+        def hooked_variable(context):
+            value = compiled(context)
+            callback(node, value)
+            return value
+        return hooked_variable
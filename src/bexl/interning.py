@@ -0,0 +1,261 @@
+from .dispatcher import FUNCTIONS
+from .interpreter import Interpreter
+from .lexer import Lexer
+from .nodes import Binary, Unary, Literal, Function, Variable, Grouping, \
+    List, Indexing, Property
+from .parser import Parser
+from .resolver import VariableResolver
+
+
+class NodeInterner(object):
+    """
+    Interns structurally identical subtrees of ASTs into shared nodes
+    (hash-consing), so that a subtree like ``lower(trim($email))`` is only
+    held in memory once no matter how many expressions contain it.
+
+    Interned nodes are shared between trees, so they must not be modified.
+    A shared node keeps the Tokens of the first occurrence that was
+    interned, so errors raised while evaluating it point at that occurrence.
+
+    :param lexer: the Lexer to use when parsing expressions
+    :type lexer: bexl.Lexer
+    :param parser: the Parser to use when parsing expressions
+    :type parser: bexl.Parser
+    :param functions: the Dispatcher used to determine function purity
+    :type functions: bexl.dispatcher.Dispatcher
+    """
+
+    def __init__(self, lexer=Lexer, parser=Parser, functions=FUNCTIONS):
+        self.lexer = lexer
+        self.parser = parser
+        self.functions = functions
+        self.node_count = 0
+        self._nodes = {}
+        self._info = {}
+
+    @property
+    def unique_count(self):
+        """
+        The number of distinct nodes held by this interner.
+        """
+
+        return len(self._nodes)
+
+    @property
+    def dedup_ratio(self):
+        """
+        The number of nodes interned for every distinct node held.
+        """
+
+        if not self._nodes:
+            return 1.0
+        return float(self.node_count) / len(self._nodes)
+
+    def parse(self, source):
+        """
+        Parses the source string and returns its interned AST.
+
+        :param source: the source code to parse
+        :type source: str
+        :rtype: bexl.nodes.Expression
+        """
+
+        return self.intern(self.parser(lexer=self.lexer).parse(source))
+
+    def parse_many(self, sources):
+        """
+        Parses the source strings and returns their interned ASTs.
+
+        :param sources: the source code to parse
+        :type sources: list of str
+        :rtype: list of bexl.nodes.Expression
+        """
+
+        parser = self.parser(lexer=self.lexer)
+        return [
+            self.intern(parser.parse(source))
+            for source in sources
+        ]
+
+    def intern(self, tree):
+        """
+        Returns the interned equivalent of the AST.
+
+        :param tree: the parsed AST to intern
+        :type tree: bexl.nodes.Expression
+        :rtype: bexl.nodes.Expression
+        """
+
+        self.node_count += 1
+        children = [self.intern(child) for child in tree.children]
+        key = self._key(tree, children)
+
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = self._rebuild(tree, children)
+            self._info[id(node)] = [
+                0,
+                all([self.is_pure(child) for child in children])
+                and (
+                    not isinstance(node, Function)
+                    or self.functions.metadata(node.name).get('pure', True)
+                ),
+            ]
+        self._info[id(node)][0] += 1
+        return node
+
+    def uses(self, node):
+        """
+        Returns the number of times the interned node has been referenced by
+        interned trees.
+
+        :param node: the interned node
+        :type node: bexl.nodes.Expression
+        :rtype: int
+        """
+
+        return self._info[id(node)][0]
+
+    def is_pure(self, node):
+        """
+        Returns whether the interned node always produces the same result for
+        the same variables.
+
+        :param node: the interned node
+        :type node: bexl.nodes.Expression
+        :rtype: bool
+        """
+
+        return self._info[id(node)][1]
+
+    def _key(self, node, children):  # noqa: no-self-use
+        children = tuple([id(child) for child in children])
+
+        if isinstance(node, Literal):
+            return (
+                Literal,
+                node.data_type,
+                type(node.value),
+                node.value,
+            )
+        if isinstance(node, (Unary, Binary, Function, Variable, Property)):
+            return (type(node), node.name, children)
+        if isinstance(node, Indexing):
+            return (
+                Indexing,
+                node.index is not None,
+                node.start is not None,
+                node.end is not None,
+                children,
+            )
+        return (type(node), children)
+
+    def _rebuild(self, node, children):  # noqa: no-self-use
+        if isinstance(node, (Literal, Variable)):
+            return node
+        if isinstance(node, Unary):
+            rebuilt = Unary(node.operator, children[0])
+        elif isinstance(node, Binary):
+            rebuilt = Binary(children[0], node.operator, children[1])
+        elif isinstance(node, (Function, List)):
+            rebuilt = type(node)(node.start_token, node.end_token, children)
+        elif isinstance(node, Indexing):
+            optional = iter(children[1:])
+            rebuilt = Indexing(
+                node.start_token,
+                node.end_token,
+                children[0],
+                index=next(optional) if node.index is not None else None,
+                start=next(optional) if node.start is not None else None,
+                end=next(optional) if node.end is not None else None,
+            )
+        elif isinstance(node, (Grouping, Property)):
+            rebuilt = type(node)(node.start_token, node.end_token, children[0])
+        rebuilt.start_token = node.start_token
+        rebuilt.end_token = node.end_token
+        return rebuilt
+
+
+class MemoizingInterpreter(Interpreter):
+    """
+    An Interpreter for evaluating many interned ASTs against the same
+    variables. Pure subtrees that are shared between the ASTs are only
+    evaluated once.
+
+    :param interner: the NodeInterner that produced the ASTs
+    :type interner: NodeInterner
+    :param registry: the registry of the operators and functions to use
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, interner, registry=None):
+        super(MemoizingInterpreter, self).__init__(registry=registry)
+        self.interner = interner
+        self._memo = {}
+
+    def interpret_many(self, trees, variable_resolver=None):
+        """
+        Interprets the ASTs and produces their resulting values
+
+        :param trees: the interned ASTs to interpret
+        :type trees: list of bexl.nodes.Expression
+        :param variable_resolver:
+            the mechanism used to retrieve the Value for variables referenced
+            in the expressions
+        :type variable_resolver: bexl.VariableResolver|dict
+        :rtype: list of bexl.Value
+        """
+
+        resolver = VariableResolver.make_from(variable_resolver)
+        self._memo = {}
+        try:
+            return [
+                tree.accept(self, resolver=resolver)
+                for tree in trees
+            ]
+        finally:
+            self._memo = {}
+
+    def _memoized(self, visit, node, resolver):
+        key = id(node)
+        if key in self._memo:
+            return self._memo[key]
+        value = visit(node, resolver)
+        if self.interner.uses(node) > 1 and self.interner.is_pure(node):
+            self._memo[key] = value
+        return value
+
+    def visit_property(self, node, resolver):
+        return self._memoized(
+            super(MemoizingInterpreter, self).visit_property,
+            node,
+            resolver,
+        )
+
+    def visit_indexing(self, node, resolver):
+        return self._memoized(
+            super(MemoizingInterpreter, self).visit_indexing,
+            node,
+            resolver,
+        )
+
+    def visit_unary(self, node, resolver):
+        return self._memoized(
+            super(MemoizingInterpreter, self).visit_unary,
+            node,
+            resolver,
+        )
+
+    def visit_binary(self, node, resolver):
+        return self._memoized(
+            super(MemoizingInterpreter, self).visit_binary,
+            node,
+            resolver,
+        )
+
+    def visit_function(self, node, resolver):
+        return self._memoized(
+            super(MemoizingInterpreter, self).visit_function,
+            node,
+            resolver,
+        )
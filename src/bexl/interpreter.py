@@ -2,10 +2,22 @@ import sys
 
 from six import reraise
 
-from .dispatcher import UNARY_OPERATORS, BINARY_OPERATORS, FUNCTIONS
+from .dispatcher import DEFAULT_REGISTRY
 from .errors import InterpreterError
 from .resolver import VariableResolver
-from .types import make_value, Types
+from .token import TokenType
+from .types import make_value, cast, Types
+
+
+# The binary operators that don't evaluate their right operand when the
+# boolean value of their left operand decides the result, mapped to that
+# deciding value. The Compiler, the other interpreters, the canonical form
+# and the rule index all follow this mapping, so an operator that is removed
+# from it evaluates both of its operands everywhere.
+SHORT_CIRCUITS = {
+    TokenType.AMPERSAND: False,
+    TokenType.PIPE: True,
+}
 
 
 def wrap_and_raise(node):
@@ -18,8 +30,16 @@ class Interpreter(object):
     """
     An interpreter for REXL. Interprets the output of a parser and returns the
     resulting value of the expression.
+
+    :param registry:
+        the registry of the operators and functions to use. If not
+        specified, bexl.dispatcher.DEFAULT_REGISTRY is used.
+    :type registry: bexl.dispatcher.FunctionRegistry
     """
 
+    def __init__(self, registry=None):
+        self.registry = registry or DEFAULT_REGISTRY
+
     def interpret(self, tree, variable_resolver=None):
         """
         Interprets the AST and produces the resulting value
@@ -59,7 +79,7 @@ class Interpreter(object):
         expression = node.expression.accept(self, resolver=resolver)
         prop = make_value(Types.STRING, node.name)
         try:
-            return FUNCTIONS.call('property', expression, prop)
+            return self.registry.functions.call('property', expression, prop)
         except InterpreterError:
             wrap_and_raise(node)
 
@@ -68,7 +88,7 @@ class Interpreter(object):
         if node.index is not None:
             index = node.index.accept(self, resolver=resolver)
             try:
-                return FUNCTIONS.call('at', expression, index)
+                return self.registry.functions.call('at', expression, index)
             except InterpreterError:
                 wrap_and_raise(node)
 
@@ -83,8 +103,17 @@ class Interpreter(object):
 
             try:
                 if end:
-                    return FUNCTIONS.call('slice', expression, start, end)
-                return FUNCTIONS.call('slice', expression, start)
+                    return self.registry.functions.call(
+                        'slice',
+                        expression,
+                        start,
+                        end,
+                    )
+                return self.registry.functions.call(
+                    'slice',
+                    expression,
+                    start,
+                )
             except InterpreterError:
                 wrap_and_raise(node)
 
@@ -92,16 +121,25 @@ class Interpreter(object):
         right = node.right.accept(self, resolver=resolver)
 
         try:
-            return UNARY_OPERATORS.call(node.name, right)
+            return self.registry.unary_operators.call(node.name, right)
         except InterpreterError:
             wrap_and_raise(node)
 
     def visit_binary(self, node, resolver):
         left = node.left.accept(self, resolver=resolver)
+
+        if node.name in SHORT_CIRCUITS:
+            decider = SHORT_CIRCUITS[node.name]
+            try:
+                if cast(left, Types.BOOLEAN).raw_value is decider:
+                    return make_value(Types.BOOLEAN, decider)
+            except InterpreterError:
+                wrap_and_raise(node)
+
         right = node.right.accept(self, resolver=resolver)
 
         try:
-            return BINARY_OPERATORS.call(
+            return self.registry.binary_operators.call(
                 node.name,
                 left,
                 right,
@@ -116,7 +154,7 @@ class Interpreter(object):
         ]
 
         try:
-            return FUNCTIONS.call(node.name, *arguments)
+            return self.registry.functions.call(node.name, *arguments)
         except InterpreterError:
             wrap_and_raise(node)
 
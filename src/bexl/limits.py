@@ -0,0 +1,324 @@
+import time
+
+from .compiler import CompiledExpression, Compiler, EvaluationContext
+from .dispatcher import DEFAULT_REGISTRY
+from .errors import InterpreterError, LimitExceededError
+from .interpreter import Interpreter, wrap_and_raise
+from .resolver import VariableResolver
+
+
+def _compile_limited(tree, limits, registry=None):
+    return LimitedCompiler(limits, registry=registry).compile(tree)
+
+
+class ExecutionLimits(object):
+    """
+    The limits that evaluations of untrusted expressions are subject to.
+    An evaluation that exceeds one of them raises a LimitExceededError.
+
+    :param max_steps:
+        the maximum number of nodes of the AST that may be evaluated
+    :type max_steps: int
+    :param timeout:
+        the maximum number of seconds an evaluation may take. It is checked
+        before each node is evaluated, so a single slow function call can
+        still overrun it.
+    :type timeout: float
+    :param max_allocation:
+        the maximum total size, in characters or list elements, of the lists
+        built and of the results of functions registered with an
+        ``allocation`` estimate (such as repeat() and concat()), checked
+        before they are built
+    :type max_allocation: int
+    """
+
+    __slots__ = (
+        'max_steps',
+        'timeout',
+        'max_allocation',
+    )
+
+    def __init__(self, max_steps=None, timeout=None, max_allocation=None):
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.max_allocation = max_allocation
+
+    def __bool__(self):
+        return self.max_steps is not None \
+            or self.timeout is not None \
+            or self.max_allocation is not None
+
+    __nonzero__ = __bool__
+
+    def __getstate__(self):
+        return (self.max_steps, self.timeout, self.max_allocation)
+
+    def __setstate__(self, state):
+        self.max_steps, self.timeout, self.max_allocation = state
+
+    def __repr__(self):
+        return '%s(max_steps=%r, timeout=%r, max_allocation=%r)' % (
+            self.__class__.__name__,
+            self.max_steps,
+            self.timeout,
+            self.max_allocation,
+        )
+
+    def start(self):
+        """
+        Returns the budget of a new evaluation subject to these limits.
+
+        :rtype: ExecutionBudget
+        """
+
+        return ExecutionBudget(self)
+
+
+class ExecutionBudget(object):
+    """
+    Tracks the resources used by a single evaluation against its
+    ExecutionLimits.
+
+    :param limits: the limits of the evaluation
+    :type limits: ExecutionLimits
+    """
+
+    __slots__ = (
+        'limits',
+        'steps',
+        'allocated',
+        'deadline',
+    )
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.steps = 0
+        self.allocated = 0
+        self.deadline = None
+        if limits.timeout is not None:
+            self.deadline = time.time() + limits.timeout
+
+    def step(self, node=None):
+        """
+        Records the evaluation of a node.
+
+        :param node: the node being evaluated
+        :type node: bexl.nodes.Expression
+        :raises: LimitExceededError if the evaluation has evaluated too many
+            nodes or taken too long
+        """
+
+        self.steps += 1
+        max_steps = self.limits.max_steps
+        if max_steps is not None and self.steps > max_steps:
+            raise LimitExceededError(
+                'Evaluation exceeded %s steps' % (max_steps,),
+                node=node,
+                limit='max_steps',
+            )
+        if self.deadline is not None and time.time() > self.deadline:
+            raise LimitExceededError(
+                'Evaluation exceeded %s seconds' % (self.limits.timeout,),
+                node=node,
+                limit='timeout',
+            )
+
+    def allocate(self, size, node=None):
+        """
+        Records the allocation of a string or list of the given size.
+
+        :param size: the number of characters or list elements allocated
+        :type size: int
+        :param node: the node performing the allocation
+        :type node: bexl.nodes.Expression
+        :raises: LimitExceededError if the evaluation has allocated too much
+        """
+
+        self.allocated += size
+        max_allocation = self.limits.max_allocation
+        if max_allocation is not None and self.allocated > max_allocation:
+            raise LimitExceededError(
+                'Evaluation exceeded an allocation of %s' % (max_allocation,),
+                node=node,
+                limit='max_allocation',
+            )
+
+
+class LimitedInterpreter(Interpreter):
+    """
+    An Interpreter whose evaluations are subject to ExecutionLimits.
+
+    :param limits: the limits of each evaluation
+    :type limits: ExecutionLimits
+    :param registry: the registry of the operators and functions to use
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, limits, registry=None):
+        super(LimitedInterpreter, self).__init__(registry=registry)
+        self.limits = limits
+        self.budget = None
+
+    def interpret(self, tree, variable_resolver=None):
+        self.budget = self.limits.start()
+        return super(LimitedInterpreter, self).interpret(
+            tree,
+            variable_resolver=variable_resolver,
+        )
+
+    def visit_literal(self, node, resolver):
+        self.budget.step(node)
+        return super(LimitedInterpreter, self).visit_literal(node, resolver)
+
+    def visit_grouping(self, node, resolver):
+        self.budget.step(node)
+        return super(LimitedInterpreter, self).visit_grouping(node, resolver)
+
+    def visit_list(self, node, resolver):
+        self.budget.step(node)
+        self.budget.allocate(len(node.elements), node)
+        return super(LimitedInterpreter, self).visit_list(node, resolver)
+
+    def visit_variable(self, node, resolver):
+        self.budget.step(node)
+        return super(LimitedInterpreter, self).visit_variable(node, resolver)
+
+    def visit_property(self, node, resolver):
+        self.budget.step(node)
+        return super(LimitedInterpreter, self).visit_property(node, resolver)
+
+    def visit_indexing(self, node, resolver):
+        self.budget.step(node)
+        return super(LimitedInterpreter, self).visit_indexing(node, resolver)
+
+    def visit_unary(self, node, resolver):
+        self.budget.step(node)
+        return super(LimitedInterpreter, self).visit_unary(node, resolver)
+
+    def visit_binary(self, node, resolver):
+        self.budget.step(node)
+        return super(LimitedInterpreter, self).visit_binary(node, resolver)
+
+    def visit_function(self, node, resolver):
+        self.budget.step(node)
+        functions = self.registry.functions
+        estimate = functions.metadata(node.name).get('allocation')
+        if estimate is None:
+            return super(LimitedInterpreter, self).visit_function(
+                node,
+                resolver,
+            )
+
+        arguments = [
+            subnode.accept(self, resolver=resolver)
+            for subnode in node.arguments
+        ]
+        try:
+            functions.resolve(node.name, *arguments)
+            self.budget.allocate(estimate(*arguments), node)
+            return functions.call(node.name, *arguments)
+        except InterpreterError:
+            wrap_and_raise(node)
+
+
+class LimitedExpression(CompiledExpression):
+    """
+    A CompiledExpression whose evaluations are subject to ExecutionLimits.
+
+    :param tree: the parsed AST the expression was compiled from
+    :type tree: bexl.nodes.Expression
+    :param function: the compiled closure that evaluates the expression
+    :type function: callable
+    :param registry:
+        the registry of the operators and functions the expression was
+        compiled with
+    :type registry: bexl.dispatcher.FunctionRegistry
+    :param limits: the limits of each evaluation
+    :type limits: ExecutionLimits
+    """
+
+    def __init__(self, tree, function, registry, limits):
+        super(LimitedExpression, self).__init__(tree, function, registry)
+        self.limits = limits
+
+    def evaluate(self, variable_resolver=None):
+        resolver = VariableResolver.make_from(variable_resolver)
+        return self._function(
+            EvaluationContext(resolver, budget=self.limits.start()),
+        )
+
+    __call__ = evaluate
+
+    def __reduce__(self):
+        if self.registry is DEFAULT_REGISTRY:
+            return _compile_limited, (self.tree, self.limits)
+        return _compile_limited, (self.tree, self.limits, self.registry)
+
+
+class LimitedCompiler(Compiler):
+    """
+    A Compiler whose expressions are subject to ExecutionLimits when they are
+    evaluated. Expressions compiled without any limits are the same as those
+    produced by the Compiler, so they carry no overhead.
+
+    :param limits: the limits of each evaluation
+    :type limits: ExecutionLimits
+    :param registry: the registry of the operators and functions to use
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, limits, registry=None):
+        super(LimitedCompiler, self).__init__(registry=registry)
+        self.limits = limits
+
+    def compile(self, tree):
+        if not self.limits:
+            return Compiler(registry=self.registry).compile(tree)
+        return LimitedExpression(
+            tree,
+            self.compile_node(tree),
+            self.registry,
+            self.limits,
+        )
+
+    def compile_node(self, node):
+        compiled = super(LimitedCompiler, self).compile_node(node)
+
+        def limited(context):
+            context.budget.step(node)
+            return compiled(context)
+        return limited
+
+    def visit_list(self, node):
+        compiled = super(LimitedCompiler, self).visit_list(node)
+        size = len(node.elements)
+
+        def allocating_list(context):
+            context.budget.allocate(size, node)
+            return compiled(context)
+        return allocating_list
+
+    def visit_function(self, node):
+        functions = self.registry.functions
+        estimate = functions.metadata(node.name).get('allocation')
+        if estimate is None:
+            return super(LimitedCompiler, self).visit_function(node)
+
+        arguments = [
+            self.compile_node(subnode)
+            for subnode in node.arguments
+        ]
+        name = node.name
+
+        def allocating_function(context):
+            values = [
+                argument(context)
+                for argument in arguments
+            ]
+            try:
+                functions.resolve(name, *values)
+                context.budget.allocate(estimate(*values), node)
+                return functions.call(name, *values)
+            except InterpreterError:
+                wrap_and_raise(node)
+        return allocating_function
@@ -0,0 +1,339 @@
+import bisect
+import os
+import tempfile
+import threading
+import time
+
+from six import iteritems
+
+from .errors import DispatchError
+
+
+# The upper bounds, in seconds, of the buckets of the latency histograms, if
+# not specified.
+DEFAULT_BUCKETS = (
+    0.000001,
+    0.000005,
+    0.00001,
+    0.00005,
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.1,
+    1.0,
+)
+
+_timer = getattr(time, 'perf_counter', time.time)  # noqa: invalid-name
+
+
+def _signature(args):
+    return tuple([arg.data_type for arg in args])
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_float(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class SignatureMetrics(object):
+    """
+    The calls to a function with arguments of one combination of types.
+
+    :param buckets: the upper bounds of the buckets of the latency histogram
+    :type buckets: tuple of float
+    """
+
+    __slots__ = (
+        'calls',
+        'errors',
+        'seconds',
+        'bucket_counts',
+    )
+
+    def __init__(self, buckets):
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        # The last count is of the calls slower than the last bucket.
+        self.bucket_counts = [0] * (len(buckets) + 1)
+
+    def __getstate__(self):
+        return (self.calls, self.errors, self.seconds, self.bucket_counts)
+
+    def __setstate__(self, state):
+        self.calls, self.errors, self.seconds, self.bucket_counts = state
+
+
+class DispatchMetrics(object):
+    """
+    Records how often the functions of a Dispatcher are invoked, how long
+    they take, and how often they can't be dispatched (a DispatchError), per
+    function name and per combination of argument types. The metrics can be
+    read with snapshot(), or exported for Prometheus with
+    write_prometheus().
+
+    Metrics are recorded by the Dispatchers they are assigned to::
+
+        metrics = DispatchMetrics()
+        bexl.STANDARD_REGISTRY.functions.metrics = metrics
+
+    Only the calls made through Dispatcher.call() are recorded, which
+    excludes the batch and asynchronous functions invoked by bexl.batch and
+    bexl.asynchronous. Dispatchers without metrics record nothing.
+
+    The metrics may be recorded from many threads at once.
+
+    :param buckets:
+        the upper bounds, in seconds, of the buckets of the latency
+        histograms. If not specified, buckets from a microsecond to a second
+        are used.
+    :type buckets: iterable of float
+    """
+
+    def __init__(self, buckets=None):
+        self.buckets = tuple(sorted(buckets or DEFAULT_BUCKETS))
+        self._signatures = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        with self._lock:
+            return (self.buckets, dict(self._signatures))
+
+    def __setstate__(self, state):
+        self.buckets, self._signatures = state
+        self._lock = threading.Lock()
+
+    def _entry(self, name, args):
+        key = (name, _signature(args))
+        entry = self._signatures.get(key)
+        if entry is None:
+            entry = self._signatures[key] = SignatureMetrics(self.buckets)
+        return entry
+
+    def record(self, name, args, seconds):
+        """
+        Records a call to a function.
+
+        :param name: the name of the function
+        :type name: str
+        :param args: the arguments it was invoked with
+        :type args: tuple of bexl.Value
+        :param seconds: the time the call took
+        :type seconds: float
+        """
+
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            entry = self._entry(name, args)
+            entry.calls += 1
+            entry.seconds += seconds
+            entry.bucket_counts[bucket] += 1
+
+    def record_error(self, name, args):
+        """
+        Records a call to a function that could not be dispatched.
+
+        :param name: the name of the function
+        :type name: str
+        :param args: the arguments it was invoked with
+        :type args: tuple of bexl.Value
+        """
+
+        with self._lock:
+            self._entry(name, args).errors += 1
+
+    def observe(self, func, name, args):
+        """
+        Invokes a callable that calls the given function, recording the call.
+
+        :param func: the callable, which accepts the name and the arguments
+        :type func: callable
+        :param name: the name of the function
+        :type name: str
+        :param args: the arguments to invoke it with
+        :type args: tuple of bexl.Value
+        :returns: the value the callable returns
+        """
+
+        started = _timer()
+        try:
+            return func(name, *args)
+        except DispatchError:
+            self.record_error(name, args)
+            started = None
+            raise
+        finally:
+            if started is not None:
+                self.record(name, args, _timer() - started)
+
+    def reset(self):
+        """
+        Discards all the metrics recorded so far.
+        """
+
+        with self._lock:
+            self._signatures = {}
+
+    def snapshot(self):
+        """
+        Returns the metrics recorded so far, keyed by the name of the
+        function::
+
+            {
+                'add': {
+                    'calls': 3,
+                    'errors': 1,
+                    'seconds': 0.000012,
+                    'signatures': {
+                        ('integer', 'integer'): {
+                            'calls': 3,
+                            'errors': 0,
+                            'seconds': 0.000012,
+                            'buckets': [(0.000001, 0), ..., (inf, 3)],
+                        },
+                        ('string', 'integer'): {...},
+                    },
+                },
+            }
+
+        The buckets are cumulative, like those of a Prometheus histogram:
+        each is the number of calls that took at most its upper bound.
+
+        :rtype: dict
+        """
+
+        with self._lock:
+            entries = [
+                (key, entry.calls, entry.errors, entry.seconds,
+                 list(entry.bucket_counts))
+                for key, entry in iteritems(self._signatures)
+            ]
+
+        bounds = self.buckets + (float('inf'),)
+        functions = {}
+        for (name, signature), calls, errors, seconds, counts in entries:
+            function = functions.setdefault(name, {
+                'calls': 0,
+                'errors': 0,
+                'seconds': 0.0,
+                'signatures': {},
+            })
+            function['calls'] += calls
+            function['errors'] += errors
+            function['seconds'] += seconds
+
+            buckets = []
+            total = 0
+            for bound, count in zip(bounds, counts):
+                total += count
+                buckets.append((bound, total))
+            function['signatures'][signature] = {
+                'calls': calls,
+                'errors': errors,
+                'seconds': seconds,
+                'buckets': buckets,
+            }
+        return functions
+
+    def to_prometheus(self, prefix='bexl_function'):
+        """
+        Returns the metrics in the Prometheus text exposition format.
+
+        :param prefix: the prefix of the names of the metrics
+        :type prefix: str
+        :rtype: str
+        """
+
+        calls = []
+        errors = []
+        durations = []
+        snapshot = self.snapshot()
+        for name in sorted(snapshot):
+            signatures = snapshot[name]['signatures']
+            for signature in sorted(signatures):
+                metrics = signatures[signature]
+                labels = 'function="%s",signature="%s"' % (
+                    _escape(name),
+                    _escape(','.join(signature)),
+                )
+                calls.append('%s_calls_total{%s} %d' % (
+                    prefix,
+                    labels,
+                    metrics['calls'],
+                ))
+                errors.append('%s_dispatch_errors_total{%s} %d' % (
+                    prefix,
+                    labels,
+                    metrics['errors'],
+                ))
+                for bound, count in metrics['buckets']:
+                    durations.append(
+                        '%s_duration_seconds_bucket{%s,le="%s"} %d' % (
+                            prefix,
+                            labels,
+                            _format_float(bound),
+                            count,
+                        )
+                    )
+                durations.append('%s_duration_seconds_sum{%s} %s' % (
+                    prefix,
+                    labels,
+                    _format_float(metrics['seconds']),
+                ))
+                durations.append('%s_duration_seconds_count{%s} %d' % (
+                    prefix,
+                    labels,
+                    metrics['calls'],
+                ))
+
+        lines = [
+            '# HELP %s_calls_total Calls to BEXL functions.' % (prefix,),
+            '# TYPE %s_calls_total counter' % (prefix,),
+        ]
+        lines.extend(calls)
+        lines.extend([
+            '# HELP %s_dispatch_errors_total Calls to BEXL functions that'
+            ' could not be dispatched.' % (prefix,),
+            '# TYPE %s_dispatch_errors_total counter' % (prefix,),
+        ])
+        lines.extend(errors)
+        lines.extend([
+            '# HELP %s_duration_seconds The time calls to BEXL functions'
+            ' took.' % (prefix,),
+            '# TYPE %s_duration_seconds histogram' % (prefix,),
+        ])
+        lines.extend(durations)
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path, prefix='bexl_function'):
+        """
+        Writes the metrics to a file in the Prometheus text exposition
+        format, e.g. for the textfile collector of the node exporter. The
+        file is replaced atomically, so it is never read half-written.
+
+        :param path: the path of the file to write
+        :type path: str
+        :param prefix: the prefix of the names of the metrics
+        :type prefix: str
+        """
+
+        text = self.to_prometheus(prefix)
+        descriptor, temporary = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)),
+            prefix='.bexl-metrics-',
+        )
+        try:
+            with os.fdopen(descriptor, 'w') as output:
+                output.write(text)
+            getattr(os, 'replace', os.rename)(temporary, path)
+        except Exception:
+            os.remove(temporary)
+            raise
+
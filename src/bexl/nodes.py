@@ -3,12 +3,18 @@ from six import python_2_unicode_compatible
 
 @python_2_unicode_compatible
 class Expression(object):
+    __slots__ = ()
+
     def accept(self, visitor, **kwargs):
         return getattr(
             visitor,
             'visit_%s' % (self.__class__.__name__.lower(),),
         )(self, **kwargs)
 
+    @property
+    def children(self):  # noqa: no-self-use
+        return ()
+
     def pretty(self, indent=0, indent_increment=2):  # noqa: unused-argument,no-self-use
         return u' ' * indent
 
@@ -58,6 +64,10 @@ class Unary(Expression):
     def name(self):
         return self.operator.token_type
 
+    @property
+    def children(self):
+        return (self.right,)
+
     def pretty(self, indent=0, indent_increment=2):
         return u'{indent}{name}(\n{inner}{operator},\n{right}\n' \
             '{indent})'.format(
@@ -92,6 +102,10 @@ class Binary(Expression):
     def name(self):
         return self.operator.token_type
 
+    @property
+    def children(self):
+        return (self.left, self.right)
+
     def pretty(self, indent=0, indent_increment=2):
         return u'{indent}{name}(\n{inner}{operator},\n{left},\n' \
             '{right}\n{indent})'.format(
@@ -126,6 +140,10 @@ class Function(Expression):
     def name(self):
         return self.start_token.lexeme
 
+    @property
+    def children(self):
+        return tuple(self.arguments)
+
     def pretty(self, indent=0, indent_increment=2):
         args = [
             u'%s"%s"' % (
@@ -177,6 +195,10 @@ class Grouping(Expression):
         self.end_token = end_token
         self.expression = expression
 
+    @property
+    def children(self):
+        return (self.expression,)
+
     def pretty(self, indent=0, indent_increment=2):
         return u'{indent}{name}(\n{expr}\n{indent})'.format(
             indent=u' ' * indent,
@@ -200,6 +222,10 @@ class List(Expression):
         self.end_token = end_token
         self.elements = elements
 
+    @property
+    def children(self):
+        return tuple(self.elements)
+
     def pretty(self, indent=0, indent_increment=2):
         return u'{indent}{name}(\n{elements}\n{indent})'.format(
             indent=u' ' * indent,
@@ -216,6 +242,7 @@ class Indexing(Expression):
         'start_token',
         'end_token',
         'expression',
+        'index',
         'start',
         'end',
     )
@@ -235,6 +262,14 @@ class Indexing(Expression):
         self.start = start
         self.end = end
 
+    @property
+    def children(self):
+        return tuple([
+            child
+            for child in (self.expression, self.index, self.start, self.end)
+            if child is not None
+        ])
+
     def pretty(self, indent=0, indent_increment=2):
         if self.index is not None:
             loc = self.index.pretty(
@@ -282,6 +317,10 @@ class Property(Expression):
     def name(self):
         return self.end_token.lexeme
 
+    @property
+    def children(self):
+        return (self.expression,)
+
     def pretty(self, indent=0, indent_increment=2):
         return u'{indent}{name}(\n{inner}"{prop}",\n{expr}\n{indent})'.format(
             indent=u' ' * indent,
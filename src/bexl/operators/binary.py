@@ -1,4 +1,4 @@
-from ..dispatcher import BINARY_OPERATORS, FUNCTIONS
+from ..dispatcher import BINARY_OPERATORS, Delegate
 from ..token import TokenType
 from ..types import Types
 
@@ -24,7 +24,7 @@ SPECS = (
             (Types.INTEGER, Types.TIME),
             (Types.FLOAT, Types.TIME),
         ),
-        lambda left, right: FUNCTIONS.call('add', left, right),
+        Delegate('add'),
     ),
 
     (
@@ -46,7 +46,7 @@ SPECS = (
             (Types.TIME, Types.FLOAT),
             (Types.TIME, Types.TIME),
         ),
-        lambda left, right: FUNCTIONS.call('subtract', left, right),
+        Delegate('subtract'),
     ),
 
     (
@@ -57,7 +57,7 @@ SPECS = (
             (Types.INTEGER, Types.FLOAT),
             (Types.FLOAT, Types.FLOAT),
         ),
-        lambda left, right: FUNCTIONS.call('multiply', left, right),
+        Delegate('multiply'),
     ),
 
     (
@@ -68,7 +68,7 @@ SPECS = (
             (Types.INTEGER, Types.FLOAT),
             (Types.FLOAT, Types.FLOAT),
         ),
-        lambda left, right: FUNCTIONS.call('divide', left, right),
+        Delegate('divide'),
     ),
 
     (
@@ -79,7 +79,7 @@ SPECS = (
             (Types.INTEGER, Types.FLOAT),
             (Types.FLOAT, Types.FLOAT),
         ),
-        lambda left, right: FUNCTIONS.call('modulo', left, right),
+        Delegate('modulo'),
     ),
 
     (
@@ -90,61 +90,61 @@ SPECS = (
             (Types.INTEGER, Types.FLOAT),
             (Types.FLOAT, Types.FLOAT),
         ),
-        lambda left, right: FUNCTIONS.call('pow', left, right),
+        Delegate('pow'),
     ),
 
     (
         TokenType.AMPERSAND,
         (),
-        lambda left, right: FUNCTIONS.call('and', left, right),
+        Delegate('and'),
     ),
 
     (
         TokenType.PIPE,
         (),
-        lambda left, right: FUNCTIONS.call('or', left, right),
+        Delegate('or'),
     ),
 
     (
         TokenType.CARET,
         (),
-        lambda left, right: FUNCTIONS.call('xor', left, right),
+        Delegate('xor'),
     ),
 
     (
         TokenType.EQUAL_EQUAL,
         (),
-        lambda left, right: FUNCTIONS.call('equal', left, right),
+        Delegate('equal'),
     ),
 
     (
         TokenType.BANG_EQUAL,
         (),
-        lambda left, right: FUNCTIONS.call('notEqual', left, right),
+        Delegate('notEqual'),
     ),
 
     (
         TokenType.LESSER,
         (),
-        lambda left, right: FUNCTIONS.call('lesser', left, right),
+        Delegate('lesser'),
     ),
 
     (
         TokenType.LESSER_EQUAL,
         (),
-        lambda left, right: FUNCTIONS.call('lesserEqual', left, right),
+        Delegate('lesserEqual'),
     ),
 
     (
         TokenType.GREATER,
         (),
-        lambda left, right: FUNCTIONS.call('greater', left, right),
+        Delegate('greater'),
     ),
 
     (
         TokenType.GREATER_EQUAL,
         (),
-        lambda left, right: FUNCTIONS.call('greaterEqual', left, right),
+        Delegate('greaterEqual'),
     ),
 )
 
@@ -1,21 +1,16 @@
-from ..dispatcher import UNARY_OPERATORS, FUNCTIONS
+from ..dispatcher import UNARY_OPERATORS, Delegate
 from ..token import TokenType
 from ..types import Types
 
 
-@UNARY_OPERATORS.register(
+negative = UNARY_OPERATORS.register(  # noqa: invalid-name
     TokenType.MINUS,
     (Types.INTEGER,),
     (Types.FLOAT,),
-)
-def negative(value):
-    return FUNCTIONS.call('negative', value)
+)(Delegate('negative'))
 
 
-@UNARY_OPERATORS.register(
+logical_not = UNARY_OPERATORS.register(  # noqa: invalid-name
     TokenType.BANG,
     (Types.BOOLEAN,),
-)
-def logical_not(value):
-    return FUNCTIONS.call('not', value)
-
+)(Delegate('not'))
@@ -0,0 +1,291 @@
+import multiprocessing
+import os
+import time
+
+from array import array
+from itertools import islice
+
+from six import iteritems, integer_types
+from six.moves import range
+
+from .compiler import CompiledExpression, Compiler
+from .nodes import Expression
+from .lexer import Lexer
+from .parser import Parser
+from .types import bexl_to_python
+
+
+# The number of rows evaluated by a worker at a time, if not specified.
+DEFAULT_CHUNK_SIZE = 10000
+
+# The typecodes of the arrays whose values can be placed in shared memory,
+# mapped to the typecode of the shared array that holds them.
+SHARED_TYPECODES = {
+    'b': 'q',
+    'B': 'q',
+    'h': 'q',
+    'H': 'q',
+    'i': 'q',
+    'I': 'q',
+    'l': 'q',
+    'L': 'q',
+    'q': 'q',
+    'f': 'd',
+    'd': 'd',
+}
+
+_INTEGER_BOUNDS = (-2 ** 63, 2 ** 63 - 1)
+
+# The state of a worker process, set up when the process starts.
+_WORKER = {}
+
+
+def _start_worker(expression, native, shared):
+    _WORKER['expression'] = expression
+    _WORKER['native'] = native
+    _WORKER['shared'] = shared
+
+
+def _evaluate_rows(rows):
+    started = time.time()
+    expression = _WORKER['expression']
+    results = [expression.evaluate(row) for row in rows]
+    if _WORKER['native']:
+        results = [bexl_to_python(result) for result in results]
+    return os.getpid(), len(rows), time.time() - started, results
+
+
+def _evaluate_columns(chunk):
+    start, stop, columns = chunk
+    columns = dict(columns)
+    for name, shared in iteritems(_WORKER['shared']):
+        columns[name] = shared[start:stop]
+    names = list(columns)
+    return _evaluate_rows([
+        dict(zip(names, values))
+        for values in zip(*[columns[name] for name in names])
+    ])
+
+
+def _evaluate_tagged_rows(chunk):
+    start, rows = chunk
+    pid, count, seconds, results = _evaluate_rows(rows)
+    return pid, count, seconds, list(zip(range(start, start + count), results))
+
+
+def _evaluate_tagged_columns(chunk):
+    start = chunk[0]
+    pid, count, seconds, results = _evaluate_columns(chunk)
+    return pid, count, seconds, list(zip(range(start, start + count), results))
+
+
+def _share(column):
+    if not len(column):  # noqa: len-as-condition
+        return None
+    if isinstance(column, array):
+        typecode = SHARED_TYPECODES.get(column.typecode)
+    elif all([type(value) in integer_types for value in column]):
+        typecode = 'q'
+    elif all([type(value) is float for value in column]):
+        typecode = 'd'
+    else:
+        typecode = None
+
+    if typecode is None:
+        return None
+    # Shared ctypes arrays silently truncate integers that don't fit.
+    if typecode == 'q' \
+            and not _INTEGER_BOUNDS[0] <= min(column) <= max(column) \
+            <= _INTEGER_BOUNDS[1]:
+        return None
+    return multiprocessing.RawArray(typecode, column)
+
+
+class WorkerStats(object):
+    """
+    Counters describing the work done by one worker process of a
+    ParallelEvaluator.
+    """
+
+    __slots__ = (
+        'rows',
+        'chunks',
+        'seconds',
+    )
+
+    def __init__(self):
+        self.rows = 0
+        self.chunks = 0
+        self.seconds = 0.0
+
+    @property
+    def throughput(self):
+        """
+        The number of rows the worker evaluated per second.
+        """
+
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        return '%s(rows=%s, chunks=%s, seconds=%.3f)' % (
+            self.__class__.__name__,
+            self.rows,
+            self.chunks,
+            self.seconds,
+        )
+
+
+class ParallelEvaluator(object):
+    """
+    Evaluates an expression over many rows of variables using a pool of
+    worker processes. The expression is sent to each worker once, after
+    which the rows are sent in chunks.
+
+    Each call to evaluate() or evaluate_columns() starts its own pool, which
+    is shut down once all the results have been retrieved.
+
+    :param expression:
+        the BEXL expression to evaluate, or its parsed AST or
+        CompiledExpression
+    :type expression: str|bexl.nodes.Expression|bexl.CompiledExpression
+    :param processes:
+        the number of worker processes to use. If not specified, one per CPU
+        is used.
+    :type processes: int
+    :param chunk_size:
+        the number of rows sent to a worker at a time. Larger chunks have less
+        overhead; smaller chunks balance the load between workers better.
+    :type chunk_size: int
+    :param native:
+        whether or not the results should be the raw bexl.Values returned
+        by the expression, or native Python values. If not specified, native
+        Python values are returned.
+    :type native: bool
+    :param lexer: the Lexer to use when parsing the expression
+    :type lexer: bexl.Lexer
+    :param parser: the Parser to use when parsing the expression
+    :type parser: bexl.Parser
+    """
+
+    def __init__(
+            self,
+            expression,
+            processes=None,
+            chunk_size=DEFAULT_CHUNK_SIZE,
+            native=True,
+            lexer=Lexer,
+            parser=Parser):
+        if not isinstance(expression, CompiledExpression):
+            if not isinstance(expression, Expression):
+                expression = parser(lexer=lexer).parse(expression)
+            expression = Compiler().compile(expression)
+        self.expression = expression
+        self.processes = processes
+        self.chunk_size = chunk_size
+        self.native = native
+        self.stats = {}
+
+    def _run(self, function, chunks, ordered, shared):
+        pool = multiprocessing.Pool(
+            self.processes,
+            initializer=_start_worker,
+            initargs=(self.expression, self.native, shared),
+        )
+        try:
+            mapper = pool.imap if ordered else pool.imap_unordered
+            for pid, rows, seconds, results in mapper(function, chunks):
+                stats = self.stats.setdefault(pid, WorkerStats())
+                stats.rows += rows
+                stats.chunks += 1
+                stats.seconds += seconds
+                yield results
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _chunks(self, rows):
+        rows = iter(rows)
+        start = 0
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return
+            yield start, chunk
+            start += len(chunk)
+
+    def evaluate(self, rows, ordered=True):
+        """
+        Evaluates the expression with each of the given sets of variables,
+        yielding the results as they become available.
+
+        :param rows: the variables to evaluate the expression with
+        :type rows: iterable of dict
+        :param ordered:
+            whether the results must be yielded in the same order as the rows.
+            If False, ``(index, result)`` pairs are yielded in whatever order
+            the workers finish them. If not specified, the order is kept.
+        :type ordered: bool
+        :rtype: iterator
+        """
+
+        if ordered:
+            function = _evaluate_rows
+            chunks = (chunk for _, chunk in self._chunks(rows))
+        else:
+            function = _evaluate_tagged_rows
+            chunks = self._chunks(rows)
+
+        for results in self._run(function, chunks, ordered, {}):
+            for result in results:
+                yield result
+
+    def evaluate_columns(self, columns, ordered=True):
+        """
+        Evaluates the expression for each row of the given columns of
+        variables, yielding the results as they become available. Columns
+        that hold only integers or only floats (including ``array.array``
+        columns) are placed in shared memory, so that the workers read them
+        directly rather than having them sent in each chunk.
+
+        :param columns: the values of the variables, keyed by name
+        :type columns: dict of sequence
+        :param ordered:
+            whether the results must be yielded in the same order as the rows.
+            If False, ``(index, result)`` pairs are yielded in whatever order
+            the workers finish them. If not specified, the order is kept.
+        :type ordered: bool
+        :rtype: iterator
+        """
+
+        lengths = set([len(column) for column in columns.values()])
+        if len(lengths) > 1:
+            raise ValueError('The columns must all be of the same length')
+        length = lengths.pop() if lengths else 0
+
+        shared = {}
+        plain = {}
+        for name, column in iteritems(columns):
+            values = _share(column)
+            if values is None:
+                plain[name] = column
+            else:
+                shared[name] = values
+
+        chunks = (
+            (
+                start,
+                min(start + self.chunk_size, length),
+                [
+                    (name, column[start:start + self.chunk_size])
+                    for name, column in iteritems(plain)
+                ],
+            )
+            for start in range(0, length, self.chunk_size)
+        )
+
+        function = _evaluate_columns if ordered else _evaluate_tagged_columns
+        for results in self._run(function, chunks, ordered, shared):
+            for result in results:
+                yield result
+
@@ -0,0 +1,518 @@
+import json
+import time
+from collections import OrderedDict
+
+from .compiler import CompiledExpression, Compiler
+from .dispatcher import DEFAULT_REGISTRY, DispatcherWrapper
+from .interpreter import Interpreter
+
+
+_timer = getattr(time, 'perf_counter', time.time)  # noqa: invalid-name
+
+
+def _compile_profiled(tree, registry=None):
+    return ProfilingCompiler(registry=registry).compile(tree)
+
+
+def _span(node):
+    # The (line, column) positions of the first character of a node and of
+    # the character after its last.
+    start = node.start_token
+    end = node.end_token
+    return (
+        (start.line, start.column),
+        (end.line, end.column + end.length),
+    )
+
+
+def _describe(node):
+    name = getattr(node, 'name', None)
+    if name is None:
+        return node.__class__.__name__
+    return '%s(%s)' % (node.__class__.__name__, name)
+
+
+class NodeProfile(object):
+    """
+    The time spent evaluating a node of an AST.
+
+    :param node: the node
+    :type node: bexl.nodes.Expression
+    """
+
+    __slots__ = (
+        'node',
+        'calls',
+        'cumulative_seconds',
+        'self_seconds',
+    )
+
+    def __init__(self, node):
+        self.node = node
+        self.calls = 0
+        self.cumulative_seconds = 0.0
+        self.self_seconds = 0.0
+
+    def __repr__(self):
+        return '<%s %s calls=%s cumulative=%.6f self=%.6f>' % (
+            self.__class__.__name__,
+            _describe(self.node),
+            self.calls,
+            self.cumulative_seconds,
+            self.self_seconds,
+        )
+
+
+class FunctionProfile(object):
+    """
+    The time spent in the implementation of a function for one signature.
+
+    :param name: the name of the function
+    :type name: str
+    :param signature: the types of the arguments
+    :type signature: tuple of str
+    """
+
+    __slots__ = (
+        'name',
+        'signature',
+        'calls',
+        'seconds',
+    )
+
+    def __init__(self, name, signature):
+        self.name = name
+        self.signature = signature
+        self.calls = 0
+        self.seconds = 0.0
+
+    @property
+    def label(self):
+        return '%s(%s)' % (self.name, ', '.join(self.signature))
+
+    def __repr__(self):
+        return '<%s %s calls=%s seconds=%.6f>' % (
+            self.__class__.__name__,
+            self.label,
+            self.calls,
+            self.seconds,
+        )
+
+
+class Profile(object):
+    """
+    The timings gathered by a ProfilingInterpreter or ProfilingCompiler,
+    accumulated over all the evaluations they perform.
+
+    The cumulative time of a node includes that of its children; its self
+    time doesn't. The time of a function is that of the implementation it
+    was dispatched to, including the functions that the operators invoke
+    (e.g. "add" for +).
+
+    A Profile is not thread-safe; profile expressions from one thread at a
+    time.
+    """
+
+    def __init__(self):
+        self.nodes = OrderedDict()
+        self.functions = OrderedDict()
+        self._children = []
+
+    def node(self, node):
+        """
+        Returns the profile of the given node, creating it if necessary.
+
+        :param node: the node
+        :type node: bexl.nodes.Expression
+        :rtype: NodeProfile
+        """
+
+        profile = self.nodes.get(id(node))
+        if profile is None:
+            profile = self.nodes[id(node)] = NodeProfile(node)
+        return profile
+
+    def measure(self, profile, func, *args):
+        """
+        Invokes the given callable, adding the time it takes to that of the
+        given node.
+
+        :param profile: the profile of the node being evaluated
+        :type profile: NodeProfile
+        :param func: the callable that evaluates the node
+        :type func: callable
+        :returns: the value the callable returns
+        """
+
+        children = self._children
+        children.append(0.0)
+        started = _timer()
+        try:
+            return func(*args)
+        finally:
+            elapsed = _timer() - started
+            nested = children.pop()
+            profile.calls += 1
+            profile.cumulative_seconds += elapsed
+            profile.self_seconds += elapsed - nested
+            if children:
+                children[-1] += elapsed
+
+    def record_function(self, name, args, seconds):
+        """
+        Adds a call to a function to the profile.
+
+        :param name: the name of the function
+        :type name: str
+        :param args: the arguments it was invoked with
+        :type args: tuple of bexl.Value
+        :param seconds: the time the call took
+        :type seconds: float
+        """
+
+        signature = tuple([arg.data_type for arg in args])
+        key = (name, signature)
+        profile = self.functions.get(key)
+        if profile is None:
+            profile = self.functions[key] = FunctionProfile(name, signature)
+        profile.calls += 1
+        profile.seconds += seconds
+
+    def instrument(self, registry):
+        """
+        Returns a registry with the same operators and functions as the given
+        one, whose functions record their timings in this profile.
+
+        :param registry: the registry to instrument
+        :type registry: bexl.dispatcher.FunctionRegistry
+        :rtype: bexl.dispatcher.FunctionRegistry
+        """
+
+        return registry.rebind(ProfilingDispatcher(registry.functions, self))
+
+    def clear(self):
+        """
+        Discards all the timings gathered so far.
+        """
+
+        for profile in self.nodes.values():
+            profile.calls = 0
+            profile.cumulative_seconds = 0.0
+            profile.self_seconds = 0.0
+        self.functions.clear()
+
+    def hotspots(self):
+        """
+        Returns the profiles of the nodes that were evaluated, the most
+        expensive (by self time) first.
+
+        :rtype: list of NodeProfile
+        """
+
+        return sorted(
+            [profile for profile in self.nodes.values() if profile.calls],
+            key=lambda profile: profile.self_seconds,
+            reverse=True,
+        )
+
+    def as_dict(self, source=None):
+        """
+        Returns the timings as a structure of dicts and lists.
+
+        :param source:
+            the BEXL expression that was profiled. If specified, the text of
+            each node is included.
+        :type source: str
+        :rtype: dict
+        """
+
+        lines = source.splitlines(True) if source is not None else None
+        nodes = []
+        for profile in self.nodes.values():
+            start, end = _span(profile.node)
+            entry = {
+                'node': profile.node.__class__.__name__,
+                'name': getattr(profile.node, 'name', None),
+                'start': {'line': start[0], 'column': start[1]},
+                'end': {'line': end[0], 'column': end[1]},
+                'calls': profile.calls,
+                'cumulative_seconds': profile.cumulative_seconds,
+                'self_seconds': profile.self_seconds,
+            }
+            if lines is not None:
+                entry['text'] = _excerpt(lines, start, end)
+            nodes.append(entry)
+
+        return {
+            'nodes': nodes,
+            'functions': [
+                {
+                    'name': profile.name,
+                    'signature': list(profile.signature),
+                    'calls': profile.calls,
+                    'seconds': profile.seconds,
+                }
+                for profile in self.functions.values()
+            ],
+        }
+
+    def to_json(self, source=None, **kwargs):
+        """
+        Returns the timings as a JSON document (see as_dict()).
+
+        :param source:
+            the BEXL expression that was profiled. If specified, the text of
+            each node is included.
+        :type source: str
+        :param kwargs: passed to json.dumps()
+        :rtype: str
+        """
+
+        return json.dumps(self.as_dict(source), **kwargs)
+
+    def report(self, source=None, limit=None):
+        """
+        Returns a human-readable report of the timings, the most expensive
+        nodes first. If the source is specified, each node is shown with its
+        text underlined in the expression.
+
+        :param source: the BEXL expression that was profiled
+        :type source: str
+        :param limit: the maximum number of nodes to include
+        :type limit: int
+        :rtype: str
+        """
+
+        lines = source.splitlines() if source is not None else None
+        output = [
+            '%8s %12s %12s  %s' % ('calls', 'cumulative', 'self', 'node'),
+        ]
+        for profile in self.hotspots()[:limit]:
+            start, end = _span(profile.node)
+            output.append('%8d %10.3fms %10.3fms  %s at %s:%s' % (
+                profile.calls,
+                profile.cumulative_seconds * 1000,
+                profile.self_seconds * 1000,
+                _describe(profile.node),
+                start[0] + 1,
+                start[1] + 1,
+            ))
+            if lines is not None and start[0] < len(lines):
+                line = lines[start[0]]
+                stop = end[1] if end[0] == start[0] else len(line)
+                output.append('    ' + line)
+                output.append(
+                    '    ' + ' ' * start[1] + '^' * ((stop - start[1]) or 1)
+                )
+
+        if self.functions:
+            output.append('')
+            output.append('%8s %12s  %s' % ('calls', 'total', 'function'))
+            for profile in sorted(
+                    self.functions.values(),
+                    key=lambda profile: profile.seconds,
+                    reverse=True):
+                output.append('%8d %10.3fms  %s' % (
+                    profile.calls,
+                    profile.seconds * 1000,
+                    profile.label,
+                ))
+
+        return '\n'.join(output)
+
+
+def _excerpt(lines, start, end):
+    if start[0] == end[0]:
+        return lines[start[0]][start[1]:end[1]]
+    return ''.join(
+        [lines[start[0]][start[1]:]]
+        + lines[start[0] + 1:end[0]]
+        + [lines[end[0]][:end[1]]]
+    )
+
+
+class ProfilingDispatcher(DispatcherWrapper):
+    """
+    Wraps a Dispatcher so that the time each call takes is recorded in a
+    Profile.
+
+    :param dispatcher: the Dispatcher to wrap
+    :type dispatcher: bexl.dispatcher.Dispatcher
+    :param profile: the Profile to record the calls in
+    :type profile: Profile
+    """
+
+    def __init__(self, dispatcher, profile):
+        super(ProfilingDispatcher, self).__init__(dispatcher)
+        self.profile = profile
+
+    def call(self, name, *args):
+        started = _timer()
+        try:
+            return self.dispatcher.call(name, *args)
+        finally:
+            self.profile.record_function(name, args, _timer() - started)
+
+
+class ProfilingInterpreter(Interpreter):
+    """
+    An Interpreter that records the time spent evaluating each node of the
+    AST, and in each function, in a Profile. The Interpreter itself records
+    nothing, so it doesn't pay for profiling.
+
+    :param profile:
+        the Profile to record the timings in. If not specified, a new one is
+        created.
+    :type profile: Profile
+    :param registry: the registry of the operators and functions to use
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, profile=None, registry=None):
+        super(ProfilingInterpreter, self).__init__(registry=registry)
+        self.profile = profile or Profile()
+        self.registry = self.profile.instrument(self.registry)
+
+    def _measure(self, visit, node, resolver):
+        return self.profile.measure(
+            self.profile.node(node),
+            visit,
+            node,
+            resolver,
+        )
+
+    def visit_literal(self, node, resolver):
+        return self._measure(
+            super(ProfilingInterpreter, self).visit_literal,
+            node,
+            resolver,
+        )
+
+    def visit_grouping(self, node, resolver):
+        return self._measure(
+            super(ProfilingInterpreter, self).visit_grouping,
+            node,
+            resolver,
+        )
+
+    def visit_list(self, node, resolver):
+        return self._measure(
+            super(ProfilingInterpreter, self).visit_list,
+            node,
+            resolver,
+        )
+
+    def visit_variable(self, node, resolver):
+        return self._measure(
+            super(ProfilingInterpreter, self).visit_variable,
+            node,
+            resolver,
+        )
+
+    def visit_property(self, node, resolver):
+        return self._measure(
+            super(ProfilingInterpreter, self).visit_property,
+            node,
+            resolver,
+        )
+
+    def visit_indexing(self, node, resolver):
+        return self._measure(
+            super(ProfilingInterpreter, self).visit_indexing,
+            node,
+            resolver,
+        )
+
+    def visit_unary(self, node, resolver):
+        return self._measure(
+            super(ProfilingInterpreter, self).visit_unary,
+            node,
+            resolver,
+        )
+
+    def visit_binary(self, node, resolver):
+        return self._measure(
+            super(ProfilingInterpreter, self).visit_binary,
+            node,
+            resolver,
+        )
+
+    def visit_function(self, node, resolver):
+        return self._measure(
+            super(ProfilingInterpreter, self).visit_function,
+            node,
+            resolver,
+        )
+
+
+class ProfiledExpression(CompiledExpression):
+    """
+    A CompiledExpression that records the time spent evaluating each of its
+    nodes, and in each function, in a Profile.
+
+    :param tree: the parsed AST the expression was compiled from
+    :type tree: bexl.nodes.Expression
+    :param function: the compiled closure that evaluates the expression
+    :type function: callable
+    :param registry:
+        the registry of the operators and functions the expression was
+        compiled with
+    :type registry: bexl.dispatcher.FunctionRegistry
+    :param profile: the Profile the timings are recorded in
+    :type profile: Profile
+    """
+
+    def __init__(self, tree, function, registry, profile):
+        super(ProfiledExpression, self).__init__(tree, function, registry)
+        self.profile = profile
+
+    def __reduce__(self):
+        # The timings are not kept.
+        if self.registry is DEFAULT_REGISTRY:
+            return _compile_profiled, (self.tree,)
+        return _compile_profiled, (self.tree, self.registry)
+
+
+class ProfilingCompiler(Compiler):
+    """
+    A Compiler whose expressions record the time spent evaluating each node
+    of the AST, and in each function, in a Profile. Expressions produced by
+    the Compiler itself record nothing, so they don't pay for profiling.
+
+    It can be passed to bexl.compile(), after which the timings are
+    available from the ``profile`` of the expression::
+
+        expression = bexl.compile(source, compiler=ProfilingCompiler)
+        ...
+        print(expression.profile.report(source))
+
+    :param profile:
+        the Profile to record the timings in. If not specified, a new one is
+        created.
+    :type profile: Profile
+    :param registry: the registry of the operators and functions to use
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, profile=None, registry=None):
+        super(ProfilingCompiler, self).__init__(registry=registry)
+        self.profile = profile or Profile()
+        self.uninstrumented_registry = self.registry
+        self.registry = self.profile.instrument(self.registry)
+
+    def compile(self, tree):
+        return ProfiledExpression(
+            tree,
+            self.compile_node(tree),
+            self.uninstrumented_registry,
+            self.profile,
+        )
+
+    def compile_node(self, node):
+        compiled = super(ProfilingCompiler, self).compile_node(node)
+        measure = self.profile.measure
+        profile = self.profile.node(node)
+
+        def profiled(context):
+            return measure(profile, compiled, context)
+        return profiled
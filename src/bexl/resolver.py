@@ -2,10 +2,38 @@ from collections import Mapping, MutableMapping
 
 from six import iteritems
 
+from .analysis import variable_dependencies
 from .errors import BexlError, ResolverError
 from .types import python_to_bexl
 
 
+def project(value, paths):
+    """
+    Returns the parts of a native Python value that are reached by the given
+    chains of properties. Mappings are reduced to the keys on the paths; any
+    other value is returned as-is.
+
+    :param value: the value to project
+    :type value: any
+    :param paths: the chains of properties, as tuples of property names; an
+        empty tuple means the whole value
+    :type paths: iterable of tuple
+    :rtype: any
+    """
+
+    if () in paths or not isinstance(value, Mapping):
+        return value
+
+    remainders = {}
+    for path in paths:
+        remainders.setdefault(path[0], set()).add(path[1:])
+    return dict([
+        (key, project(value[key], remainder))
+        for key, remainder in iteritems(remainders)
+        if key in value
+    ])
+
+
 class VariableResolver(MutableMapping):
     """
     A class/interface used by the BEXL Interpreter to resolve variable it finds
@@ -33,6 +61,44 @@ class VariableResolver(MutableMapping):
             'Cannot create VariableResolver from: %r' % (value,)
         )
 
+    @classmethod
+    def projected(cls, dependencies, variables):
+        """
+        Creates a VariableResolver containing only the variables an
+        expression references, and only the parts of their values that it
+        uses, so that the rest of the values are never converted.
+
+        :param dependencies:
+            the expression, or its dependencies as returned by
+            ``bexl.analysis.variable_dependencies()``
+        :type dependencies: bexl.nodes.Expression|bexl.CompiledExpression|dict
+        :param variables:
+            the native Python values of the variables, or a callable that
+            accepts a ``bexl.analysis.VariableDependency`` and returns the
+            (possibly already projected) value of the variable, raising
+            KeyError if it doesn't exist
+        :type variables: Mapping|callable
+        :rtype: VariableResolver
+        """
+
+        if not isinstance(dependencies, Mapping):
+            dependencies = variable_dependencies(dependencies)
+
+        resolver = cls()
+        for name, dependency in iteritems(dependencies):
+            try:
+                if isinstance(variables, Mapping):
+                    value = variables[name]
+                else:
+                    value = variables(dependency)
+            except KeyError:
+                continue
+            resolver[name] = project(
+                value,
+                [()] if dependency.whole else dependency.paths,
+            )
+        return resolver
+
     def __init__(self, **kwargs):  # noqa: super-init-not-called
         self._variables = {}
         for key, value in iteritems(kwargs):
@@ -73,3 +139,47 @@ class VariableResolver(MutableMapping):
     def __len__(self):
         return len(self._variables)
 
+
+class LazyVariableResolver(VariableResolver):
+    """
+    A VariableResolver that retrieves the values of variables from a loader
+    the first time they are needed, rather than up front. The converted
+    Values are kept by the resolver, so each loader is called at most once
+    until the resolver is cleared (e.g., between evaluations).
+
+    :param loader:
+        a callable that accepts the name of a variable and returns its native
+        Python value (raising KeyError if it doesn't exist), or a mapping of
+        variable names to callables that accept no arguments and return the
+        value of that variable
+    :type loader: callable|Mapping
+    """
+
+    def __init__(self, loader):
+        super(LazyVariableResolver, self).__init__()
+        self._loader = loader
+        self.loads = {}
+        self.hits = {}
+
+    def __call__(self, name):
+        if name in self:
+            self.hits[name] = self.hits.get(name, 0) + 1
+            return self[name]
+
+        self[name] = self._load(name)
+        return self[name]
+
+    def _load(self, name):
+        try:
+            if isinstance(self._loader, Mapping):
+                loader = self._loader[name]
+                self.loads[name] = self.loads.get(name, 0) + 1
+                return loader()
+            self.loads[name] = self.loads.get(name, 0) + 1
+            return self._loader(name)
+        except KeyError:
+            raise ResolverError(
+                'Could not resolve variable "%s"' % (
+                    name,
+                ),
+            )
@@ -0,0 +1,383 @@
+from bisect import bisect_right
+
+from six import iteritems
+
+from .compiler import HASHABLE_TYPES, unwrap_grouping
+from .dispatcher import FUNCTIONS
+from .errors import InterpreterError
+from .functions.comparison import equal, between
+from .functions.sequences import value_in
+from .interpreter import SHORT_CIRCUITS
+from .nodes import Binary, Function, List, Literal, Variable
+from .token import TokenType
+from .types import make_value, cast, Types
+
+
+# The data types that the value of a variable tested by between() can have
+# without the call failing.
+NUMERIC_TYPES = (
+    Types.INTEGER,
+    Types.FLOAT,
+)
+
+
+class Guard(object):
+    """
+    A conjunct of a rule that tests a variable against literal values, and
+    whose result can therefore be determined without evaluating the rule.
+
+    :param variable: the name of the variable tested by the conjunct
+    :type variable: str
+    """
+
+    __slots__ = (
+        'variable',
+    )
+
+    def __init__(self, variable):
+        self.variable = variable
+
+    def test(self, value):
+        """
+        Returns the boolean result of the conjunct for the given value of its
+        variable, or None if it can't be determined without evaluating it.
+
+        :param value: the value of the variable
+        :type value: bexl.Value
+        :rtype: bool
+        """
+
+        raise NotImplementedError()
+
+
+class EqualityGuard(Guard):
+    """
+    A conjunct of the form ``$variable == literal``.
+    """
+
+    __slots__ = (
+        'data_type',
+        'raw_value',
+    )
+
+    def __init__(self, variable, literal):
+        super(EqualityGuard, self).__init__(variable)
+        self.data_type = literal.data_type
+        self.raw_value = make_value(literal.data_type, literal.value).raw_value
+
+    def test(self, value):
+        # Comparing values of different types involves casting, which may
+        # succeed, fail or raise an error.
+        if value.data_type != self.data_type:
+            return None
+        return value.raw_value == self.raw_value
+
+
+class InGuard(Guard):
+    """
+    A conjunct of the form ``in($variable, [literal, ...])``.
+    """
+
+    __slots__ = (
+        'members',
+    )
+
+    def __init__(self, variable, literals):
+        super(InGuard, self).__init__(variable)
+        self.members = frozenset([
+            make_value(literal.data_type, literal.value).value
+            for literal in literals
+        ])
+
+    def test(self, value):
+        try:
+            return value.value in self.members
+        except TypeError:
+            return None
+
+
+class BetweenGuard(Guard):
+    """
+    A conjunct of the form ``between($variable, literal, literal)``, where
+    both literals are numbers.
+    """
+
+    __slots__ = (
+        'bounds',
+    )
+
+    def __init__(self, variable, start, end):
+        super(BetweenGuard, self).__init__(variable)
+        start = make_value(start.data_type, start.value)
+        end = make_value(end.data_type, end.value)
+        self.bounds = dict([
+            (
+                data_type,
+                (
+                    cast(start, data_type).raw_value,
+                    cast(end, data_type).raw_value,
+                ),
+            )
+            for data_type in NUMERIC_TYPES
+        ])
+
+    def test(self, value):
+        if value.data_type not in self.bounds:
+            return None
+        if value.is_null:
+            return False
+        start, end = self.bounds[value.data_type]
+        return start <= value.raw_value <= end
+
+
+def _is_stock(functions, name, implementation):
+    registered = functions.get(name)
+    if isinstance(registered, dict):
+        return bool(registered) and all([
+            func is implementation
+            for func in registered.values()
+        ])
+    return registered is implementation
+
+
+def _conjuncts(node):
+    node = unwrap_grouping(node)
+    if isinstance(node, Binary) and node.name == TokenType.AMPERSAND:
+        return _conjuncts(node.left) + _conjuncts(node.right)
+    return [node]
+
+
+def _guard(node, functions):  # noqa: too-many-return-statements
+    if isinstance(node, Binary) and node.name == TokenType.EQUAL_EQUAL:
+        if not _is_stock(functions, 'equal', equal):
+            return None
+        operands = [unwrap_grouping(node.left), unwrap_grouping(node.right)]
+        if isinstance(operands[1], Variable):
+            operands.reverse()
+        variable, literal = operands
+        if isinstance(variable, Variable) \
+                and isinstance(literal, Literal) \
+                and literal.data_type in HASHABLE_TYPES:
+            return EqualityGuard(variable.name, literal)
+        return None
+
+    if not isinstance(node, Function):
+        return None
+    arguments = [unwrap_grouping(argument) for argument in node.arguments]
+    if not arguments or not isinstance(arguments[0], Variable):
+        return None
+
+    if node.name == 'in' and len(arguments) == 2:
+        if not _is_stock(functions, 'in', value_in):
+            return None
+        haystack = arguments[1]
+        if isinstance(haystack, List):
+            elements = [
+                unwrap_grouping(element)
+                for element in haystack.elements
+            ]
+            if all([isinstance(element, Literal) for element in elements]):
+                return InGuard(arguments[0].name, elements)
+
+    elif node.name == 'between' and len(arguments) == 3:
+        if not _is_stock(functions, 'between', between):
+            return None
+        if all([
+                isinstance(bound, Literal)
+                and bound.data_type in NUMERIC_TYPES
+                for bound in arguments[1:]]):
+            return BetweenGuard(arguments[0].name, *arguments[1:])
+
+    return None
+
+
+def extract_guards(tree, functions=FUNCTIONS):
+    """
+    Returns the guards found at the start of the top-level conjunction of the
+    AST. Because & doesn't evaluate its right operand when its left operand
+    is false, the AST evaluates to False as soon as one of these guards does,
+    without any of the rest of the expression being evaluated. (If & didn't
+    short-circuit, no guards would be found.)
+
+    :param tree: the parsed AST to examine
+    :type tree: bexl.nodes.Expression
+    :param functions: the Dispatcher the functions are registered with
+    :type functions: bexl.dispatcher.Dispatcher
+    :rtype: list of Guard
+    """
+
+    guards = []
+    if TokenType.AMPERSAND not in SHORT_CIRCUITS:
+        return guards
+    for conjunct in _conjuncts(tree):
+        guard = _guard(conjunct, functions)
+        if guard is None:
+            break
+        guards.append(guard)
+    return guards
+
+
+class RuleIndex(object):
+    """
+    A discrimination index over a collection of rules. The first guard of
+    each rule (see extract_guards) is kept in a hash table (for equality and
+    in() guards) or a sorted list of intervals (for between() guards), so
+    that the rules which are certain to evaluate to False for a given set of
+    variables can be found without evaluating them.
+
+    Rules without guards, and rules whose guards can't be decided for the
+    given variables (e.g., because a variable is missing, or is of a
+    different type than the literals it is compared to), are always
+    candidates.
+
+    :param functions: the Dispatcher the functions are registered with
+    :type functions: bexl.dispatcher.Dispatcher
+    """
+
+    def __init__(self, functions=FUNCTIONS):
+        self.functions = functions
+        self._keys = []
+        self._guards = []
+        self._unguarded = []
+        self._equality = {}
+        self._membership = {}
+        self._ranges = {}
+        self._sorted_ranges = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    @property
+    def indexed_count(self):
+        """
+        The number of rules in the index that have at least one guard.
+        """
+
+        return len(self._keys) - len(self._unguarded)
+
+    def add(self, key, tree):
+        """
+        Adds a rule to the index.
+
+        :param key: the value that identifies the rule
+        :param tree: the parsed AST of the rule
+        :type tree: bexl.nodes.Expression
+        """
+
+        position = len(self._keys)
+        guards = extract_guards(tree, self.functions)
+        self._keys.append(key)
+        self._guards.append(guards)
+
+        if not guards:
+            self._unguarded.append(position)
+            return
+
+        guard = guards[0]
+        if isinstance(guard, EqualityGuard):
+            table = self._equality.setdefault(guard.variable, {}) \
+                .setdefault(guard.data_type, ({}, []))
+            table[0].setdefault(guard.raw_value, []).append(position)
+            table[1].append(position)
+
+        elif isinstance(guard, InGuard):
+            table = self._membership.setdefault(guard.variable, ({}, []))
+            for member in guard.members:
+                table[0].setdefault(member, []).append(position)
+            table[1].append(position)
+
+        else:
+            self._ranges.setdefault(guard.variable, []).append(position)
+            self._sorted_ranges = None
+
+    def _sort_ranges(self):
+        # For each variable and numeric type: the start of every interval in
+        # ascending order, and the (end, position) of the same intervals.
+        self._sorted_ranges = {}
+        for variable, positions in iteritems(self._ranges):
+            for data_type in NUMERIC_TYPES:
+                intervals = sorted([
+                    self._guards[position][0].bounds[data_type] + (position,)
+                    for position in positions
+                ])
+                self._sorted_ranges[(variable, data_type)] = (
+                    [start for start, _, _ in intervals],
+                    [(end, position) for _, end, position in intervals],
+                )
+
+    def candidates(self, variable_resolver):
+        """
+        Returns the keys of the rules that may not evaluate to False for the
+        given variables. Every other rule in the index is certain to.
+
+        :param variable_resolver:
+            the mechanism used to retrieve the Value for variables referenced
+            in the rules
+        :type variable_resolver: bexl.VariableResolver
+        :rtype: set
+        """
+
+        if self._sorted_ranges is None:
+            self._sort_ranges()
+
+        values = {}
+
+        def resolve(variable):
+            if variable not in values:
+                try:
+                    values[variable] = variable_resolver(variable)
+                except InterpreterError:
+                    values[variable] = None
+            return values[variable]
+
+        positions = set(self._unguarded)
+
+        for variable, tables in iteritems(self._equality):
+            value = resolve(variable)
+            for data_type, (table, everything) in iteritems(tables):
+                if value is None or value.data_type != data_type:
+                    positions.update(everything)
+                else:
+                    positions.update(table.get(value.raw_value, ()))
+
+        for variable, (table, everything) in iteritems(self._membership):
+            value = resolve(variable)
+            try:
+                positions.update(table.get(value.value, ()))
+            except (AttributeError, TypeError):
+                positions.update(everything)
+
+        for variable, everything in iteritems(self._ranges):
+            value = resolve(variable)
+            if value is None or value.data_type not in NUMERIC_TYPES:
+                positions.update(everything)
+            elif not value.is_null:
+                starts, ends = self._sorted_ranges[(variable, value.data_type)]
+                positions.update([
+                    position
+                    for end, position in ends[:bisect_right(
+                        starts,
+                        value.raw_value,
+                    )]
+                    if value.raw_value <= end
+                ])
+
+        return set([
+            self._keys[position]
+            for position in positions
+            if self._check(self._guards[position], resolve)
+        ])
+
+    def _check(self, guards, resolve):  # noqa: no-self-use
+        # The guards are evaluated in order, so the rule can only be skipped
+        # if one of them is False while all of those before it are True.
+        for guard in guards:
+            value = resolve(guard.variable)
+            if value is None:
+                return True
+            result = guard.test(value)
+            if result is None:
+                return True
+            if not result:
+                return False
+        return True
@@ -0,0 +1,184 @@
+from collections import OrderedDict
+
+from six import iteritems, string_types
+
+from .compiler import Compiler, EvaluationContext
+from .dispatcher import DEFAULT_REGISTRY
+from .interning import NodeInterner
+from .lexer import Lexer
+from .nodes import Literal, Variable
+from .parser import Parser
+from .resolver import VariableResolver
+from .rule_index import RuleIndex
+from .types import bexl_to_python, FALSE
+
+
+class SharingCompiler(Compiler):
+    """
+    A Compiler for ASTs produced by a NodeInterner. Every distinct node is
+    compiled once, and the closures of pure nodes that are shared by more
+    than one parent are memoized for the duration of an evaluation.
+
+    :param interner: the NodeInterner that produced the ASTs
+    :type interner: bexl.interning.NodeInterner
+    :param registry: the registry of the operators and functions to use
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(self, interner, registry=None):
+        super(SharingCompiler, self).__init__(registry=registry)
+        self.interner = interner
+        self._compiled = {}
+
+    def compile_node(self, node):
+        compiled = self._compiled.get(id(node))
+        if compiled is None:
+            compiled = super(SharingCompiler, self).compile_node(node)
+            if self.interner.uses(node) > 1 \
+                    and self.interner.is_pure(node) \
+                    and not isinstance(node, (Literal, Variable)):
+                compiled = self._memoize(len(self._compiled), compiled)
+            self._compiled[id(node)] = compiled
+        return compiled
+
+    def _memoize(self, key, compiled):  # noqa: no-self-use
+        def memoized(context):
+            memo = context.memo
+            if key in memo:
+                return memo[key]
+            value = memo[key] = compiled(context)
+            return value
+        return memoized
+
+
+class RuleSet(object):
+    """
+    A collection of named BEXL expressions that are compiled together and
+    evaluated against the same variables at once. Subexpressions that appear
+    in more than one rule are only evaluated once per evaluation.
+
+    :param rules: the initial rules of the set, as a mapping of names to
+        expression sources
+    :type rules: dict
+    :param lexer: the Lexer to use when parsing the rules
+    :type lexer: bexl.Lexer
+    :param parser: the Parser to use when parsing the rules
+    :type parser: bexl.Parser
+    :param indexed:
+        whether to skip the rules that the index determines will evaluate to
+        False. If not specified, the index is used.
+    :type indexed: bool
+    :param registry:
+        the registry of the operators and functions to use. If not
+        specified, bexl.dispatcher.DEFAULT_REGISTRY is used.
+    :type registry: bexl.dispatcher.FunctionRegistry
+    """
+
+    def __init__(
+            self,
+            rules=None,
+            lexer=Lexer,
+            parser=Parser,
+            indexed=True,
+            registry=None):
+        self.registry = registry or DEFAULT_REGISTRY
+        self.interner = NodeInterner(
+            lexer=lexer,
+            parser=parser,
+            functions=self.registry.functions,
+        )
+        self.indexed = indexed
+        self._trees = OrderedDict()
+        self._compiled = None
+        self._index = None
+        for name, source in iteritems(rules or {}):
+            self.add(name, source)
+
+    def add(self, name, source):
+        """
+        Adds a rule to the set.
+
+        :param name: the name of the rule
+        :type name: str
+        :param source: the BEXL expression, or its parsed AST
+        :type source: str|bexl.nodes.Expression
+        """
+
+        if isinstance(source, string_types):
+            tree = self.interner.parse(source)
+        else:
+            tree = self.interner.intern(source)
+        self._trees[name] = tree
+        self._compiled = None
+
+    def __len__(self):
+        return len(self._trees)
+
+    def __contains__(self, name):
+        return name in self._trees
+
+    def __iter__(self):
+        return iter(self._trees)
+
+    def tree(self, name):
+        """
+        Returns the interned AST of the named rule.
+
+        :param name: the name of the rule
+        :type name: str
+        :rtype: bexl.nodes.Expression
+        """
+
+        return self._trees[name]
+
+    def compile(self):
+        """
+        Compiles the rules of the set. This happens automatically the first
+        time the set is evaluated after a rule has been added.
+        """
+
+        compiler = SharingCompiler(self.interner, registry=self.registry)
+        self._compiled = [
+            (name, compiler.compile_node(tree))
+            for name, tree in iteritems(self._trees)
+        ]
+        self._index = RuleIndex(functions=self.interner.functions)
+        for name, tree in iteritems(self._trees):
+            self._index.add(name, tree)
+
+    def evaluate(self, variable_resolver=None, native=True):
+        """
+        Evaluates every rule in the set and returns their results.
+
+        :param variable_resolver:
+            the mechanism used to retrieve the Value for variables referenced
+            in the rules
+        :type variable_resolver: bexl.VariableResolver|dict
+        :param native:
+            whether or not the results should be the raw bexl.Values returned
+            by the rules, or native Python values. If not specified, native
+            Python values are returned.
+        :type native: bool
+        :returns: the results of the rules, keyed by name
+        :rtype: dict
+        """
+
+        if self._compiled is None:
+            self.compile()
+
+        context = EvaluationContext(
+            VariableResolver.make_from(variable_resolver),
+        )
+        context.memo = {}
+        candidates = None
+        if self.indexed:
+            candidates = self._index.candidates(context.resolver)
+
+        results = OrderedDict()
+        for name, compiled in self._compiled:
+            if candidates is None or name in candidates:
+                result = compiled(context)
+            else:
+                result = FALSE
+            results[name] = bexl_to_python(result) if native else result
+        return results
@@ -0,0 +1,388 @@
+import struct
+import sys
+
+from array import array
+
+from six import text_type, string_types, integer_types
+
+from .compact import CompactAST, NODE_KINDS, NONE, INDEX, START, END
+from .compiler import CompiledExpression
+from .errors import SerializationError
+
+
+MAGIC = b'BEXL'
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct('<4sH')
+_COUNT = struct.Struct('<I')
+_INTEGER = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+
+_TAG_BOOLEAN = b'b'
+_TAG_INTEGER = b'i'
+_TAG_BIG_INTEGER = b'I'
+_TAG_FLOAT = b'f'
+_TAG_STRING = b's'
+
+_INTEGER_BOUNDS = (-2 ** 63, 2 ** 63 - 1)
+
+_INTEGER_TYPECODES = ('b', 'B', 'h', 'H', 'i', 'I', 'l', 'L')
+
+_TOKEN_ARRAYS = (
+    'token_types',
+    'lexemes',
+    'literals',
+    'lines',
+    'columns',
+    'lengths',
+)
+
+_NODE_ARRAYS = (
+    'kinds',
+    'data',
+    'aux',
+    'start_tokens',
+    'end_tokens',
+)
+
+# The number of children of the kinds of nodes that have a fixed number.
+_CHILD_COUNTS = {
+    'Literal': 0,
+    'Variable': 0,
+    'Unary': 1,
+    'Binary': 2,
+    'Grouping': 1,
+    'Property': 1,
+}
+
+
+def _encode_text(text):
+    return text.encode('utf-8', 'surrogatepass')
+
+
+def _pack_bytes(chunks, data):
+    chunks.append(_COUNT.pack(len(data)))
+    chunks.append(data)
+
+
+def _pack_value(chunks, value):
+    if isinstance(value, bool):
+        chunks.append(_TAG_BOOLEAN)
+        chunks.append(b'\x01' if value else b'\x00')
+    elif isinstance(value, integer_types):
+        if _INTEGER_BOUNDS[0] <= value <= _INTEGER_BOUNDS[1]:
+            chunks.append(_TAG_INTEGER)
+            chunks.append(_INTEGER.pack(value))
+        else:
+            chunks.append(_TAG_BIG_INTEGER)
+            _pack_bytes(chunks, str(value).encode('ascii'))
+    elif isinstance(value, float):
+        chunks.append(_TAG_FLOAT)
+        chunks.append(_FLOAT.pack(value))
+    elif isinstance(value, string_types):
+        chunks.append(_TAG_STRING)
+        _pack_bytes(chunks, _encode_text(text_type(value)))
+    else:
+        raise SerializationError(
+            'Cannot serialize literal value %r' % (value,)
+        )
+
+
+def _narrowest(arr):
+    if arr.typecode != 'i' or not arr:
+        return arr
+    low, high = min(arr), max(arr)
+    for typecode, bits in (('b', 8), ('h', 16)):
+        if -2 ** (bits - 1) <= low and high < 2 ** (bits - 1):
+            return array(typecode, arr)
+    return arr
+
+
+def _pack_array(chunks, arr):
+    # Most of the tables contain small numbers, so they are stored using the
+    # narrowest integer type that can hold their contents.
+    arr = _narrowest(arr)
+    if sys.byteorder != 'little':  # pragma: no cover
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    chunks.append(arr.typecode.encode('ascii'))
+    _pack_bytes(chunks, arr.tobytes())
+
+
+def dump_compact(compact):
+    """
+    Serializes a CompactAST into the binary BEXL expression format.
+
+    :param compact: the CompactAST to serialize
+    :type compact: bexl.compact.CompactAST
+    :rtype: bytes
+    """
+
+    chunks = [_HEADER.pack(MAGIC, FORMAT_VERSION)]
+
+    chunks.append(_COUNT.pack(len(compact.strings)))
+    for string in compact.strings:
+        _pack_bytes(chunks, _encode_text(text_type(string)))
+
+    chunks.append(_COUNT.pack(len(compact.values)))
+    for value in compact.values:
+        _pack_value(chunks, value)
+
+    for name in CompactAST.ARRAYS:
+        _pack_array(chunks, getattr(compact, name))
+
+    return b''.join(chunks)
+
+
+class _Reader(object):
+    def __init__(self, data):
+        self.data = data
+        self.position = 0
+
+    def read(self, length):
+        end = self.position + length
+        if end > len(self.data):
+            raise SerializationError('Unexpected end of serialized data')
+        chunk = self.data[self.position:end]
+        self.position = end
+        return chunk
+
+    def unpack(self, fmt):
+        return fmt.unpack(self.read(fmt.size))[0]
+
+    def read_bytes(self):
+        return self.read(self.unpack(_COUNT))
+
+    def read_text(self):
+        return self.read_bytes().decode('utf-8', 'surrogatepass')
+
+    def read_value(self):
+        tag = self.read(1)
+        if tag == _TAG_BOOLEAN:
+            return self.read(1) != b'\x00'
+        if tag == _TAG_INTEGER:
+            return self.unpack(_INTEGER)
+        if tag == _TAG_BIG_INTEGER:
+            return int(self.read_bytes().decode('ascii'))
+        if tag == _TAG_FLOAT:
+            return self.unpack(_FLOAT)
+        if tag == _TAG_STRING:
+            return self.read_text()
+        raise SerializationError('Unknown value tag %r' % (tag,))
+
+    def read_array(self):
+        typecode = self.read(1)
+        if typecode.decode('latin-1') not in _INTEGER_TYPECODES:
+            raise SerializationError('Unknown array type %r' % (typecode,))
+        arr = array(typecode.decode('ascii'))
+        data = self.read_bytes()
+        if len(data) % arr.itemsize:
+            raise SerializationError('Corrupt array in serialized data')
+        arr.frombytes(data)
+        if sys.byteorder != 'little':  # pragma: no cover
+            arr.byteswap()
+        return arr
+
+
+def _check_positions(positions, size, optional=False):
+    for position in positions:
+        if not (0 <= position < size or (optional and position == NONE)):
+            raise SerializationError(
+                'Invalid reference %s in serialized data' % (position,)
+            )
+
+
+def _validate(compact):  # noqa: @mccabe
+    # Checks that every reference in the tables is in range, and that the
+    # nodes only reference nodes that precede them, so that decoding can
+    # neither fail nor loop.
+    token_count = len(compact.token_types)
+    node_count = len(compact.kinds)
+    if any(len(getattr(compact, name)) != token_count
+           for name in _TOKEN_ARRAYS) \
+            or any(len(getattr(compact, name)) != node_count
+                   for name in _NODE_ARRAYS) \
+            or len(compact.child_offsets) != node_count + 1:
+        raise SerializationError('Inconsistent table sizes in serialized data')
+
+    string_count = len(compact.strings)
+    value_count = len(compact.values)
+    _check_positions(compact.token_types, string_count, optional=True)
+    _check_positions(compact.lexemes, string_count, optional=True)
+    _check_positions(compact.literals, value_count, optional=True)
+    _check_positions(compact.start_tokens, token_count)
+    _check_positions(compact.end_tokens, token_count)
+    _check_positions(compact.kinds, len(NODE_KINDS))
+    _check_positions(compact.roots, node_count)
+
+    offsets = compact.child_offsets
+    if offsets[0] != 0 or offsets[-1] != len(compact.children):
+        raise SerializationError('Invalid child offsets in serialized data')
+    for position in range(node_count):
+        start, end = offsets[position], offsets[position + 1]
+        if end < start:
+            raise SerializationError(
+                'Invalid child offsets in serialized data'
+            )
+        _check_positions(compact.children[start:end], position)
+
+        kind = NODE_KINDS[compact.kinds[position]].__name__
+        aux = compact.aux[position]
+        expected = _CHILD_COUNTS.get(kind)
+        if kind == 'Literal':
+            _check_positions([compact.data[position]], value_count, True)
+            _check_positions([aux], string_count, True)
+        elif kind in ('Unary', 'Binary'):
+            _check_positions([aux], token_count)
+        elif kind == 'Indexing':
+            if not 0 <= aux <= INDEX | START | END:
+                raise SerializationError(
+                    'Invalid indexing flags %s in serialized data' % (aux,)
+                )
+            expected = 1 + len([
+                flag
+                for flag in (INDEX, START, END)
+                if aux & flag
+            ])
+        if expected is not None and end - start != expected:
+            raise SerializationError(
+                'Invalid number of children for %s in serialized data' % (
+                    kind,
+                )
+            )
+
+
+def _read_compact(data):
+    if data[:len(MAGIC)] != MAGIC:
+        raise SerializationError('Data is not a serialized BEXL expression')
+
+    reader = _Reader(data)
+    _, version = _HEADER.unpack(reader.read(_HEADER.size))
+    if version != FORMAT_VERSION:
+        raise SerializationError(
+            'Unsupported serialization format version %s (expected %s)' % (
+                version,
+                FORMAT_VERSION,
+            )
+        )
+
+    strings = [
+        reader.read_text()
+        for _ in range(reader.unpack(_COUNT))
+    ]
+    values = [
+        reader.read_value()
+        for _ in range(reader.unpack(_COUNT))
+    ]
+    arrays = {}
+    for name in CompactAST.ARRAYS:
+        arr = reader.read_array()
+        if arr.typecode in ('b', 'h'):
+            arr = array('i', arr)
+        arrays[name] = arr
+
+    if reader.position != len(data):
+        raise SerializationError('Unexpected trailing serialized data')
+
+    compact = CompactAST.from_pools(strings, values, arrays)
+    _validate(compact)
+    return compact
+
+
+def _decode(function, *args):
+    # Whatever is wrong with corrupt data, it is reported as a
+    # SerializationError.
+    try:
+        return function(*args)
+    except SerializationError:
+        raise
+    except Exception as exc:  # noqa: broad-except
+        raise SerializationError('Corrupt serialized data: %s' % (exc,))
+
+
+def load_compact(data):
+    """
+    Deserializes data produced by dump_compact() into a CompactAST.
+
+    :param data: the serialized expressions
+    :type data: bytes
+    :rtype: bexl.compact.CompactAST
+    :raises:
+        SerializationError if the data is not in a supported version of the
+        format, or is corrupt
+    """
+
+    return _decode(_read_compact, data)
+
+
+def _tree_of(expression):
+    if isinstance(expression, CompiledExpression):
+        return expression.tree
+    return expression
+
+
+def dumps_many(trees):
+    """
+    Serializes parsed ASTs (or CompiledExpressions, in which case the tree
+    they were compiled from is serialized) into the binary BEXL expression
+    format. The Tokens of the trees are included so that errors raised while
+    evaluating the deserialized trees can still be located in the original
+    source.
+
+    :param trees: the parsed ASTs to serialize
+    :type trees: list of bexl.nodes.Expression|bexl.CompiledExpression
+    :rtype: bytes
+    """
+
+    return dump_compact(CompactAST.from_trees([
+        _tree_of(tree)
+        for tree in trees
+    ]))
+
+
+def loads_many(data):
+    """
+    Deserializes data produced by dumps_many() back into parsed ASTs.
+
+    :param data: the serialized expressions
+    :type data: bytes
+    :rtype: list of bexl.nodes.Expression
+    :raises:
+        SerializationError if the data is not in a supported version of the
+        format, or is corrupt
+    """
+
+    return _decode(load_compact(data).trees)
+
+
+def dumps(tree):
+    """
+    Serializes a parsed AST (or CompiledExpression) into the binary BEXL
+    expression format.
+
+    :param tree: the parsed AST to serialize
+    :type tree: bexl.nodes.Expression|bexl.CompiledExpression
+    :rtype: bytes
+    """
+
+    return dumps_many([tree])
+
+
+def loads(data):
+    """
+    Deserializes data produced by dumps() back into a parsed AST.
+
+    :param data: the serialized expression
+    :type data: bytes
+    :rtype: bexl.nodes.Expression
+    :raises:
+        SerializationError if the data is not in a supported version of the
+        format, is corrupt, or does not contain exactly one expression
+    """
+
+    compact = load_compact(data)
+    if len(compact) != 1:
+        raise SerializationError(
+            'Expected 1 serialized expression, found %s' % (len(compact),)
+        )
+    return _decode(compact.tree, 0)
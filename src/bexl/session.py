@@ -0,0 +1,225 @@
+from collections import OrderedDict
+
+from six import iteritems, string_types
+
+from .compiler import HASHABLE_TYPES
+from .interning import NodeInterner, MemoizingInterpreter
+from .lexer import Lexer
+from .nodes import Variable
+from .parser import Parser
+from .resolver import VariableResolver
+from .types import bexl_to_python, python_to_bexl
+
+
+class SessionInterpreter(MemoizingInterpreter):
+    """
+    An Interpreter that keeps the value of every pure node it evaluates in a
+    cache that outlives the evaluation, so that only the nodes missing from
+    the cache are evaluated the next time.
+
+    :param interner: the NodeInterner that produced the ASTs
+    :type interner: bexl.interning.NodeInterner
+    :param cache: the values of the nodes, keyed by the id() of the node
+    :type cache: dict
+    """
+
+    def __init__(self, interner, cache):
+        super(SessionInterpreter, self).__init__(interner)
+        self._memo = cache
+        self.evaluated = 0
+
+    def interpret(self, tree, variable_resolver=None):
+        return tree.accept(
+            self,
+            resolver=VariableResolver.make_from(variable_resolver),
+        )
+
+    def _memoized(self, visit, node, resolver):
+        key = id(node)
+        if key in self._memo:
+            return self._memo[key]
+        self.evaluated += 1
+        value = visit(node, resolver)
+        if self.interner.is_pure(node):
+            self._memo[key] = value
+        return value
+
+    def visit_variable(self, node, resolver):
+        return self._memoized(
+            super(SessionInterpreter, self).visit_variable,
+            node,
+            resolver,
+        )
+
+
+class EvaluationSession(object):
+    """
+    Evaluates a collection of named BEXL expressions against variables that
+    change a few at a time, such as the state of an entity in a stream of
+    events.
+
+    The session keeps the value of every pure subexpression from one
+    evaluation to the next, along with the variables each of them depends
+    on. When variables are changed, only the subexpressions that depend on
+    them (and the rules that contain those) are evaluated again.
+    Subexpressions that invoke impure functions, such as now(), are never
+    kept, so they are evaluated every time.
+
+    :param rules: the initial rules of the session, as a mapping of names to
+        expression sources
+    :type rules: dict
+    :param variables: the initial values of the variables
+    :type variables: bexl.VariableResolver|dict
+    :param lexer: the Lexer to use when parsing the rules
+    :type lexer: bexl.Lexer
+    :param parser: the Parser to use when parsing the rules
+    :type parser: bexl.Parser
+    """
+
+    def __init__(
+            self,
+            rules=None,
+            variables=None,
+            lexer=Lexer,
+            parser=Parser):
+        self.interner = NodeInterner(lexer=lexer, parser=parser)
+        self.variables = VariableResolver(**dict(variables or {}))
+        self._trees = OrderedDict()
+        self._cache = {}
+        self._dependencies = {}
+        self._dependents = {}
+        self.evaluated = 0
+        for name, source in iteritems(rules or {}):
+            self.add(name, source)
+
+    def add(self, name, source):
+        """
+        Adds a rule to the session.
+
+        :param name: the name of the rule
+        :type name: str
+        :param source: the BEXL expression, or its parsed AST
+        :type source: str|bexl.nodes.Expression
+        """
+
+        if isinstance(source, string_types):
+            tree = self.interner.parse(source)
+        else:
+            tree = self.interner.intern(source)
+        self._trees[name] = tree
+        self._track(tree)
+
+    def _track(self, node):
+        key = id(node)
+        if key in self._dependencies:
+            return self._dependencies[key]
+
+        if isinstance(node, Variable):
+            dependencies = frozenset([node.name])
+        else:
+            dependencies = frozenset().union(*[
+                self._track(child)
+                for child in node.children
+            ])
+        self._dependencies[key] = dependencies
+        for name in dependencies:
+            self._dependents.setdefault(name, set()).add(key)
+        return dependencies
+
+    def __len__(self):
+        return len(self._trees)
+
+    def __contains__(self, name):
+        return name in self._trees
+
+    def __iter__(self):
+        return iter(self._trees)
+
+    def dependencies(self, name):
+        """
+        Returns the names of the variables the named rule depends on.
+
+        :param name: the name of the rule
+        :type name: str
+        :rtype: frozenset
+        """
+
+        return self._dependencies[id(self._trees[name])]
+
+    def update(self, *args, **kwargs):
+        """
+        Changes the values of the given variables (accepting the same
+        arguments as ``dict.update()``), and returns the results of the rules
+        as native Python values.
+
+        :returns: the results of the rules, keyed by name
+        :rtype: dict
+        """
+
+        changes = dict(*args, **kwargs)
+        for name, value in iteritems(changes):
+            value = python_to_bexl(value)
+            if name in self.variables and value.data_type in HASHABLE_TYPES:
+                current = self.variables[name]
+                if current.data_type == value.data_type \
+                        and current.raw_value == value.raw_value:
+                    continue
+            self.variables[name] = value
+            for key in self._dependents.get(name, ()):
+                self._cache.pop(key, None)
+
+        return self.results()
+
+    def remove(self, *names):
+        """
+        Removes the given variables.
+
+        :param names: the names of the variables to remove
+        :type names: str
+        """
+
+        for name in names:
+            if name in self.variables:
+                del self.variables[name]
+                for key in self._dependents.get(name, ()):
+                    self._cache.pop(key, None)
+
+    def results(self, native=True):
+        """
+        Returns the results of the rules for the current variables, evaluating
+        only the subexpressions whose values aren't known.
+
+        :param native:
+            whether or not the results should be the raw bexl.Values returned
+            by the rules, or native Python values. If not specified, native
+            Python values are returned.
+        :type native: bool
+        :returns: the results of the rules, keyed by name
+        :rtype: dict
+        """
+
+        interpreter = SessionInterpreter(self.interner, self._cache)
+        results = OrderedDict()
+        try:
+            for name, tree in iteritems(self._trees):
+                result = interpreter.interpret(tree, self.variables)
+                results[name] = bexl_to_python(result) if native else result
+        finally:
+            self.evaluated = interpreter.evaluated
+        return results
+
+    @property
+    def cached_count(self):
+        """
+        The number of subexpressions whose values are currently known.
+        """
+
+        return len(self._cache)
+
+    def invalidate(self):
+        """
+        Forgets the values of all subexpressions, so that they are all
+        evaluated again the next time the results are requested.
+        """
+
+        self._cache.clear()
@@ -0,0 +1,7 @@
+from . import functions, operators  # noqa: unused-import
+from .dispatcher import DEFAULT_REGISTRY
+
+
+# A frozen snapshot of the operators and functions that are built into BEXL,
+# taken before any application could register functions of its own.
+STANDARD_REGISTRY = DEFAULT_REGISTRY.freeze()
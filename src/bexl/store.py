@@ -0,0 +1,355 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import pkg_resources
+
+from six import text_type
+
+from .canonical import canonicalize, fingerprint
+from .compiler import Compiler, CompiledExpression
+from .lexer import Lexer
+from .parser import Parser
+from .errors import SerializationError
+from .serialization import dumps, loads, FORMAT_VERSION
+
+
+try:
+    BEXL_VERSION = pkg_resources.get_distribution('bexl').version
+except pkg_resources.DistributionNotFound:  # pragma: no cover
+    BEXL_VERSION = 'UNKNOWN'
+
+
+# The number of seconds after which reading an entry refreshes its last-used
+# time.
+TOUCH_INTERVAL = 60
+
+SCHEMA = (
+    '''
+    CREATE TABLE IF NOT EXISTS sources (
+        key TEXT PRIMARY KEY,
+        tree TEXT NOT NULL,
+        last_used REAL NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS trees (
+        id TEXT PRIMARY KEY,
+        data BLOB NOT NULL
+    )
+    ''',
+)
+
+
+def source_key(source):
+    """
+    Returns the key used to store the given expression source.
+
+    :param source: the BEXL expression
+    :type source: str
+    :rtype: str
+    """
+
+    digest = hashlib.sha256()
+    digest.update(
+        ('%s\0%s\0' % (BEXL_VERSION, FORMAT_VERSION)).encode('utf-8')
+    )
+    digest.update(text_type(source).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class StoreStats(object):
+    """
+    Counters describing how an ExpressionStore has been used.
+    """
+
+    __slots__ = (
+        'warm',
+        'cold',
+        'evicted',
+    )
+
+    def __init__(self):
+        self.warm = 0
+        self.cold = 0
+        self.evicted = 0
+
+    @property
+    def hit_rate(self):
+        total = self.warm + self.cold
+        return float(self.warm) / total if total else 0.0
+
+    def __repr__(self):
+        return '%s(warm=%s, cold=%s, evicted=%s)' % (
+            self.__class__.__name__,
+            self.warm,
+            self.cold,
+            self.evicted,
+        )
+
+
+class ExpressionStore(object):
+    """
+    A persistent, on-disk cache of parsed expressions stored in a single
+    SQLite database, keyed by a hash of the expression source and the version
+    of bexl that parsed it.
+
+    The store can be shared by any number of processes; every write happens
+    in its own transaction, so readers never see partially-written entries.
+
+    When ``canonical`` is enabled, the canonical form of each expression is
+    stored under its fingerprint (see bexl.canonical), so that sources which
+    differ only in formatting or operand order share a single stored tree.
+    Errors raised by such a tree point at the source it was first stored for.
+
+    :param path: the path to the database file
+    :type path: str
+    :param max_entries:
+        the maximum number of expressions to keep in the store; the least
+        recently used are evicted when it grows beyond this. If not
+        specified, the store is unbounded.
+    :type max_entries: int
+    :param canonical:
+        whether to store the canonical form of the expressions, deduplicated
+        by fingerprint. If not specified, trees are stored as parsed.
+    :type canonical: bool
+    :param lexer: the Lexer to use when parsing expressions
+    :type lexer: bexl.Lexer
+    :param parser: the Parser to use when parsing expressions
+    :type parser: bexl.Parser
+    :param compiler: the Compiler to use when compiling expressions
+    :type compiler: bexl.Compiler
+    """
+
+    def __init__(
+            self,
+            path,
+            max_entries=None,
+            canonical=False,
+            lexer=Lexer,
+            parser=Parser,
+            compiler=Compiler):
+        self.path = path
+        self.max_entries = max_entries
+        self.canonical = canonical
+        self.lexer = lexer
+        self.parser = parser
+        self.compiler = compiler
+        self.stats = StoreStats()
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    def _connect(self):
+        # SQLite connections can't be carried across a fork(), so each
+        # process opens its own.
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path,
+                timeout=60,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None and self._pid == os.getpid():
+                self._connection.close()
+            self._connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute(
+                'SELECT COUNT(*) FROM sources'
+            ).fetchone()[0]
+
+    @property
+    def tree_count(self):
+        """
+        The number of distinct trees kept in the store.
+        """
+
+        with self._lock:
+            return self._connect().execute(
+                'SELECT COUNT(*) FROM trees'
+            ).fetchone()[0]
+
+    def get(self, source):
+        """
+        Retrieves the parsed AST of the given expression source from the
+        store, or None if it isn't stored. Entries that can't be deserialized
+        (e.g. because the file was corrupted) are removed from the store, and
+        treated as if they weren't stored.
+
+        :param source: the BEXL expression
+        :type source: str
+        :rtype: bexl.nodes.Expression
+        """
+
+        key = source_key(source)
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute(
+                'SELECT trees.data, sources.last_used, trees.id'
+                ' FROM sources JOIN trees ON trees.id = sources.tree'
+                ' WHERE sources.key = ?',
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+
+            # Recording every read would turn a warm start-up into a stream
+            # of write transactions, so the access time is only refreshed
+            # when eviction is enabled and it has gone stale.
+            now = time.time()
+            if self.max_entries is not None \
+                    and now - row[1] > TOUCH_INTERVAL:
+                connection.execute(
+                    'UPDATE sources SET last_used = ? WHERE key = ?',
+                    (now, key),
+                )
+
+            try:
+                return loads(bytes(row[0]))
+            except SerializationError:
+                self._discard(connection, row[2])
+                return None
+
+    def _discard(self, connection, tree_id):  # noqa: no-self-use
+        # The tree may be shared by several sources, which are all discarded
+        # with it.
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'DELETE FROM sources WHERE tree = ?',
+                (tree_id,),
+            )
+            connection.execute(
+                'DELETE FROM trees WHERE id = ?',
+                (tree_id,),
+            )
+        except:  # noqa: bare-except
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def put(self, source, tree):
+        """
+        Stores the parsed AST of the given expression source.
+
+        :param source: the BEXL expression
+        :type source: str
+        :param tree: the parsed AST (or CompiledExpression) of the source
+        :type tree: bexl.nodes.Expression|bexl.CompiledExpression
+        :returns: the AST that was stored
+        :rtype: bexl.nodes.Expression
+        """
+
+        if isinstance(tree, CompiledExpression):
+            tree = tree.tree
+        key = source_key(source)
+        if self.canonical:
+            tree = canonicalize(tree)
+            tree_id = fingerprint(tree)
+        else:
+            tree_id = key
+        data = sqlite3.Binary(dumps(tree))
+
+        with self._lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute(
+                    'INSERT OR IGNORE INTO trees (id, data) VALUES (?, ?)',
+                    (tree_id, data),
+                )
+                connection.execute(
+                    'INSERT OR REPLACE INTO sources (key, tree, last_used)'
+                    ' VALUES (?, ?, ?)',
+                    (key, tree_id, time.time()),
+                )
+                self._evict(connection)
+            except:  # noqa: bare-except
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+        return tree
+
+    def _evict(self, connection):
+        if self.max_entries is None:
+            return
+        excess = connection.execute(
+            'SELECT COUNT(*) FROM sources'
+        ).fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute(
+                'DELETE FROM sources WHERE key IN ('
+                'SELECT key FROM sources'
+                ' ORDER BY last_used, rowid LIMIT ?)',
+                (excess,),
+            )
+            connection.execute(
+                'DELETE FROM trees WHERE id NOT IN (SELECT tree FROM sources)'
+            )
+            self.stats.evicted += excess
+
+    def parse(self, source):
+        """
+        Returns the parsed AST of the given expression source, loading it from
+        the store if possible, otherwise parsing and storing it. If the store
+        is canonical, the canonical form of the AST is returned.
+
+        :param source: the BEXL expression
+        :type source: str
+        :rtype: bexl.nodes.Expression
+        """
+
+        tree = self.get(source)
+        if tree is not None:
+            with self._lock:
+                self.stats.warm += 1
+            return tree
+
+        tree = self.put(source, self.parser(lexer=self.lexer).parse(source))
+        with self._lock:
+            self.stats.cold += 1
+        return tree
+
+    def compile(self, source):
+        """
+        Returns the compiled form of the given expression source, loading its
+        AST from the store if possible.
+
+        :param source: the BEXL expression
+        :type source: str
+        :rtype: bexl.CompiledExpression
+        """
+
+        return self.compiler().compile(self.parse(source))
+
+    def clear(self):
+        """
+        Removes all expressions from the store.
+        """
+
+        with self._lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('DELETE FROM sources')
+            connection.execute('DELETE FROM trees')
+            connection.execute('COMMIT')
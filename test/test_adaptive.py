@@ -0,0 +1,179 @@
+import pickle
+import random
+
+import pytest
+
+from bexl import Compiler, ConversionError, InterpreterError, \
+    LazyVariableResolver, Parser, ResolverError, STANDARD_REGISTRY, compile
+from bexl.adaptive import AdaptiveCompiler, AdaptiveExpression, \
+    flatten_chain
+from bexl.types import Types, make_value, TRUE, FALSE
+
+
+BIG = list(range(2000))
+
+REGISTRY = STANDARD_REGISTRY.derive()
+
+
+@REGISTRY.functions.register('testContains', total=True)
+def contains(needle, haystack):
+    if haystack.data_type != Types.LIST or haystack.is_null:
+        return FALSE
+    return TRUE if needle.value in haystack.value else FALSE
+
+
+def outcome(expression, variables):
+    try:
+        return ('value', expression.evaluate(variables).value)
+    except InterpreterError as exc:
+        return ('error', type(exc), exc.node)
+
+
+def rows(count):
+    generator = random.Random(42)
+    for _ in range(count):
+        yield {
+            'type': generator.choice(['x', 'y', 'z', 'w']),
+            'x': generator.choice([1, 5, -1, 30000]),
+            'n': generator.choice([0, 1, 2, 20]),
+            'flag': generator.random() < 0.25,
+            'other': generator.choice([True, False]),
+            'big': BIG,
+        }
+
+
+@pytest.mark.parametrize('source', (
+    "testContains($x, $big) & $flag",
+    "testContains($x, $big) | $flag | isNull($other)",
+    "$n != 0 & 10 / $n > 1 & ($flag | $other)",
+    "10 / $n > 1 | $n == 0",
+    "in($x, $big) & $type == 'x'",
+    "$missing & $flag",
+    "$flag | $missing",
+    "testContains($missing, $big) & $flag",
+    "[$n] & $type",
+))
+def test_results_identical(source):
+    tree = Parser().parse(source)
+    plain = Compiler(registry=REGISTRY).compile(tree)
+    adaptive = AdaptiveCompiler(interval=10, registry=REGISTRY).compile(tree)
+    for variables in rows(100):
+        assert outcome(adaptive, variables) == outcome(plain, variables)
+
+
+def test_type_errors_are_not_reordered_away():
+    tree = Parser().parse("$n == $s & $t == 'x'")
+    plain = Compiler().compile(tree)
+    adaptive = AdaptiveCompiler(interval=10).compile(tree)
+    # Comparisons raise ConversionErrors for some values, so they're kept in
+    # their original order.
+    assert adaptive.chains == []
+    for _ in range(20):
+        variables = {'n': 5, 's': '5', 't': 'y'}
+        assert outcome(adaptive, variables) == outcome(plain, variables)
+    variables = {'n': 5, 's': 'abc', 't': 'y'}
+    assert outcome(adaptive, variables) == outcome(plain, variables)
+    assert outcome(adaptive, variables)[1] is ConversionError
+
+
+def test_errors_identical_when_encountered():
+    tree = Parser().parse('$a & testContains($x, $big)')
+    plain = Compiler(registry=REGISTRY).compile(tree)
+    adaptive = AdaptiveCompiler(registry=REGISTRY).compile(tree)
+    chain, = adaptive.chains
+    chain.order = (1, 0)
+    assert outcome(adaptive, {'a': False}) == outcome(plain, {'a': False}) \
+        == ('value', False)
+    assert chain.fallbacks == 1
+
+
+def test_skipped_variables_are_resolved():
+    tree = Parser().parse('$missing | $flag')
+    plain = Compiler().compile(tree)
+    adaptive = AdaptiveCompiler().compile(tree)
+    chain, = adaptive.chains
+    chain.order = (1, 0)
+    assert outcome(adaptive, {'flag': True}) == outcome(plain, {'flag': True})
+    assert outcome(adaptive, {'flag': True})[1] is ResolverError
+    assert outcome(adaptive, {'flag': True, 'missing': 1}) == ('value', True)
+    assert chain.statistics[0].evaluations == 0
+
+    # Only the variables that would have been resolved without reordering
+    # are.
+    chain = AdaptiveCompiler().compile(Parser().parse('$a | $b | $c'))
+    chain.chains[0].order = (1, 0, 2)
+    resolver = LazyVariableResolver({'a': False, 'b': True, 'c': False}.get)
+    assert chain.evaluate(resolver).value is True
+    assert sorted(resolver.loads) == ['a', 'b']
+
+
+def test_partial_operands_keep_their_positions():
+    for source in (
+            '$n != 0 & 10 / $n > 1',
+            "$a & $b[0] & $c",
+            "$a | date($y, $m, 1) > $d | $b",
+            "$a & $r.name == 'x'",
+            "in($x, $big) & $flag",
+            "$a & -$b & $c"):
+        assert compile(source, compiler=AdaptiveCompiler).chains == [], \
+            source
+
+    tree = Parser().parse("10 / $n > 1 & testContains($x, $big) & $flag")
+    plain = Compiler(registry=REGISTRY).compile(tree)
+    adaptive = AdaptiveCompiler(interval=10, registry=REGISTRY).compile(tree)
+    chain, = adaptive.chains
+    for variables in rows(100):
+        assert outcome(adaptive, variables) == outcome(plain, variables)
+    assert chain.order == (0, 2, 1)
+
+
+def test_reorders_selective_cheap_operands_first():
+    expression = AdaptiveCompiler(interval=50, registry=REGISTRY).compile(
+        Parser().parse("testContains($x, $big) & $flag"),
+    )
+    assert isinstance(expression, AdaptiveExpression)
+    chain, = expression.chains
+    assert chain.order == (0, 1)
+    for variables in rows(100):
+        expression.evaluate(variables)
+
+    assert chain.order == (1, 0)
+    assert chain.decisions[0][1:] == ((0, 1), (1, 0))
+    description = chain.describe()
+    assert [operand['position'] for operand in description] == [1, 0]
+    assert description[0]['decision_rate'] > 0.5
+    assert chain.statistics[0].evaluations < 100
+
+
+def test_chains_are_flattened():
+    tree = Parser().parse('$a & ($b & ($c | $d)) & $e')
+    operands = flatten_chain(tree)
+    assert [operand.__class__.__name__ for operand in operands] \
+        == ['Variable', 'Variable', 'Binary', 'Variable']
+    assert len(AdaptiveCompiler().compile(tree).chains) == 2
+
+
+def test_only_stock_pure_chains_adapt():
+    assert compile(
+        '$a & now() > $b',
+        compiler=AdaptiveCompiler,
+    ).chains == []
+
+    registry = STANDARD_REGISTRY.derive()
+    registry.functions.register('and')(
+        lambda left, right: make_value(Types.BOOLEAN, True),
+    )
+    assert AdaptiveCompiler(registry=registry).compile(
+        Parser().parse('$a & $b'),
+    ).chains == []
+
+
+def test_pickles_without_statistics():
+    expression = AdaptiveCompiler(interval=5).compile(
+        Parser().parse('$a | $b'),
+    )
+    expression.evaluate({'a': False, 'b': True})
+    restored = pickle.loads(pickle.dumps(expression))
+    assert restored.interval == 5
+    assert restored.chains[0].evaluations == 0
+    assert restored.evaluate({'a': False, 'b': True}).value is True
@@ -0,0 +1,68 @@
+import pytest
+
+from bexl import Parser, STANDARD_REGISTRY, compile, variable_dependencies, \
+    VariableDependency
+from bexl.analysis import is_total
+
+
+def dotted(source):
+    return dict([
+        (name, dependency.dotted())
+        for name, dependency in variable_dependencies(
+            Parser().parse(source),
+        ).items()
+    ])
+
+
+@pytest.mark.parametrize('source,expected', (
+    ('1 + 2', {}),
+    ('$a + $b', {'a': ['a'], 'b': ['b']}),
+    ('$order.customer.id', {'order': ['order.customer.id']}),
+    ('(($order).customer).id', {'order': ['order.customer.id']}),
+    ("$order.customer.id == 1 & $order.total > 5 | $order.customer.name",
+     {'order': ['order.customer.id', 'order.customer.name', 'order.total']}),
+    ('$order.customer.id & $order.customer',
+     {'order': ['order.customer']}),
+    ('$order.items[0].sku', {'order': ['order.items']}),
+    ('$order.total + length($order)', {'order': ['order']}),
+    ('$order[0].id', {'order': ['order']}),
+    ("property($order, 'id')", {'order': ['order']}),
+))
+def test_dotted(source, expected):
+    assert dotted(source) == expected
+
+
+def test_compiled_expression():
+    assert variable_dependencies(compile('$a.b + $c')) == {
+        'a': VariableDependency('a', paths=[('b',)]),
+        'c': VariableDependency('c', whole=True),
+    }
+
+
+@pytest.mark.parametrize('source,expected', (
+    ("$a & $b | $c ^ $d", True),
+    ("isNull($a) & coalesce($b, 1)", True),
+    ("[$a, 1] | $b", True),
+    ("$a == 1 & $b", False),
+    ("in($b, [1, 2]) | $c", False),
+    ("$a & ($b | !$c)", False),
+    ("-$a", False),
+    ("length(upper($s)) > 2", False),
+    ('10 / $n > 1', False),
+    ('$n % 2 == 0', False),
+    ('date($y, $m, $d) > $e', False),
+    ('$l[0] == 1', False),
+    ("$r.name == 'x'", False),
+    ("integer($s) > 1", False),
+))
+def test_is_total(source, expected):
+    assert is_total(Parser().parse(source)) is expected
+
+
+def test_is_total_operators():
+    registry = STANDARD_REGISTRY.derive()
+    registry.functions.register('and', total=False)(
+        registry.functions.get('and'),
+    )
+    assert is_total(Parser().parse('$a & $b'))
+    assert not is_total(Parser().parse('$a & $b'), registry)
@@ -0,0 +1,212 @@
+import asyncio
+
+import pytest
+
+from bexl import compile, evaluate, ResolverError, ExecutionError, \
+    STANDARD_REGISTRY
+from bexl.asynchronous import evaluate_async, AsyncInterpreter, \
+    AsyncVariableResolver, unconditional_variables
+from bexl.parser import Parser
+from bexl.types import make_value, Types
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+class FakeCache(object):
+    def __init__(self, values, delay=0.01):
+        self.values = values
+        self.delay = delay
+        self.requested = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get(self, name):
+        self.requested.append(name)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return self.values[name]
+        finally:
+            self.in_flight -= 1
+
+
+VARIABLES = {
+    'a': 1,
+    'b': 2,
+    'c': 'foo',
+    'flag': False,
+}
+
+
+@pytest.mark.parametrize('source,expected', (
+    ('1 + 2', set()),
+    ('$a + $b * $a', set(['a', 'b'])),
+    ('$flag & $a > 1', set(['flag'])),
+    ('($flag | $a) + $b', set(['flag', 'b'])),
+))
+def test_unconditional_variables(source, expected):
+    assert unconditional_variables(Parser().parse(source)) == expected
+
+
+@pytest.mark.parametrize('source', (
+    '$a + $b * $a',
+    "upper($c) == $c[1:]",
+    '$flag | $a > $b',
+    '$flag & $missing',
+    '[$a, $b][0]',
+))
+def test_results_match_evaluate(source):
+    cache = FakeCache(VARIABLES, delay=0)
+    resolver = AsyncVariableResolver(cache.get)
+    assert run(evaluate_async(source, resolver)) \
+        == evaluate(source, VARIABLES)
+
+
+def test_fetches_are_concurrent():
+    cache = FakeCache(VARIABLES)
+    resolver = AsyncVariableResolver(cache.get)
+    assert run(evaluate_async(compile('$a + $b + length($c)'), resolver)) == 6
+    assert sorted(cache.requested) == ['a', 'b', 'c']
+    assert cache.max_in_flight == 3
+    assert resolver.loads == {'a': 1, 'b': 1, 'c': 1}
+
+
+def test_short_circuit_skips_fetches():
+    cache = FakeCache(VARIABLES)
+    resolver = AsyncVariableResolver(cache.get)
+    assert run(evaluate_async('$flag & $a + $b > 1', resolver)) is False
+    assert cache.requested == ['flag']
+
+    resolver.clear()
+    assert run(evaluate_async('!$flag & $a + $b > 1', resolver)) is True
+    assert cache.requested[:2] == ['flag', 'flag']
+    assert sorted(cache.requested[2:]) == ['a', 'b']
+    assert cache.max_in_flight == 2
+
+
+def test_mapping_of_loaders():
+    async def slow():
+        await asyncio.sleep(0)
+        return 40
+
+    resolver = AsyncVariableResolver({'slow': slow, 'fast': lambda: 2})
+    assert run(evaluate_async('$slow + $fast', resolver)) == 42
+
+
+def test_missing_variable():
+    cache = FakeCache(VARIABLES, delay=0)
+    with pytest.raises(ResolverError):
+        run(evaluate_async('$a + $nope', AsyncVariableResolver(cache.get)))
+    with pytest.raises(ResolverError):
+        run(evaluate_async('$a + $nope', VARIABLES))
+
+
+class FakeGeoService(object):
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.requested = []
+        self.cancelled = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def lookup(self, ip):
+        self.requested.append(ip.value)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled.append(ip.value)
+            raise
+        finally:
+            self.in_flight -= 1
+        return make_value(Types.STRING, ip.value.split('.')[0])
+
+
+GEO = FakeGeoService()
+
+# The coroutine functions are registered with a registry of their own, so
+# that they don't leak into the other tests.
+REGISTRY = STANDARD_REGISTRY.derive()
+
+
+@REGISTRY.functions.register('testGeo', (Types.STRING,))
+async def geo(ip):
+    return await GEO.lookup(ip)
+
+
+@REGISTRY.functions.register('testHang', timeout=0.01)
+async def hang():
+    await asyncio.sleep(10)
+
+
+INTERPRETER = AsyncInterpreter(registry=REGISTRY)
+
+
+@pytest.fixture
+def geo_service():
+    GEO.__init__()
+    return GEO
+
+
+def test_async_function(geo_service):
+    result = run(evaluate_async(
+        "testGeo('us.1.2.3')",
+        interpreter=INTERPRETER,
+    ))
+    assert result == 'us'
+    with pytest.raises(ExecutionError):
+        evaluate("testGeo('us.1.2.3')", registry=REGISTRY)
+
+
+def test_async_calls_are_concurrent(geo_service):
+    source = "testGeo($a) == testGeo($b) | in(testGeo('ca.1'), [testGeo($a)])"
+    variables = {'a': 'us.1', 'b': 'us.2'}
+    assert run(evaluate_async(source, variables, interpreter=INTERPRETER)) \
+        is True
+    assert geo_service.max_in_flight == 2
+    assert sorted(geo_service.requested) == ['us.1', 'us.2']
+
+
+def test_timeouts(geo_service):
+    with pytest.raises(ExecutionError) as excinfo:
+        run(evaluate_async('testHang()', interpreter=INTERPRETER))
+    assert 'testHang' in str(excinfo.value)
+
+    geo_service.delay = 1
+    with pytest.raises(ExecutionError):
+        run(evaluate_async(
+            "testGeo('x.1')",
+            interpreter=AsyncInterpreter(timeout=0.01, registry=REGISTRY),
+        ))
+    assert geo_service.cancelled == ['x.1']
+
+
+@pytest.mark.parametrize('country', ('us', 'ca'))
+def test_speculative_cancellation(geo_service, country):
+    source = "testGeo($a) == $country & testGeo($b) == 'us'"
+    variables = {'a': 'us.1', 'b': 'us.2', 'country': country}
+    expected = country == 'us'
+
+    assert run(evaluate_async(source, variables, interpreter=INTERPRETER)) \
+        is expected
+    assert geo_service.requested \
+        == (['us.1', 'us.2'] if expected else ['us.1'])
+    assert geo_service.max_in_flight == 1
+
+    geo_service.__init__()
+    assert run(evaluate_async(
+        source,
+        variables,
+        interpreter=AsyncInterpreter(speculative=True, registry=REGISTRY),
+    )) is expected
+    assert geo_service.requested == ['us.1', 'us.2']
+    assert geo_service.max_in_flight == 2
+    assert geo_service.cancelled == ([] if expected else ['us.2'])
@@ -0,0 +1,145 @@
+import pytest
+
+from bexl import Parser, DispatchError, STANDARD_REGISTRY, evaluate
+from bexl.batch import evaluate_batch, BatchInterpreter, MemoryStore
+from bexl.types import Types
+
+
+STORE = MemoryStore({
+    'a': 'apple',
+    'b': 'banana',
+    1: 10,
+    2: 20,
+    3: 30,
+    4: 40,
+    'apple': 'fruit',
+})
+
+
+# The batched functions are registered with a registry of their own, so that
+# they don't leak into the other tests.
+REGISTRY = STANDARD_REGISTRY.derive()
+
+
+@REGISTRY.functions.register('testBatchGet', batch=True)
+def batch_get(calls):
+    return STORE.lookup(calls)
+
+
+@REGISTRY.functions.register('testBatchLength', (Types.STRING,), batch=True)
+def batch_length(calls):
+    return [len(arguments[0].value) for arguments in calls]
+
+
+@pytest.fixture(autouse=True)
+def reset_store():
+    STORE.round_trips = STORE.keys_requested = 0
+
+
+ROWS = [
+    {'k': 'a', 'n': 1},
+    {'k': 'b', 'n': 2},
+    {'k': 'a', 'n': 3},
+    {'k': 'z', 'n': 1},
+]
+
+
+def test_single_evaluation():
+    assert evaluate("testBatchGet('a')", registry=REGISTRY) == 'apple'
+    assert evaluate("testBatchLength('abc')", registry=REGISTRY) == 3
+    with pytest.raises(DispatchError):
+        evaluate('testBatchLength(1)', registry=REGISTRY)
+
+
+def test_one_round_trip_for_all_rows():
+    source = 'testBatchGet($k)'
+    expected = [evaluate(source, row, registry=REGISTRY) for row in ROWS]
+    STORE.round_trips = STORE.keys_requested = 0
+    assert evaluate_batch(source, ROWS, registry=REGISTRY) == expected
+    assert STORE.round_trips == 1
+    assert STORE.keys_requested == 3
+
+
+def test_independent_calls_share_a_round():
+    source = "testBatchGet($n) + testBatchGet($n + 1)"
+    interpreter = BatchInterpreter(registry=REGISTRY)
+    results = interpreter.interpret_many([
+        (Parser().parse(source), row)
+        for row in ROWS
+    ])
+    assert [result.value for result in results] == [30, 50, 70, 30]
+    assert interpreter.rounds == 2
+    assert STORE.round_trips == 1
+    assert STORE.keys_requested == 4
+
+
+def test_nested_calls():
+    source = "testBatchLength(testBatchGet(testBatchGet($k)))"
+    rows = [{'k': 'a'}, {'k': 'a'}]
+    assert evaluate_batch(source, rows, registry=REGISTRY) == [5, 5]
+    assert STORE.round_trips == 2
+
+
+def test_short_circuit_skips_calls():
+    source = "$n > 1 & testBatchGet($k) == 'banana'"
+    assert evaluate_batch(source, ROWS, registry=REGISTRY) \
+        == [False, True, False, False]
+    assert STORE.keys_requested == 2
+
+
+def test_many_rules_for_one_event():
+    sources = [
+        "testBatchGet($k) == 'apple'",
+        "testBatchLength(testBatchGet($k))",
+        "testBatchGet('b')",
+    ]
+    interpreter = BatchInterpreter(registry=REGISTRY)
+    results = interpreter.interpret_many([
+        (Parser().parse(source), {'k': 'a'})
+        for source in sources
+    ])
+    assert [result.value for result in results] == [True, 5, 'banana']
+    assert interpreter.rounds == 3
+    assert interpreter.batches == 2
+    assert STORE.round_trips == 1
+
+
+def test_errors_propagate():
+    with pytest.raises(DispatchError):
+        evaluate_batch('testBatchLength($n)', ROWS, registry=REGISTRY)
+
+
+def test_finished_nodes_are_not_evaluated_again():
+    registry = REGISTRY.derive()
+    counts = {'calls': 0}
+
+    @registry.functions.register('testCounted', (Types.INTEGER,))
+    def counted(value):
+        counts['calls'] += 1
+        return value
+
+    source = (
+        "testCounted($n) + length(testBatchGet(testBatchGet($k)))"
+        " + testCounted(length(testBatchGet($k)))"
+    )
+    interpreter = BatchInterpreter(registry=registry)
+    results = interpreter.interpret_many([
+        (Parser().parse(source), {'k': 'a', 'n': 1}),
+    ])
+    assert results[0].value == 1 + 5 + 5
+    assert interpreter.rounds == 3
+    assert counts['calls'] == 2
+
+
+def test_results_are_not_kept_between_batches():
+    interpreter = BatchInterpreter(registry=REGISTRY)
+    tree = Parser().parse("testBatchGet('a')")
+    assert interpreter.interpret(tree).value == 'apple'
+
+    STORE.data['a'] = 'avocado'
+    try:
+        assert interpreter.interpret(tree).value == 'avocado'
+    finally:
+        STORE.data['a'] = 'apple'
+    assert STORE.round_trips == 2
+    assert interpreter._results == {}
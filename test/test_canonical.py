@@ -0,0 +1,69 @@
+import pytest
+
+from bexl import Parser, Interpreter, evaluate
+from bexl.canonical import canonicalize, fingerprint
+from bexl.nodes import Grouping
+
+
+def fp(source):
+    return fingerprint(Parser().parse(source))
+
+
+@pytest.mark.parametrize('first,second', (
+    ('1+2', ' 1 +  2 '),
+    ('(1 + 2)', '1 + 2'),
+    ('((($a)))', '$a'),
+    ('$a + $b', '$b + $a'),
+    ('$a * 2', '2 * $a'),
+    ('$a & $b & $c', '$a & ($b & $c)'),
+    ('$a | $b | $c', '(($a) | $b) | $c'),
+    ('$a ^ $b', '$b ^ $a'),
+    ('1.50', '1.5'),
+    ('1e2', '100.0'),
+    ("'foo'", "'foo'"),
+    ('lower(($x))', 'lower($x)'),
+    ('[$a + 1, 2]', '[1 + $a, (2)]'),
+    ('$a.b[1:2]', '($a).b[(1):2]'),
+))
+def test_equivalent(first, second):
+    assert fp(first) == fp(second)
+
+
+@pytest.mark.parametrize('first,second', (
+    ('1 - 2', '2 - 1'),
+    ('$a == 1', '1 == $a'),
+    ('$a & $b', '$b & $a'),
+    ('$a | $b', '$b | $a'),
+    ('$a / $b', '$b / $a'),
+    ('(1 + 2) * 3', '1 + 2 * 3'),
+    ('1', '1.0'),
+    ('1', "'1'"),
+    ('$a + now()', 'now() + $a'),
+    ('$a[1:]', '$a[:1]'),
+    ('$a[1]', '$a[1:]'),
+))
+def test_different(first, second):
+    assert fp(first) != fp(second)
+
+
+def test_groupings_removed():
+    tree = canonicalize(Parser().parse('((1 + (2)))'))
+    assert not isinstance(tree, Grouping)
+    assert not isinstance(tree.left, Grouping)
+    assert not isinstance(tree.right, Grouping)
+
+
+@pytest.mark.parametrize('source', (
+    '3 * (2 + $a) - $a',
+    "$b & ($a | False) ^ True",
+    "lower('X') == 'x' | $b",
+    '[3, 2, 1][($a)]',
+    'Null',
+))
+def test_same_result(source):
+    variables = {'a': 1, 'b': True}
+    canonical = canonicalize(Parser().parse(source))
+    expected = evaluate(source, variables, native=False)
+    actual = Interpreter().interpret(canonical, variables)
+    assert actual.data_type == expected.data_type
+    assert actual.value == expected.value
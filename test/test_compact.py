@@ -0,0 +1,71 @@
+import pytest
+
+from bexl import Parser
+from bexl.compact import CompactAST, tree_nbytes
+
+
+SOURCES = (
+    '123',
+    "'foo' + $bar",
+    '-$a * (3.5 - 2)',
+    "lower(trim($email)) == 'x' & $a.b[1:2] > 3",
+    '[1, 2, Null, True, False][0]',
+    '$a[:2]',
+    '$a[1:]',
+    '$a[$b]',
+    'record(\'a\', [])',
+)
+
+
+def assert_same_tree(expected, actual):
+    assert type(actual) is type(expected)
+    assert actual.pretty() == expected.pretty()
+    for attr in ('start_token', 'end_token'):
+        exp_token = getattr(expected, attr)
+        act_token = getattr(actual, attr)
+        for slot in exp_token.__slots__:
+            assert getattr(act_token, slot) == getattr(exp_token, slot)
+
+
+@pytest.mark.parametrize('source', SOURCES)
+def test_round_trip(source):
+    tree = Parser().parse(source)
+    compact = CompactAST()
+    assert compact.add(tree) == 0
+    assert_same_tree(tree, compact.tree(0))
+
+
+def test_many_trees():
+    trees = [Parser().parse(source) for source in SOURCES]
+    compact = CompactAST.from_trees(trees)
+    assert len(compact) == len(SOURCES)
+    for tree, decoded in zip(trees, compact.trees()):
+        assert_same_tree(tree, decoded)
+
+
+def test_shared_tokens_stay_shared():
+    compact = CompactAST.from_trees([Parser().parse('1 + 2')])
+    tree = compact.tree(0)
+    assert tree.start_token is tree.left.start_token
+    assert tree.end_token is tree.right.end_token
+
+
+def test_strings_are_interned():
+    compact = CompactAST.from_trees([
+        Parser().parse('lower($email)'),
+        Parser().parse("lower($email) == 'x'"),
+    ])
+    assert compact.strings.count('email') == 1
+    assert compact.strings.count('lower') == 1
+
+
+def test_smaller_than_node_graph():
+    trees = [Parser().parse(source) for source in SOURCES]
+    compact = CompactAST.from_trees(trees)
+    assert compact.nbytes < sum([tree_nbytes(tree) for tree in trees])
+
+
+def test_nodes_have_no_dict():
+    tree = Parser().parse('$a[1]')
+    assert not hasattr(tree, '__dict__')
+    assert tree.index.value == 1
@@ -0,0 +1,172 @@
+import pytest
+
+from bexl import compile, evaluate, Parser, Compiler, CompiledExpression, \
+    Interpreter, InterpreterError, ConversionError, ResolverError, \
+    STANDARD_REGISTRY
+from bexl.canonical import fingerprint
+from bexl.dispatcher import FUNCTIONS
+from bexl.interpreter import SHORT_CIRCUITS
+from bexl.rule_index import extract_guards
+from bexl.token import TokenType
+
+
+CASES = ', '.join([
+    "%d, 'case %d'" % (i, i)
+    for i in range(200)
+])
+
+
+def test_compile_returns_compiled_expression():
+    expr = compile('1 + $foo')
+    assert isinstance(expr, CompiledExpression)
+    assert expr.evaluate({'foo': 2}).value == 3
+    assert expr({'foo': 5}).value == 6
+
+
+@pytest.mark.parametrize('source,variables', (
+    ("switch($x, %s, 'default')" % (CASES,), {'x': 150}),
+    ("switch($x, %s, 'default')" % (CASES,), {'x': 500}),
+    ("switch($x, %s, 'default')" % (CASES,), {'x': 150.0}),
+    ("switch($x, %s, 'default')" % (CASES,), {'x': '150'}),
+    ("switch($x, 'a', 1, 'b', 2, 'a', 3, 4)", {'x': 'a'}),
+    ("switch($x, 'a', 1, 'b', 2, 'a', 3, 4)", {'x': 'c'}),
+    ("switch($x, '1', 1, '2', 2, 3)", {'x': 2}),
+    ("switch($x, 1.0, 'one', 2.5, 'two', 'other')", {'x': 2.5}),
+    ("switch($x, True, 'yes', False, 'no', 'other')", {'x': 0}),
+    ("switch($x, (1), $y, 2, $y + 1, 0)", {'x': 2, 'y': 10}),
+    ("switch($x, $y, 'y', 2, 'two', 'other')", {'x': 2, 'y': 10}),
+    ("switch($x, 1, 'one', 'two', 'two', 'other')", {'x': 'two'}),
+))
+def test_switch_matches_interpreter(source, variables):
+    expected = evaluate(source, variables, native=False)
+    actual = compile(source).evaluate(variables)
+    assert actual.data_type == expected.data_type
+    assert actual.value == expected.value
+
+
+def test_switch_cross_type_errors_match_interpreter():
+    source = "switch($x, 'one', 1, 'two', 2, 3)"
+    with pytest.raises(ConversionError):
+        evaluate(source, {'x': 1})
+    with pytest.raises(ConversionError):
+        compile(source).evaluate({'x': 1})
+
+
+def test_switch_evaluates_all_results():
+    with pytest.raises(ResolverError) as exc:
+        compile("switch(1, 1, 'one', 2, $missing, 'other')").evaluate()
+    assert exc.value.node.name == 'missing'
+
+
+def test_switch_with_custom_equal_is_not_optimized():
+    original = FUNCTIONS.get('equal')
+    try:
+        FUNCTIONS.register('equal')(lambda left, right: original(right, left))
+        tree = Parser().parse("switch(1, 1, 'one', 'other')")
+        compiled = Compiler().compile(tree)
+        assert compiled._function.__name__ == 'function'
+    finally:
+        FUNCTIONS.register('equal')(original)
+
+
+def test_errors_reference_node():
+    with pytest.raises(InterpreterError) as exc:
+        compile("1 + upper('foo')").evaluate()
+    assert exc.value.node.name == '+'
+
+
+def interpreted(source, variables, registry=None):
+    return Interpreter(registry=registry).interpret(
+        Parser().parse(source),
+        variables,
+    )
+
+
+def compiled(source, variables, registry=None):
+    return Compiler(registry=registry).compile(
+        Parser().parse(source),
+    ).evaluate(variables)
+
+
+EVALUATORS = pytest.mark.parametrize('run', (interpreted, compiled))
+
+
+@pytest.fixture
+def counted():
+    registry = STANDARD_REGISTRY.derive()
+    calls = []
+
+    @registry.functions.register('testCounted')
+    def counted_function(value):
+        calls.append(value.value)
+        return value
+
+    return registry, calls
+
+
+@EVALUATORS
+@pytest.mark.parametrize('source,variables,expected,evaluated', (
+    ('testCounted($a) & testCounted($b)', (False, True), False, [False]),
+    ('testCounted($a) & testCounted($b)', (True, False), False,
+     [True, False]),
+    ('testCounted($a) | testCounted($b)', (True, False), True, [True]),
+    ('testCounted($a) | testCounted($b)', (False, True), True,
+     [False, True]),
+    ('testCounted($a) & testCounted($b)', (0, 1), False, [0]),
+    ('testCounted($a) | testCounted($b)', ('', 1), True, ['', 1]),
+))
+def test_short_circuit_skips_right_operand(
+        run,
+        counted,
+        source,
+        variables,
+        expected,
+        evaluated):
+    registry, calls = counted
+    variables = dict(zip(('a', 'b'), variables))
+    assert run(source, variables, registry).value is expected
+    assert calls == evaluated
+
+
+@EVALUATORS
+@pytest.mark.parametrize('source,variables,expected', (
+    ('$a & $missing', {'a': False}, False),
+    ('$a | 1 / 0 > 1', {'a': True}, True),
+    ('$a & upper(1)', {'a': []}, False),
+))
+def test_short_circuit_avoids_errors(run, source, variables, expected):
+    assert run(source, variables).value is expected
+
+
+@EVALUATORS
+@pytest.mark.parametrize('source,variables,error', (
+    ('$a & $missing', {'a': True}, ResolverError),
+    ('$a | $missing', {'a': False}, ResolverError),
+    ('$a & 1 / $b > 1', {'a': 1, 'b': 0}, InterpreterError),
+))
+def test_short_circuit_raises_when_undecided(run, source, variables, error):
+    with pytest.raises(error):
+        run(source, variables)
+
+
+def test_short_circuit_can_be_disabled(monkeypatch):
+    for name in list(SHORT_CIRCUITS):
+        monkeypatch.delitem(SHORT_CIRCUITS, name)
+
+    for run in (interpreted, compiled):
+        with pytest.raises(ResolverError):
+            run('$a & $missing', {'a': False})
+        with pytest.raises(ResolverError):
+            run('$a | $missing', {'a': True})
+        assert run('$a | $b', {'a': False, 'b': True}).value is True
+
+    assert fingerprint(Parser().parse('$a & $b')) \
+        == fingerprint(Parser().parse('$b & $a'))
+    assert extract_guards(Parser().parse("$a == 1 & $b")) == []
+
+
+def test_short_circuit_operators():
+    assert SHORT_CIRCUITS == {
+        TokenType.AMPERSAND: False,
+        TokenType.PIPE: True,
+    }
@@ -0,0 +1,112 @@
+from collections import OrderedDict
+
+import pytest
+
+from bexl import estimate_cost, CostModel, compile, STANDARD_REGISTRY
+from bexl.cost import order_by_cost, linear_cost, total_size
+from bexl.nodes import Function
+
+
+@pytest.mark.parametrize('source,cost,size', (
+    ('1', 1, 1),
+    ("'abc'", 1, 3),
+    ('((1))', 1, 1),
+    ('[1, 2, 3]', 7, 3),
+    ('$x', 1, 10),
+    ('$x[0:2]', 4, 2),
+    ('-$x', 2, 1),
+    ('$x + 1 > 2', 5, 1),
+    ('sum([1, 2, 3])', 11, 1),
+    ('sum($x)', 12, 1),
+    ("concat('ab', 'cde')", 8, 5),
+    ("upper(concat($x, $x))", 44, 20),
+    ('now()', 1, 1),
+    ("repeat('abc', 1000)", 3007, 3000),
+    ('repeat($x, 3)', 44, 30),
+    ('$x[2:5]', 4, 3),
+    ('$x[2:50]', 4, 10),
+    ('$x[2:]', 3, 10),
+    ('head($x, 3)', 3, 3),
+    ('tail($x)', 2, 1),
+    ("head('abc', $n)", 3, 3),
+    ("repeat('x', -5)", 6, 0),
+    ("repeat('x', -(5))", 6, 0),
+    ("repeat('x')", 3, 1),
+    ('repeat()', 1, 1),
+    ('head()', 1, 1),
+    ('tail()', 1, 1),
+))
+def test_estimates(source, cost, size):
+    estimate = estimate_cost(source)
+    assert (estimate.cost, estimate.size) == (cost, size)
+
+
+def test_variable_sizes():
+    model = CostModel(variable_sizes={'prices': 1000}, default_size=2)
+    assert estimate_cost('sum($prices) + sum($other)', model).cost \
+        == (1001 + 1) + (3 + 1) + 1
+    assert model.estimate(compile('$prices')).size == 1000
+
+
+def test_registered_costs():
+    registry = STANDARD_REGISTRY.derive()
+    registry.functions.register('testPricey', cost=50)(lambda: None)
+    registry.functions.register(
+        'testScan',
+        cost=linear_cost,
+        size=total_size,
+    )(
+        lambda *values: None,
+    )
+    model = CostModel(functions=registry.functions)
+    assert estimate_cost('testPricey()', model).cost == 50
+    estimate = estimate_cost("testScan('abc', [1, 2])", model)
+    assert (estimate.cost, estimate.size) == (6 + 1 + 5, 5)
+
+
+def test_breakdown():
+    estimate = estimate_cost("$flag | sum($prices) > 100 & upper($x) == 'A'")
+    breakdown = estimate.breakdown()
+    assert breakdown[0] is estimate
+    assert len(breakdown) == len(list(estimate.walk())) == 11
+    assert [item.cost for item in breakdown] \
+        == sorted([item.cost for item in breakdown], reverse=True)
+    functions = [
+        item.node.name
+        for item in breakdown
+        if isinstance(item.node, Function)
+    ]
+    assert functions == ['sum', 'upper']
+
+
+def test_order_by_cost():
+    rules = OrderedDict([
+        ('scan', 'any($items)'),
+        ('simple', '$a > 1'),
+        ('constant', '1'),
+        ('also_simple', '$b > 1'),
+    ])
+    assert order_by_cost(rules) \
+        == ['constant', 'simple', 'also_simple', 'scan']
+
+
+def test_literal_values():
+    registry = STANDARD_REGISTRY.derive()
+    seen = []
+    registry.functions.register(
+        'testValues',
+        cost=lambda sizes, values: seen.append(values) or 1,
+    )(lambda *values: None)
+    estimate_cost(
+        "testValues(2, ('ab'), $x, 1 + 1, -2.5, -$x, !1)",
+        CostModel(functions=registry.functions),
+    )
+    assert seen == [[2, 'ab', None, None, -2.5, None, None]]
+
+
+def test_generated_values_outweigh_comparisons():
+    comparison = estimate_cost('$a == 1').cost
+    assert estimate_cost("repeat('ab', 100000)").cost > 1000 * comparison
+    assert estimate_cost("length(repeat('ab', 100000)) > 1").cost \
+        > 1000 * comparison
+    assert estimate_cost("upper(repeat('ab', 100000))").size == 200000
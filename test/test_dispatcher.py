@@ -0,0 +1,226 @@
+import pickle
+import threading
+
+import pytest
+
+from bexl import Compiler, Parser, DispatchError, Interpreter, RuleSet, \
+    STANDARD_REGISTRY, compile, evaluate
+from bexl.batch import evaluate_batch
+from bexl.dispatcher import Dispatcher, FrozenDispatcher, Delegate, \
+    DEFAULT_REGISTRY, FUNCTIONS
+from bexl.types import Types, make_value
+
+
+@pytest.fixture
+def scratch_functions(monkeypatch):
+    # Lets a test register functions globally without affecting the others.
+    monkeypatch.setattr(FUNCTIONS, '_functions', dict(FUNCTIONS._functions))
+    monkeypatch.setattr(FUNCTIONS, '_metadata', dict(FUNCTIONS._metadata))
+    return FUNCTIONS
+
+
+def compile_with(registry, source):
+    return Compiler(registry=registry).compile(Parser().parse(source))
+
+
+def test_frozen_dispatcher_is_a_snapshot():
+    dispatcher = Dispatcher()
+    dispatcher.register('one', (Types.INTEGER,), pure=False)(lambda x: x)
+    frozen = dispatcher.freeze()
+    dispatcher.register('one', (Types.STRING,))(lambda x: x)
+    dispatcher.register('two')(lambda: None)
+
+    assert isinstance(frozen, FrozenDispatcher)
+    assert frozen.frozen and not dispatcher.frozen
+    assert list(frozen.get('one')) == [(Types.INTEGER,)]
+    assert frozen.get('two') is None
+    assert frozen.names() == ['one']
+    assert dispatcher.names() == ['one', 'two']
+    assert frozen.metadata('one') == {'pure': False}
+    assert frozen.freeze() is frozen
+
+    frozen.get('one').clear()
+    frozen.metadata('one').clear()
+    assert list(frozen.get('one')) == [(Types.INTEGER,)]
+    assert frozen.metadata('one') == {'pure': False}
+
+    with pytest.raises(TypeError):
+        frozen.register('three')(lambda: None)
+
+
+def test_frozen_dispatcher_checks_arguments():
+    dispatcher = Dispatcher()
+    dispatcher.register('pair')(lambda left, right=None: left)
+    frozen = dispatcher.freeze()
+    one = make_value(Types.INTEGER, 1)
+    assert frozen.call('pair', one) is one
+    assert frozen.call('pair', one, one) is one
+    with pytest.raises(DispatchError):
+        frozen.call('pair')
+    with pytest.raises(DispatchError):
+        frozen.call('pair', one, one, one)
+
+
+def test_frozen_registry_ignores_later_registrations(scratch_functions):
+    registry = DEFAULT_REGISTRY.freeze()
+    assert registry.frozen and not DEFAULT_REGISTRY.frozen
+    assert registry.freeze() is registry
+
+    expression = compile_with(registry, "upper($x) == 'A' & 1 + 1 == 2")
+    scratch_functions.register('upper', (Types.STRING,))(
+        lambda value: make_value(Types.STRING, 'nope'),
+    )
+    # The + operator delegates to "add", which must come from the snapshot.
+    scratch_functions.register('add', (Types.INTEGER, Types.INTEGER))(
+        lambda left, right: make_value(Types.INTEGER, 0),
+    )
+
+    assert expression.evaluate({'x': 'a'}).value is True
+    assert compile_with(DEFAULT_REGISTRY, '1 + 1').evaluate().value == 0
+
+
+def test_delegates_bind_to_snapshot():
+    delegate = Delegate('add')
+    frozen = FUNCTIONS.freeze()
+    bound = delegate.bind(frozen)
+    assert bound.name == 'add' and bound.functions is frozen
+    assert delegate.functions is None
+    assert pickle.loads(pickle.dumps(delegate)).name == 'add'
+
+    switch = FUNCTIONS.get('switch')
+    assert switch.functions is None
+    assert frozen.get('switch').functions is frozen
+    assert pickle.loads(pickle.dumps(switch)).names == ('equal',)
+
+
+def test_functions_invoke_functions_of_their_registry(scratch_functions):
+    # The subject and the cases are of different types, so switch() invokes
+    # "equal" rather than compiling into a jump table.
+    source = "switch($a, 1, 'match', 'nomatch')"
+    registry = STANDARD_REGISTRY.derive().freeze()
+    expression = compile_with(registry, source)
+    tree = Parser().parse(source)
+
+    scratch_functions.register('equal')(
+        lambda left, right: make_value(Types.BOOLEAN, False),
+    )
+    assert expression.evaluate({'a': 1.0}).value == 'match'
+    assert Interpreter(registry=registry).interpret(
+        tree,
+        {'a': 1.0},
+    ).value == 'match'
+
+    # A registry that overrides "equal" gets it for switch() too.
+    tenant = STANDARD_REGISTRY.derive()
+    tenant.functions.register('equal')(
+        lambda left, right: make_value(Types.BOOLEAN, True),
+    )
+    assert evaluate('1 == 2', registry=tenant) is True
+    assert evaluate("switch(1, 2, 'match', 'nomatch')", registry=tenant) \
+        == 'match'
+    assert evaluate(
+        "switch(1, 2, 'match', 'nomatch')",
+        registry=tenant.freeze(),
+    ) == 'match'
+    assert evaluate("switch(1, 2, 'match', 'nomatch')") == 'nomatch'
+
+    # Selecting switch() selects the function it invokes.
+    assert STANDARD_REGISTRY.derive(['switch']).functions.get('equal')
+
+
+def test_concurrent_evaluation_during_registration(scratch_functions):
+    expression = compile_with(
+        DEFAULT_REGISTRY.freeze(),
+        "concat(upper($name), string($count * 2))"
+        " == concat('N', string($count + $count))",
+    )
+    start = threading.Event()
+    failures = []
+
+    def evaluate(offset):
+        start.wait()
+        try:
+            for count in range(offset, offset + 300):
+                result = expression.evaluate({'name': 'n', 'count': count})
+                if result.value is not True:
+                    failures.append(count)
+        except Exception as exc:  # noqa: broad-except
+            failures.append(exc)
+
+    threads = [
+        threading.Thread(target=evaluate, args=(offset * 1000,))
+        for offset in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for position in range(300):
+        scratch_functions.register('testStress%d' % (position,))(
+            lambda: None,
+        )
+        scratch_functions.register(
+            'multiply',
+            (Types.INTEGER, Types.INTEGER),
+        )(lambda left, right: make_value(Types.INTEGER, -1))
+        scratch_functions.register('upper', (Types.STRING,))(
+            lambda value: make_value(Types.STRING, str(position)),
+        )
+    for thread in threads:
+        thread.join()
+
+    assert failures == []
+
+
+def test_derived_registries_are_isolated(scratch_functions):
+    scratch_functions.register('testGlobal')(lambda: None)
+    assert STANDARD_REGISTRY.frozen
+    assert STANDARD_REGISTRY.functions.get('testGlobal') is None
+
+    tenant = STANDARD_REGISTRY.derive()
+    other = STANDARD_REGISTRY.derive()
+    tenant.functions.register('shout', (Types.STRING,))(
+        lambda value: make_value(Types.STRING, value.value.upper() + '!'),
+    )
+    tenant.functions.register('add', (Types.INTEGER, Types.INTEGER))(
+        lambda left, right: make_value(Types.INTEGER, 42),
+    )
+    tenant = tenant.freeze()
+
+    assert evaluate("shout('hi')", registry=tenant) == 'HI!'
+    assert compile('1 + 1', registry=tenant).evaluate().value == 42
+    assert Interpreter(registry=tenant).interpret(
+        Parser().parse('1 + 1'),
+    ).value == 42
+    for registry in (other, STANDARD_REGISTRY, DEFAULT_REGISTRY):
+        assert evaluate('1 + 1', registry=registry) == 2
+        with pytest.raises(DispatchError):
+            evaluate("shout('hi')", registry=registry)
+
+
+def test_derived_registry_with_selected_functions():
+    registry = STANDARD_REGISTRY.derive(['upper']).freeze()
+    assert registry.functions.get('lower') is None
+    assert evaluate(
+        "upper($r.name[0:2]) == 'AB' & -$r.n < 0",
+        {'r': {'name': 'abc', 'n': 1}},
+        registry=registry,
+    ) is True
+    with pytest.raises(DispatchError):
+        evaluate("lower('A')", registry=registry)
+    with pytest.raises(DispatchError):
+        STANDARD_REGISTRY.derive(['testMissing'])
+
+
+def test_other_evaluators_accept_registries():
+    registry = STANDARD_REGISTRY.derive()
+    registry.functions.register('double', (Types.INTEGER,))(
+        lambda value: make_value(Types.INTEGER, value.value * 2),
+    )
+
+    rules = RuleSet({'doubled': 'double($x) > 2'}, registry=registry)
+    assert rules.evaluate({'x': 2}) == {'doubled': True}
+    assert evaluate_batch(
+        'double($x)',
+        [{'x': 1}, {'x': 2}],
+        registry=registry,
+    ) == [2, 4]
@@ -0,0 +1,188 @@
+import pytest
+
+from bexl import DispatchError, InterpreterError, Interpreter, Parser, \
+    VariableResolver
+from bexl.generator import ExpressionGenerator, Mix, PathologicalSearch, \
+    Timings, find_pathological, growth_exponent, probe_signatures
+from bexl.nodes import Binary, Function, Unary
+
+
+def evaluate(source, row):
+    return Interpreter().interpret(
+        Parser().parse(source),
+        VariableResolver.make_from(row),
+    )
+
+
+def depth(node):
+    return 1 + max([depth(child) for child in node.children] or [0])
+
+
+def names(node):
+    found = set()
+    if isinstance(node, (Binary, Unary, Function)):
+        found.add(node.name)
+    for child in node.children:
+        found.update(names(child))
+    return found
+
+
+def test_probe_signatures():
+    signatures = set([
+        (signature.kind, signature.name, signature.arguments, signature.result)
+        for signature in probe_signatures()
+    ])
+    assert ('binary', '+', ('integer', 'integer'), 'integer') in signatures
+    assert ('binary', '&', ('boolean', 'string'), 'boolean') in signatures
+    assert ('unary', '!', ('boolean',), 'boolean') in signatures
+    assert ('function', 'upper', ('string',), 'string') in signatures
+    assert ('function', 'if', ('boolean', 'integer', 'integer'), 'integer') \
+        in signatures
+
+    # The type of the result of if() depends on the condition.
+    assert ('function', 'if', ('boolean', 'integer', 'string'), 'integer') \
+        not in signatures
+    assert not [
+        signature
+        for signature in signatures
+        if signature[1] in ('property', 'at', 'slice', 'add')
+    ]
+
+
+def test_well_typed():
+    generator = ExpressionGenerator(seed=0)
+    for _ in range(200):
+        source = generator.expression()
+        try:
+            evaluate(source, generator.row())
+        except DispatchError:  # pragma: no cover
+            pytest.fail('%s is not well-typed' % (source,))
+        except Exception:  # noqa: broad-except
+            # Well-typed expressions can still fail on the values they're
+            # evaluated with.
+            pass
+
+
+@pytest.mark.parametrize('data_type', (
+    'integer',
+    'float',
+    'string',
+    'boolean',
+    'date',
+    'list',
+    'record',
+))
+def test_result_type(data_type):
+    generator = ExpressionGenerator(
+        mix=Mix(functions=['abs', 'upper']),
+        seed=1,
+    )
+    for _ in range(20):
+        source = generator.expression(data_type)
+        try:
+            value = evaluate(source, generator.row())
+        except InterpreterError:
+            continue
+        assert value.data_type == data_type, source
+
+
+def test_seed():
+    first = ExpressionGenerator(seed=5)
+    second = ExpressionGenerator(seed=5)
+    assert [first.expression() for _ in range(20)] \
+        == [second.expression() for _ in range(20)]
+    assert first.rows(3) == second.rows(3)
+
+
+def test_limits():
+    generator = ExpressionGenerator(max_depth=3, max_width=2, seed=2)
+    for _ in range(100):
+        tree = Parser().parse(generator.expression())
+        # Each level of the generator may add a grouping, a property access
+        # or an indexing to its node.
+        assert depth(tree) <= 3 * 3 + 2
+
+    for row in generator.rows(20):
+        assert 1 <= len(row['l'].raw_value) <= 2
+
+
+def test_mix():
+    generator = ExpressionGenerator(
+        mix=Mix(functions={'upper': 1, 'length': 3}, operators=['+']),
+        seed=3,
+    )
+    used = set()
+    for _ in range(100):
+        used.update(names(Parser().parse(generator.expression())))
+    # Negative indexes (e.g. $l[-1]) are negated integers.
+    assert used == set(['upper', 'length', '+', '-'])
+
+    generator = ExpressionGenerator(
+        mix=Mix(weights={'grouping': 0}, functions=[], operators=[]),
+        seed=3,
+    )
+    assert generator.expression('integer').lstrip('$').isalnum()
+
+
+def test_schema():
+    generator = ExpressionGenerator(
+        schema={'person': {'name': 'string', 'scores': ['integer']}},
+        mix=Mix(functions=['upper'], operators=[]),
+        seed=4,
+    )
+    row = generator.row(size=5)
+    assert list(row) == ['person']
+    assert len(row['person'].raw_value['name'].raw_value) == 5
+    assert len(row['person'].raw_value['scores'].raw_value) == 5
+    assert generator.expression('string').startswith(('$person', "'", 'upp'))
+
+    with pytest.raises(ValueError):
+        generator.expression('time')
+
+
+def test_growth_exponent():
+    sizes = [10, 20, 40]
+    assert growth_exponent(sizes, [1, 2, 4]) == pytest.approx(1)
+    assert growth_exponent(sizes, [1, 4, 16]) == pytest.approx(2)
+
+    assert Timings(sizes, [1, 4, 16]).exponent == pytest.approx(2)
+    assert Timings(sizes, [1, 4, 16]).failed_size is None
+    assert Timings(sizes, [1]).exponent is None
+    assert Timings(sizes, [1]).failed_size == 20
+
+
+def test_pathological_failures():
+    # Deeply nested groupings exceed the recursion limit of the parser.
+    search = PathologicalSearch(
+        ExpressionGenerator(seed=6),
+        sizes=(8, 16, 1000),
+        stages=('lex', 'parse'),
+        min_time=0.0001,
+    )
+    found = search.check('1 + $i')
+    failures = dict([
+        (reproducer.family, reproducer)
+        for reproducer in found
+        if reproducer.failure is not None
+    ])
+    assert failures['grouping'].stage == 'parse'
+    assert isinstance(failures['grouping'].failure, RuntimeError)
+    # It's minimized to a subexpression.
+    assert failures['grouping'].base in ('1', '$i')
+    assert failures['grouping'].example.count('(') == 1000
+    assert 'parse fails at size 1000' in failures['grouping'].describe()
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_find_pathological(seed):
+    # The generated expressions can fail with errors other than BexlErrors,
+    # which the search skips rather than raising.
+    found = find_pathological(
+        ExpressionGenerator(seed=seed),
+        count=5,
+        sizes=(2, 4, 8),
+        threshold=10,
+        min_time=0.0001,
+    )
+    assert [reproducer for reproducer in found if reproducer.example] \
+        == found
@@ -0,0 +1,145 @@
+import pickle
+
+import pytest
+
+from bexl import Compiler, CompiledExpression, Parser, ResolverError, \
+    DispatchError
+from bexl.functions.comparison import equal
+from bexl.functions.logical import switch
+from bexl.functions.strings import upper
+from bexl.hooks import EvaluationHooks, HookedCompiler, HookedExpression, \
+    HookedInterpreter
+
+
+class Tracer(EvaluationHooks):
+    def __init__(self):
+        self.events = []
+
+    def enter(self, node):
+        self.events.append(('enter', node.__class__.__name__))
+
+    def exit(self, node, value):
+        self.events.append(('exit', node.__class__.__name__, value.value))
+
+    def variable(self, node, value):
+        self.events.append(('variable', node.name, value.value))
+
+    def dispatch(self, name, implementation, arguments):
+        self.events.append(('dispatch', name, implementation))
+
+    def error(self, node, error):
+        self.events.append((
+            'error',
+            node.__class__.__name__,
+            error.__class__.__name__,
+        ))
+
+
+class Coverage(EvaluationHooks):
+    def __init__(self):
+        self.covered = set()
+
+    def enter(self, node):
+        self.covered.add(id(node))
+
+
+def interpreted(hooks, source, variables=None):
+    return HookedInterpreter(hooks).interpret(
+        Parser().parse(source),
+        variables,
+    )
+
+
+def compiled(hooks, source, variables=None):
+    return HookedCompiler(hooks).compile(
+        Parser().parse(source),
+    ).evaluate(variables)
+
+
+EVALUATORS = pytest.mark.parametrize('run', (interpreted, compiled))
+
+
+@EVALUATORS
+def test_events(run):
+    tracer = Tracer()
+    assert run(tracer, 'upper($a) == $a', {'a': 'X'}).value is True
+    assert tracer.events == [
+        ('enter', 'Binary'),
+        ('enter', 'Function'),
+        ('enter', 'Variable'),
+        ('variable', 'a', 'X'),
+        ('exit', 'Variable', 'X'),
+        ('dispatch', 'upper', upper),
+        ('exit', 'Function', 'X'),
+        ('enter', 'Variable'),
+        ('variable', 'a', 'X'),
+        ('exit', 'Variable', 'X'),
+        ('dispatch', 'equal', equal),
+        ('exit', 'Binary', True),
+    ]
+
+
+@EVALUATORS
+def test_errors_propagate_through_nodes(run):
+    tracer = Tracer()
+    with pytest.raises(ResolverError):
+        run(tracer, '-($missing)')
+    assert tracer.events == [
+        ('enter', 'Unary'),
+        ('enter', 'Grouping'),
+        ('enter', 'Variable'),
+        ('error', 'Variable', 'ResolverError'),
+        ('error', 'Grouping', 'ResolverError'),
+        ('error', 'Unary', 'ResolverError'),
+    ]
+
+    tracer = Tracer()
+    with pytest.raises(DispatchError):
+        run(tracer, "upper(1)")
+    assert tracer.events[-1] == ('error', 'Function', 'DispatchError')
+
+
+@EVALUATORS
+def test_switch_dispatch(run):
+    tracer = Tracer()
+    assert run(tracer, "switch($x, 1, 'one', 'other')", {'x': 1}).value \
+        == 'one'
+    (_, name, implementation), = [
+        event
+        for event in tracer.events
+        if event[0] == 'dispatch'
+    ]
+    assert name == 'switch'
+    assert implementation.func is switch
+
+
+@EVALUATORS
+def test_multiple_hooks(run):
+    tracer = Tracer()
+    coverage = Coverage()
+    assert run([tracer, coverage], '$a | $b', {'a': True}).value is True
+    assert len(coverage.covered) == 2
+    assert ('variable', 'a', True) in tracer.events
+
+
+def test_uninterested_hooks_compile_plain_expressions():
+    tree = Parser().parse('$a + 1')
+    expression = HookedCompiler(EvaluationHooks()).compile(tree)
+    assert type(expression) is CompiledExpression  # noqa: unidiomatic-typecheck
+    assert HookedCompiler([]).compile(tree).evaluate({'a': 1}).value == 2
+
+    # Only the nodes are wrapped when only enter() is overridden.
+    compiler = HookedCompiler(Coverage())
+    assert compiler.registry is compiler.uninstrumented_registry
+    expression = compiler.compile(tree)
+    assert isinstance(expression, HookedExpression)
+    assert Compiler().compile(tree).evaluate({'a': 1}) \
+        == expression.evaluate({'a': 1})
+
+
+def test_pickles_with_hooks():
+    expression = HookedCompiler(Coverage()).compile(Parser().parse('$a'))
+    restored = pickle.loads(pickle.dumps(expression))
+    assert restored.evaluate({'a': 1}).value == 1
+    coverage, = restored.hooks.hooks
+    assert len(coverage.covered) == 1
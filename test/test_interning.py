@@ -0,0 +1,70 @@
+from bexl import Parser, evaluate
+from bexl.dispatcher import FUNCTIONS
+from bexl.types import Types
+from bexl.interning import NodeInterner, MemoizingInterpreter
+
+
+RULES = (
+    "lower(trim($email)) == 'a@example.com'",
+    "lower(trim($email)) == 'b@example.com' & date($signup) > date('2020-01-01')",
+    "date($signup) < today() | lower(trim($email)) == 'c@example.com'",
+    '[1, 2][0] + 1',
+    '[1, 2][0] - 1',
+)
+
+VARIABLES = {
+    'email': ' A@Example.com ',
+    'signup': '2020-02-03',
+}
+
+
+def test_shared_subtrees():
+    interner = NodeInterner()
+    trees = interner.parse_many(RULES)
+    first = trees[0].left
+    assert trees[1].left.left is first
+    assert trees[2].right.left is first
+    assert trees[1].right.left is trees[2].left.left
+    assert trees[3].left is trees[4].left
+    assert interner.uses(first) == 3
+
+
+def test_dedup_ratio():
+    interner = NodeInterner()
+    interner.parse_many(RULES)
+    assert interner.unique_count < interner.node_count
+    assert interner.dedup_ratio > 1.0
+
+
+def test_trees_unchanged():
+    interner = NodeInterner()
+    for rule, tree in zip(RULES, interner.parse_many(RULES)):
+        assert tree.pretty() == Parser().parse(rule).pretty()
+
+
+def test_purity():
+    interner = NodeInterner()
+    tree = interner.parse('today() + $a - date($b)')
+    assert not interner.is_pure(tree)
+    assert not interner.is_pure(tree.left)
+    assert interner.is_pure(tree.right)
+
+
+def test_memoized_evaluation(monkeypatch):
+    interner = NodeInterner()
+    trees = interner.parse_many(RULES)
+
+    calls = []
+    original = FUNCTIONS.get('trim')[(Types.STRING,)]
+    monkeypatch.setitem(
+        FUNCTIONS.get('trim'),
+        (Types.STRING,),
+        lambda value: calls.append(value) or original(value),
+    )
+    results = MemoizingInterpreter(interner).interpret_many(trees, VARIABLES)
+
+    assert len(calls) == 1
+    assert [result.value for result in results] == [
+        evaluate(rule, VARIABLES)
+        for rule in RULES
+    ]
@@ -0,0 +1,88 @@
+import pickle
+import time
+
+import pytest
+
+from bexl import compile, evaluate, ExecutionLimits, LimitExceededError, \
+    ExecutionError, CompiledExpression, STANDARD_REGISTRY
+from bexl.limits import LimitedExpression
+from bexl.types import Types, make_value
+
+
+def interpreted(source, variables=None, **kwargs):
+    return evaluate(source, variables, **kwargs)
+
+
+def compiled(source, variables=None, **kwargs):
+    return compile(source, **kwargs).evaluate(variables).value
+
+
+EVALUATORS = pytest.mark.parametrize('run', (interpreted, compiled))
+
+
+@EVALUATORS
+def test_step_limit(run):
+    assert run('1 + (2)', limits=ExecutionLimits(max_steps=4)) == 3
+    with pytest.raises(LimitExceededError) as exc:
+        run('1 + (2)', limits=ExecutionLimits(max_steps=3))
+    assert exc.value.limit == 'max_steps'
+    assert isinstance(exc.value, ExecutionError)
+
+
+@EVALUATORS
+def test_allocation_limit(run):
+    limits = ExecutionLimits(max_allocation=1000)
+    assert run("length(repeat('ab', 500))", limits=limits) == 1000
+
+    started = time.time()
+    with pytest.raises(LimitExceededError) as exc:
+        run("repeat('x', 1000000000)", limits=limits)
+    assert time.time() - started < 1
+    assert exc.value.limit == 'max_allocation'
+    assert exc.value.node.name == 'repeat'
+
+    with pytest.raises(LimitExceededError):
+        run(
+            'concat($a, $a, [1, 2])',
+            {'a': list(range(500))},
+            limits=limits,
+        )
+    with pytest.raises(LimitExceededError):
+        run("replace($a, 'a', 'aaa')", {'a': 'a' * 400}, limits=limits)
+
+
+@EVALUATORS
+def test_list_construction_counts_toward_allocation(run):
+    source = '[1, 2, 3] == [1, 2, 3]'
+    assert run(source, limits=ExecutionLimits(max_allocation=6)) is True
+    with pytest.raises(LimitExceededError):
+        run(source, limits=ExecutionLimits(max_allocation=5))
+
+
+@EVALUATORS
+def test_deadline(run):
+    registry = STANDARD_REGISTRY.derive()
+    registry.functions.register('testSlow')(
+        lambda: time.sleep(0.02) or make_value(Types.INTEGER, 1),
+    )
+    source = 'testSlow() + testSlow() + testSlow() + testSlow()'
+    assert run(source, registry=registry) == 4
+    with pytest.raises(LimitExceededError) as exc:
+        run(source, registry=registry, limits=ExecutionLimits(timeout=0.03))
+    assert exc.value.limit == 'timeout'
+
+
+def test_budget_is_per_evaluation():
+    expression = compile('$a + 1', limits=ExecutionLimits(max_steps=3))
+    assert isinstance(expression, LimitedExpression)
+    for value in range(3):
+        assert expression.evaluate({'a': value}).value == value + 1
+
+    restored = pickle.loads(pickle.dumps(expression))
+    assert restored.limits.max_steps == 3
+    assert restored.evaluate({'a': 1}).value == 2
+
+
+def test_no_limits_compiles_plain_expression():
+    expression = compile('$a + 1', limits=ExecutionLimits())
+    assert type(expression) is CompiledExpression  # noqa: unidiomatic-typecheck
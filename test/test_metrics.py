@@ -0,0 +1,148 @@
+import os
+import pickle
+import threading
+
+import pytest
+
+from bexl import Compiler, DispatchError, Interpreter, Parser, \
+    STANDARD_REGISTRY, compile, evaluate
+from bexl.dispatcher import Dispatcher
+from bexl.metrics import DispatchMetrics
+
+
+@pytest.fixture
+def registry():
+    registry = STANDARD_REGISTRY.derive()
+    registry.functions.metrics = DispatchMetrics()
+    return registry.freeze()
+
+
+def test_records_calls_per_signature(registry):
+    metrics = registry.functions.metrics
+    assert evaluate("upper('a') == 'A'", registry=registry) is True
+    assert evaluate('1 + 2 + 3.5', registry=registry) == 6.5
+    with pytest.raises(DispatchError):
+        evaluate("upper(1)", registry=registry)
+
+    snapshot = metrics.snapshot()
+    assert snapshot['upper']['calls'] == 1
+    assert snapshot['upper']['errors'] == 1
+    assert snapshot['upper']['signatures'][('integer',)] == {
+        'calls': 0,
+        'errors': 1,
+        'seconds': 0.0,
+        'buckets': [(bound, 0) for bound in metrics.buckets]
+        + [(float('inf'), 0)],
+    }
+    # The operators are recorded under the functions they delegate to.
+    assert sorted(snapshot['add']['signatures']) \
+        == [('integer', 'float'), ('integer', 'integer')]
+    assert snapshot['equal']['calls'] == 1
+
+    upper = snapshot['upper']['signatures'][('string',)]
+    assert upper['buckets'][-1] == (float('inf'), 1)
+    assert upper['seconds'] > 0
+
+    metrics.reset()
+    assert metrics.snapshot() == {}
+
+
+def test_histogram_buckets():
+    metrics = DispatchMetrics(buckets=[0.1, 0.01])
+    for seconds in (0.001, 0.01, 0.05, 0.5):
+        metrics.record('test', (), seconds)
+    assert metrics.snapshot()['test']['signatures'][()]['buckets'] == [
+        (0.01, 2),
+        (0.1, 3),
+        (float('inf'), 4),
+    ]
+
+
+def test_prometheus_export(registry, tmpdir):
+    metrics = registry.functions.metrics
+    compile("lower($name) == 'x\"y'", registry=registry).evaluate({
+        'name': 'X"Y',
+    })
+
+    text = metrics.to_prometheus()
+    assert '# TYPE bexl_function_duration_seconds histogram\n' in text
+    assert 'bexl_function_calls_total' \
+        '{function="lower",signature="string"} 1\n' in text
+    assert 'bexl_function_dispatch_errors_total' \
+        '{function="equal",signature="string,string"} 0\n' in text
+    assert 'bexl_function_duration_seconds_bucket' \
+        '{function="lower",signature="string",le="+Inf"} 1\n' in text
+    assert 'bexl_function_duration_seconds_count' \
+        '{function="lower",signature="string"} 1\n' in text
+
+    path = str(tmpdir.join('bexl.prom'))
+    metrics.write_prometheus(path, prefix='rules')
+    with open(path) as source:
+        assert 'rules_calls_total{function="equal"' in source.read()
+    assert os.listdir(str(tmpdir)) == ['bexl.prom']
+
+
+def test_metrics_survive_freezing_and_pickling():
+    dispatcher = Dispatcher()
+    dispatcher.register('testNothing')(lambda: None)
+    assert dispatcher.metrics is None
+    dispatcher.metrics = DispatchMetrics()
+    frozen = dispatcher.freeze()
+    assert frozen.metrics is dispatcher.metrics
+
+    frozen.call('testNothing')
+    restored = pickle.loads(pickle.dumps(dispatcher.metrics))
+    assert restored.snapshot()['testNothing']['calls'] == 1
+    restored.record('testNothing', (), 0.1)
+
+    empty = pickle.loads(pickle.dumps(Dispatcher().freeze(Dispatcher())))
+    assert empty.metrics is None
+    empty.metrics = DispatchMetrics()
+    empty = pickle.loads(pickle.dumps(empty))
+    with pytest.raises(DispatchError):
+        empty.call('testMissing')
+    assert empty.metrics.snapshot()['testMissing']['errors'] == 1
+
+
+def test_unmetered_dispatchers_are_unchanged():
+    dispatcher = Dispatcher()
+    assert 'call' not in vars(dispatcher)
+    dispatcher.metrics = DispatchMetrics()
+    assert 'call' in vars(dispatcher)
+    dispatcher.metrics = None
+    assert 'call' not in vars(dispatcher)
+
+
+def test_concurrent_recording(registry):
+    expression = compile('$a * 2', registry=registry)
+
+    def evaluate_many():
+        for value in range(500):
+            expression.evaluate({'a': value})
+
+    threads = [threading.Thread(target=evaluate_many) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert registry.functions.metrics.snapshot()['multiply']['calls'] == 2000
+
+
+def test_compiled_switch_is_recorded(registry):
+    metrics = registry.functions.metrics
+    tree = Parser().parse("switch($x, 1, 'one', 2, 'two', 'other')")
+    expression = Compiler(registry=registry).compile(tree)
+    assert expression.evaluate({'x': 2}).value == 'two'
+    compiled = metrics.snapshot()
+
+    metrics.reset()
+    assert Interpreter(registry=registry).interpret(
+        tree,
+        {'x': 2},
+    ).value == 'two'
+    interpreted = metrics.snapshot()
+    for name in ('switch', 'equal'):
+        assert compiled[name]['calls'] == interpreted[name]['calls']
+        assert sorted(compiled[name]['signatures']) \
+            == sorted(interpreted[name]['signatures'])
+    assert compiled['switch']['calls'] == 1
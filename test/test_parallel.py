@@ -0,0 +1,67 @@
+import pickle
+
+from array import array
+
+import pytest
+
+from bexl import compile, evaluate, ExecutionError
+from bexl.parallel import ParallelEvaluator
+
+
+SOURCE = "$x * 2 + length($name) | $flag"
+
+ROWS = [
+    {'x': i, 'name': 'n' * (i % 5), 'flag': i % 3 == 0}
+    for i in range(103)
+]
+
+
+def expected():
+    return [evaluate(SOURCE, row) for row in ROWS]
+
+
+def test_compiled_expression_pickles():
+    expression = pickle.loads(pickle.dumps(compile(SOURCE)))
+    assert [expression(row).value for row in ROWS] == expected()
+
+
+def test_ordered():
+    evaluator = ParallelEvaluator(SOURCE, processes=2, chunk_size=10)
+    assert list(evaluator.evaluate(iter(ROWS))) == expected()
+    assert sum([stats.rows for stats in evaluator.stats.values()]) == 103
+    assert sum([stats.chunks for stats in evaluator.stats.values()]) == 11
+    assert all([stats.throughput > 0 for stats in evaluator.stats.values()])
+
+
+def test_unordered():
+    evaluator = ParallelEvaluator(compile(SOURCE), processes=2, chunk_size=7)
+    results = list(evaluator.evaluate(ROWS, ordered=False))
+    assert sorted(results) == list(enumerate(expected()))
+
+
+@pytest.mark.parametrize('ordered', (True, False))
+def test_columns(ordered):
+    columns = {
+        'x': array('i', [row['x'] for row in ROWS]),
+        'name': [row['name'] for row in ROWS],
+        'flag': [row['flag'] for row in ROWS],
+    }
+    evaluator = ParallelEvaluator(SOURCE, processes=2, chunk_size=10)
+    results = list(evaluator.evaluate_columns(columns, ordered=ordered))
+    if not ordered:
+        results = [result for _, result in sorted(results)]
+    assert results == expected()
+
+
+def test_float_columns():
+    evaluator = ParallelEvaluator('$a + $b', processes=2, chunk_size=3)
+    assert list(evaluator.evaluate_columns({
+        'a': [0.5, 1.5, 2.5, 3.5],
+        'b': [1, 2, 3, 2 ** 70],
+    })) == [1.5, 3.5, 5.5, 3.5 + 2 ** 70]
+
+
+def test_errors_propagate():
+    evaluator = ParallelEvaluator('$x / 0', processes=2)
+    with pytest.raises(ExecutionError):
+        list(evaluator.evaluate([{'x': 1}]))
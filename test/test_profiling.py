@@ -0,0 +1,152 @@
+import json
+import pickle
+import time
+
+import pytest
+
+from bexl import Compiler, DispatchError, Interpreter, Parser, \
+    STANDARD_REGISTRY, compile
+from bexl.profiling import Profile, ProfilingCompiler, \
+    ProfilingInterpreter, ProfiledExpression
+from bexl.types import Types, make_value
+
+
+SOURCE = "length($names) > 1 & upper($names[0]) == 'A'"
+VARIABLES = {'names': ['a', 'b']}
+
+
+def interpreted(source, variables, registry=None):
+    interpreter = ProfilingInterpreter(registry=registry)
+    tree = Parser().parse(source)
+    for _ in range(3):
+        result = interpreter.interpret(tree, variables)
+    return result, interpreter.profile
+
+
+def compiled(source, variables, registry=None):
+    expression = ProfilingCompiler(registry=registry).compile(
+        Parser().parse(source),
+    )
+    for _ in range(3):
+        result = expression.evaluate(variables)
+    return result, expression.profile
+
+
+PROFILERS = pytest.mark.parametrize('run', (interpreted, compiled))
+
+
+@PROFILERS
+def test_counts_calls_per_node(run):
+    result, profile = run(SOURCE, VARIABLES)
+    assert result.value is True
+
+    calls = [
+        (entry['text'], entry['calls'])
+        for entry in profile.as_dict(SOURCE)['nodes']
+    ]
+    assert (SOURCE, 3) in calls
+    assert ('length($names)', 3) in calls
+    assert ('upper($names[0])', 3) in calls
+    # The span of a variable is that of its name.
+    assert [count for text, count in calls if text == 'names'] == [3, 3]
+
+    functions = dict([
+        (profile.label, profile.calls)
+        for profile in profile.functions.values()
+    ])
+    assert functions['length(list)'] == 3
+    assert functions['upper(string)'] == 3
+    assert functions['at(list, integer)'] == 3
+    assert functions['and(boolean, boolean)'] == 3
+
+
+@PROFILERS
+def test_self_time_excludes_children(run):
+    registry = STANDARD_REGISTRY.derive()
+    registry.functions.register('testSlow')(
+        lambda: time.sleep(0.01) or make_value(Types.INTEGER, 1),
+    )
+    source = '(testSlow() + 1) * 2'
+    result, profile = run(source, {}, registry=registry)
+    assert result.value == 4
+
+    slowest = profile.hotspots()[0]
+    assert slowest.node.name == 'testSlow'
+    assert slowest.self_seconds >= 0.03
+    top = profile.node(slowest.node)
+    assert top.cumulative_seconds >= top.self_seconds
+    for entry in profile.nodes.values():
+        if entry is not slowest:
+            assert entry.self_seconds < 0.01
+            if entry.calls and entry.node is not slowest.node:
+                assert entry.cumulative_seconds <= 0.05
+
+
+def test_report_underlines_source():
+    source = "$a +\n  upper('x')"
+    tree = Parser().parse(source)
+    expression = ProfilingCompiler().compile(tree)
+    with pytest.raises(DispatchError):
+        expression.evaluate({'a': 1})
+
+    report = compile("upper('x')", compiler=ProfilingCompiler)
+    report.evaluate()
+    text = report.profile.report("upper('x')")
+    assert "Function(upper) at 1:1\n    upper('x')\n    ^^^^^^^^^^" in text
+    assert 'upper(string)' in text
+
+    text = expression.profile.report(source, limit=10)
+    assert "    " + "  upper('x')\n" + "      ^^^^^^^^^^" in text
+    assert 'at 2:3' in text
+
+
+def test_json_export():
+    expression = compile('$x * 2', compiler=ProfilingCompiler)
+    expression.evaluate({'x': 2})
+    document = json.loads(expression.profile.to_json('$x * 2'))
+    nodes = dict([(node['text'], node) for node in document['nodes']])
+    assert sorted(nodes) == ['2', 'x', 'x * 2']
+    assert nodes['x']['start'] == {'line': 0, 'column': 1}
+    assert nodes['x']['end'] == {'line': 0, 'column': 2}
+    assert nodes['x * 2']['calls'] == 1
+    assert document['functions'] == [{
+        'name': 'multiply',
+        'signature': ['integer', 'integer'],
+        'calls': 1,
+        'seconds': document['functions'][0]['seconds'],
+    }]
+
+
+def test_shared_profile_and_clear():
+    profile = Profile()
+    tree = Parser().parse('$x + 1')
+    ProfilingInterpreter(profile).interpret(tree, {'x': 1})
+    ProfilingCompiler(profile).compile(tree).evaluate({'x': 1})
+    assert profile.node(tree).calls == 2
+    profile.clear()
+    assert profile.node(tree).calls == 0
+    assert not profile.functions
+    assert profile.hotspots() == []
+
+
+def test_profiling_is_opt_in():
+    tree = Parser().parse('$x + 1')
+    assert type(Compiler().compile(tree)).__name__ == 'CompiledExpression'
+    assert not hasattr(Interpreter(), 'profile')
+
+    expression = ProfilingCompiler().compile(tree)
+    assert isinstance(expression, ProfiledExpression)
+    restored = pickle.loads(pickle.dumps(expression))
+    assert restored.evaluate({'x': 1}).value == 2
+    assert restored.profile.node(restored.tree).calls == 1
+
+
+@PROFILERS
+def test_switch_is_profiled(run):
+    result, profile = run("switch($x, 1, 'one', 2, 'two', 'other')", {'x': 2})
+    assert result.value == 'two'
+    functions = dict([
+        (entry['name'], entry['calls'])
+        for entry in profile.as_dict()['functions']
+    ])
+    assert functions['switch'] == 3
@@ -1,6 +1,7 @@
 import pytest
 
-from bexl import VariableResolver, BexlError
+from bexl import VariableResolver, LazyVariableResolver, BexlError, \
+    ResolverError, compile, evaluate
 
 
 def test_make_from_none():
@@ -56,3 +57,86 @@ def test_del_value():
     with pytest.raises(KeyError):
         vr['foo']
 
+
+PAYLOAD = {
+    'order': {
+        'customer': {'id': 7, 'name': 'Jane', 'history': [1, 2, 3]},
+        'items': [{'sku': 'a'}, {'sku': 'b'}],
+        'notes': 'n/a',
+    },
+    'flag': True,
+    'unused': {'big': list(range(1000))},
+}
+
+
+def test_projected():
+    vr = VariableResolver.projected(
+        compile("$order.customer.id == 7 & $order.items[0].sku == 'a'"),
+        PAYLOAD,
+    )
+    assert sorted(vr.keys()) == ['order']
+    assert vr['order'].value == {
+        'customer': {'id': 7},
+        'items': [{'sku': 'a'}, {'sku': 'b'}],
+    }
+
+
+def test_projected_missing():
+    expr = compile('$order.customer.missing | $flag | $nope')
+    vr = VariableResolver.projected(expr, PAYLOAD)
+    assert sorted(vr.keys()) == ['flag', 'order']
+    assert vr['order'].value == {'customer': {}}
+    with pytest.raises(BexlError):
+        expr.evaluate(vr)
+
+
+def test_projected_loader():
+    requested = []
+
+    def loader(dependency):
+        requested.append(dependency.dotted())
+        return PAYLOAD[dependency.name]
+
+    expr = compile('$order.customer.name == $order.notes & $flag')
+    vr = VariableResolver.projected(expr, loader)
+    assert sorted(requested) == [
+        ['flag'],
+        ['order.customer.name', 'order.notes'],
+    ]
+    assert expr.evaluate(vr).value == expr.evaluate(PAYLOAD).value
+
+
+def test_lazy_callable():
+    requested = []
+
+    def loader(name):
+        requested.append(name)
+        return PAYLOAD[name]
+
+    vr = LazyVariableResolver(loader)
+    assert evaluate('$flag | $unused.big[0] > 1 & $flag', vr) is True
+    assert requested == ['flag']
+    assert vr.loads == {'flag': 1}
+    assert vr.hits == {'flag': 1}
+
+    with pytest.raises(ResolverError):
+        vr('nope')
+    assert vr.loads == {'flag': 1, 'nope': 1}
+
+
+def test_lazy_mapping():
+    vr = LazyVariableResolver({
+        'a': lambda: 1,
+        'b': lambda: 2,
+    })
+    assert compile('$a + $a').evaluate(vr).value == 2
+    assert vr.loads == {'a': 1}
+    assert sorted(vr.keys()) == ['a']
+
+    vr.clear()
+    assert evaluate('$a + $b', vr) == 3
+    assert vr.loads == {'a': 2, 'b': 1}
+
+    with pytest.raises(ResolverError):
+        evaluate('$c', vr)
+    assert 'c' not in vr.loads
@@ -0,0 +1,146 @@
+import random
+
+import pytest
+
+from bexl import Parser, RuleSet, VariableResolver, InterpreterError
+from bexl.rule_index import RuleIndex, extract_guards, EqualityGuard, \
+    InGuard, BetweenGuard
+
+
+def guards(source):
+    return extract_guards(Parser().parse(source))
+
+
+@pytest.mark.parametrize('source,expected', (
+    ("$type == 'purchase'", [EqualityGuard]),
+    ("'purchase' == ($type)", [EqualityGuard]),
+    ("$type == 'purchase' & in($country, ['US', 'CA']) & $total > 5",
+     [EqualityGuard, InGuard]),
+    ('(between($age, 18, 65.5) & $a == 1) & $b',
+     [BetweenGuard, EqualityGuard]),
+    ('$total > 5 & $type == 1', []),
+    ("$type == 'purchase' | $b", []),
+    ('$type == $other', []),
+    ('$type == Null', []),
+    ("in($country, ['US', $other])", []),
+    ("between($age, '18', 65)", []),
+))
+def test_extract_guards(source, expected):
+    assert [type(guard) for guard in guards(source)] == expected
+
+
+RULES = [
+    "$type == 'purchase'",
+    "$type == 'refund' & $total > 100",
+    "$type == 1",
+    "in($country, ['US', 'CA', 1]) & $type == 'purchase'",
+    'between($total, 10, 99.5)',
+    'between($total, 50, 500) & $flag',
+    '$flag & $type == \'purchase\'',
+]
+
+
+def candidates(variables):
+    index = RuleIndex()
+    for position, source in enumerate(RULES):
+        index.add(position, Parser().parse(source))
+    return index.candidates(VariableResolver.make_from(variables))
+
+
+def test_candidates():
+    index = RuleIndex()
+    for position, source in enumerate(RULES):
+        index.add(position, Parser().parse(source))
+    assert len(index) == 7
+    assert index.indexed_count == 6
+
+    assert candidates({
+        'type': 'purchase',
+        'country': 'CA',
+        'total': 75,
+        'flag': True,
+    }) == set([0, 2, 3, 4, 5, 6])
+    assert candidates({
+        'type': 'refund',
+        'country': 'FR',
+        'total': 5.5,
+        'flag': True,
+    }) == set([1, 2, 6])
+
+
+def test_undecidable_guards_are_candidates():
+    assert candidates({}) == set(range(len(RULES)))
+    assert candidates({
+        'type': 2,
+        'country': [1],
+        'total': 'big',
+        'flag': True,
+    }) == set([0, 1, 3, 4, 5, 6])
+
+
+EXPRESSIONS = [
+    "$type == 'a' & $x > 5",
+    "$type == 'b' & $x + 1 > 3 | $flag",
+    "$type == 'a' & in($x, [1, 2, 3]) & $flag",
+    "in($type, ['a', 'c']) & between($x, 2, 7.5)",
+    'between($x, -3, 3) & !$flag',
+    "between($x, 5, 10) & $type == 'c'",
+    "$flag & $type == 'a'",
+    "$type == 'c' & upper($type) == 'C'",
+    "$type == 'b' & $missing > 1",
+    '$x == 4',
+    '$x == 4.0',
+    "$flag == True & $type == 'a'",
+]
+
+
+def random_variables(rnd):
+    variables = {
+        'type': rnd.choice(['a', 'b', 'c', 'd', None, 1]),
+        'x': rnd.choice([
+            rnd.randint(-10, 15),
+            rnd.uniform(-10, 15),
+            None,
+            '4',
+        ]),
+        'flag': rnd.choice([True, False]),
+    }
+    if rnd.random() < 0.1:
+        del variables['x']
+    return variables
+
+
+def evaluate_all(rules, variables):
+    try:
+        return rules.evaluate(variables)
+    except Exception as exc:  # noqa: broad-except
+        return type(exc)
+
+
+def test_indexed_matches_exhaustive():
+    rnd = random.Random(42)
+    indexed = RuleSet()
+    exhaustive = RuleSet(indexed=False)
+    for _ in range(200):
+        name = 'rule%s' % (len(indexed),)
+        source = ' & '.join(rnd.sample(EXPRESSIONS, rnd.randint(1, 3)))
+        indexed.add(name, source)
+        exhaustive.add(name, source)
+
+    for _ in range(300):
+        variables = random_variables(rnd)
+        assert evaluate_all(indexed, variables) \
+            == evaluate_all(exhaustive, variables)
+
+
+def test_errors_of_candidate_rules_propagate():
+    rules = RuleSet({
+        'purchase': "$type == 'purchase' & $total > 5",
+        'refund': "$type == 'refund' & $total > 5",
+    })
+    assert rules.evaluate({'type': 'purchase', 'total': 10}) == {
+        'purchase': True,
+        'refund': False,
+    }
+    with pytest.raises(InterpreterError):
+        rules.evaluate({'type': 'refund', 'total': [1]})
@@ -0,0 +1,66 @@
+import pytest
+
+from bexl import RuleSet, evaluate, ResolverError, StringValue
+from bexl.dispatcher import FUNCTIONS
+from bexl.types import Types
+
+
+RULES = {
+    'gmail': "in('gmail', lower(trim($email)))",
+    'example': "lower(trim($email)) == 'a@example.com' & $age >= 18",
+    'adult': '$age >= 18',
+    'minor': '!($age >= 18)',
+    'category': "switch($category, 'a', 1, 'b', 2, 0) * 10",
+}
+
+VARIABLES = {
+    'email': ' A@Example.com ',
+    'age': 21,
+    'category': 'b',
+}
+
+
+def test_results_match_evaluate():
+    rules = RuleSet(RULES)
+    assert len(rules) == len(RULES)
+    assert 'adult' in rules
+    assert dict(rules.evaluate(VARIABLES)) == dict([
+        (name, evaluate(source, VARIABLES))
+        for name, source in RULES.items()
+    ])
+
+
+def test_non_native_results():
+    rules = RuleSet({'email': 'lower($email)'})
+    result = rules.evaluate(VARIABLES, native=False)['email']
+    assert isinstance(result, StringValue)
+
+
+def test_shared_subexpressions_evaluated_once(monkeypatch):
+    calls = []
+    original = FUNCTIONS.get('trim')[(Types.STRING,)]
+    monkeypatch.setitem(
+        FUNCTIONS.get('trim'),
+        (Types.STRING,),
+        lambda value: calls.append(value) or original(value),
+    )
+
+    rules = RuleSet(RULES)
+    rules.evaluate(VARIABLES)
+    assert len(calls) == 1
+    rules.evaluate(VARIABLES)
+    assert len(calls) == 2
+
+
+def test_add_recompiles():
+    rules = RuleSet({'a': '$age + 1'})
+    assert rules.evaluate(VARIABLES) == {'a': 22}
+    rules.add('b', '$age + 2')
+    assert list(rules) == ['a', 'b']
+    assert rules.evaluate(VARIABLES) == {'a': 22, 'b': 23}
+
+
+def test_errors_raise():
+    rules = RuleSet({'a': '$missing'})
+    with pytest.raises(ResolverError):
+        rules.evaluate(VARIABLES)
@@ -0,0 +1,121 @@
+import struct
+
+import pytest
+
+from bexl import Parser, compile, SerializationError
+from bexl.compact import CompactAST, INDEX
+from bexl.serialization import dumps, loads, dumps_many, loads_many, \
+    dump_compact, FORMAT_VERSION, MAGIC
+
+
+SOURCES = (
+    '123',
+    '123456789012345678901234567890',
+    '0.1 + 1e300',
+    "'föö \\'bar\\''",
+    'True & !False | Null',
+    "lower(trim($email)) == 'x' & $a.b[1:2] > 3",
+    '[1, [2.5, \'x\'], $c][0]',
+    '$a[:2] + $a[1:] + $a[$b]',
+)
+
+
+@pytest.mark.parametrize('source', SOURCES)
+def test_round_trip(source):
+    tree = Parser().parse(source)
+    data = dumps(tree)
+    assert data.startswith(b'BEXL')
+    loaded = loads(data)
+    assert loaded.pretty() == tree.pretty()
+    assert loaded.end_token.column == tree.end_token.column
+    assert loaded.end_token.length == tree.end_token.length
+    assert dumps(loaded) == data
+
+
+def test_round_trip_many():
+    trees = [Parser().parse(source) for source in SOURCES]
+    loaded = loads_many(dumps_many(trees))
+    assert [tree.pretty() for tree in loaded] \
+        == [tree.pretty() for tree in trees]
+
+
+def test_compiled_expression():
+    expr = compile('$a * 2')
+    assert loads(dumps(expr)).pretty() == expr.tree.pretty()
+
+
+def test_bad_magic():
+    with pytest.raises(SerializationError):
+        loads(b'NOPE\x01\x00')
+
+
+def test_bad_version():
+    data = dumps(Parser().parse('1'))
+    data = data[:4] + struct.pack('<H', FORMAT_VERSION + 1) + data[6:]
+    with pytest.raises(SerializationError) as exc:
+        loads(data)
+    assert 'version' in str(exc.value)
+
+
+def test_truncated():
+    data = dumps(Parser().parse('1 + 2'))
+    with pytest.raises(SerializationError):
+        loads(data[:-3])
+
+
+def test_loads_requires_single_tree():
+    data = dumps_many([Parser().parse('1'), Parser().parse('2')])
+    with pytest.raises(SerializationError):
+        loads(data)
+
+
+@pytest.mark.parametrize('source', SOURCES)
+def test_corrupt_bytes(source):
+    data = dumps(Parser().parse(source))
+    for position in range(len(MAGIC) + 2, len(data)):
+        for byte in (0x00, 0x7f, 0x80, 0xff):
+            corrupt = data[:position] + bytearray([byte]) + data[position + 1:]
+            try:
+                loads(bytes(corrupt))
+            except SerializationError:
+                pass
+
+
+def test_invalid_references():
+    def corrupted(change):
+        compact = CompactAST.from_trees([Parser().parse('$a[1:2] + -$b')])
+        change(compact)
+        return dump_compact(compact)
+
+    changes = (
+        lambda compact: compact.children.__setitem__(0, 100),
+        lambda compact: compact.children.__setitem__(-1, len(compact.kinds)),
+        lambda compact: compact.child_offsets.__setitem__(1, 1000),
+        lambda compact: compact.child_offsets.pop(),
+        lambda compact: compact.aux.__setitem__(
+            compact.kinds.tolist().index(7),
+            INDEX,
+        ),
+        lambda compact: compact.aux.__setitem__(
+            compact.kinds.tolist().index(7),
+            64,
+        ),
+        lambda compact: compact.data.__setitem__(
+            compact.kinds.tolist().index(0),
+            50,
+        ),
+        lambda compact: compact.lexemes.__setitem__(0, 500),
+        lambda compact: compact.start_tokens.__setitem__(0, 500),
+        lambda compact: compact.kinds.__setitem__(0, 99),
+        lambda compact: compact.roots.__setitem__(0, 500),
+    )
+    for change in changes:
+        with pytest.raises(SerializationError):
+            loads(corrupted(change))
+
+
+def test_undecodable_text():
+    data = dumps(Parser().parse("'abc'"))
+    position = data.index(b'abc')
+    with pytest.raises(SerializationError):
+        loads(data[:position] + b'\xff\xfe\xfd' + data[position + 3:])
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+
+from bexl import EvaluationSession, evaluate, ResolverError
+from bexl.dispatcher import FUNCTIONS
+from bexl.types import Types
+
+
+RULES = {
+    'email': "lower(trim($email))",
+    'known': "lower(trim($email)) == 'a@example.com' & $age >= 18",
+    'adult': '$age >= 18',
+    'total': 'sum($prices) * (1 + $tax)',
+}
+
+VARIABLES = {
+    'email': ' A@Example.com ',
+    'age': 21,
+    'prices': [1.5, 2.5],
+    'tax': 0.5,
+}
+
+
+def expected(variables):
+    return dict([
+        (name, evaluate(source, variables))
+        for name, source in RULES.items()
+    ])
+
+
+@pytest.fixture
+def trim_calls(monkeypatch):
+    calls = []
+    original = FUNCTIONS.get('trim')[(Types.STRING,)]
+    monkeypatch.setitem(
+        FUNCTIONS.get('trim'),
+        (Types.STRING,),
+        lambda value: calls.append(value) or original(value),
+    )
+    return calls
+
+
+def test_results_follow_updates():
+    session = EvaluationSession(RULES, VARIABLES)
+    variables = dict(VARIABLES)
+    assert dict(session.results()) == expected(variables)
+
+    for changes in (
+            {'age': 17},
+            {'email': 'b@example.com', 'age': 30},
+            {'prices': [1, 2, 3]},
+            {'tax': 0},
+            {'age': 17}):
+        variables.update(changes)
+        assert dict(session.update(**changes)) == expected(variables)
+
+
+def test_only_affected_subexpressions_evaluated(trim_calls):
+    session = EvaluationSession(RULES, VARIABLES)
+    session.results()
+    assert len(trim_calls) == 1
+    assert session.dependencies('known') == frozenset(['email', 'age'])
+
+    session.update(age=12)
+    assert len(trim_calls) == 1
+    # $age, $age >= 18 (shared by two rules) and the conjunction.
+    assert session.evaluated == 3
+
+    session.update({'age': 12, 'tax': 0.5})
+    assert session.evaluated == 0
+
+    session.update(email='x')
+    assert len(trim_calls) == 2
+
+
+def test_impure_functions_always_evaluated():
+    session = EvaluationSession({
+        'now': 'now()',
+        'later': 'now() > $when',
+    }, {'when': datetime(2000, 1, 1)})
+    first = session.results(native=False)['now']
+    second = session.results(native=False)['now']
+    assert first is not second
+    assert session.evaluated == 3
+
+
+def test_errors_propagate_and_recover():
+    session = EvaluationSession(RULES, VARIABLES)
+    session.results()
+    session.remove('tax')
+    with pytest.raises(ResolverError):
+        session.results()
+    assert dict(session.update(tax=1)) \
+        == expected(dict(VARIABLES, tax=1))
@@ -3,7 +3,7 @@ import os
 import pytest
 import yaml
 
-from bexl import evaluate, bexl_to_python, python_to_bexl, VariableResolver, \
+from bexl import evaluate, compile, bexl_to_python, python_to_bexl, VariableResolver, \
     IntegerValue, FloatValue, StringValue, BooleanValue, ListValue, \
     UntypedValue, RecordValue, DateValue, TimeValue, DateTimeValue, BexlError
 
@@ -60,14 +60,13 @@ def make_native(spec):
     return spec['value']
 
 
-@pytest.mark.parametrize('group_name,test_name,test', TESTS)
-def test_standard_suite(group_name, test_name, test):
+def run_test(test, evaluator):
     var_res = VariableResolver()
     for var, defn in test.get('vars', {}).items():
         var_res[var] = make_value(defn['value'], defn['type'])
 
     try:
-        actual = evaluate(test['expr'], native=False, variable_resolver=var_res)
+        actual = evaluator(test['expr'], var_res)
     except BexlError:
         if 'error' not in test:
             raise
@@ -79,3 +78,18 @@ def test_standard_suite(group_name, test_name, test):
                 assert bexl_to_python(actual) == make_native(test['result'])
         assert actual.data_type == test['result']['type'].lower()
 
+
+@pytest.mark.parametrize('group_name,test_name,test', TESTS)
+def test_standard_suite(group_name, test_name, test):
+    run_test(
+        test,
+        lambda expr, var_res: evaluate(expr, native=False, variable_resolver=var_res),
+    )
+
+
+@pytest.mark.parametrize('group_name,test_name,test', TESTS)
+def test_standard_suite_compiled(group_name, test_name, test):
+    run_test(
+        test,
+        lambda expr, var_res: compile(expr).evaluate(var_res),
+    )
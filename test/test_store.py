@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+
+import pytest
+
+from bexl import BexlError
+from bexl.store import ExpressionStore, source_key
+
+
+def test_cold_then_warm(tmpdir):
+    path = str(tmpdir.join('store.db'))
+
+    with ExpressionStore(path) as store:
+        expr = store.compile('$a + 1')
+        assert expr.evaluate({'a': 1}).value == 2
+        assert store.stats.cold == 1
+        assert store.stats.warm == 0
+
+    with ExpressionStore(path) as store:
+        expr = store.compile('$a + 1')
+        assert expr.evaluate({'a': 2}).value == 3
+        assert store.stats.cold == 0
+        assert store.stats.warm == 1
+        assert store.stats.hit_rate == 1.0
+        assert len(store) == 1
+
+
+def test_source_key():
+    assert source_key('1 + 1') == source_key('1 + 1')
+    assert source_key('1 + 1') != source_key('1+1')
+
+
+def test_parse_errors_are_not_stored(tmpdir):
+    with ExpressionStore(str(tmpdir.join('store.db'))) as store:
+        with pytest.raises(BexlError):
+            store.compile('1 +')
+        assert len(store) == 0
+
+
+def test_eviction(tmpdir):
+    with ExpressionStore(str(tmpdir.join('store.db')), max_entries=3) as store:
+        for i in range(5):
+            store.compile('%s + 1' % (i,))
+        assert len(store) == 3
+        assert store.stats.evicted == 2
+        assert store.get('0 + 1') is None
+        assert store.get('4 + 1') is not None
+
+
+def test_clear(tmpdir):
+    with ExpressionStore(str(tmpdir.join('store.db'))) as store:
+        store.compile('1')
+        store.clear()
+        assert len(store) == 0
+
+
+def _worker(path):
+    with ExpressionStore(path, max_entries=50) as store:
+        for i in range(40):
+            assert store.compile('%s * $x' % (i,)).evaluate({'x': 2}).value \
+                == i * 2
+
+
+def test_concurrent_processes(tmpdir):
+    path = str(tmpdir.join('store.db'))
+    processes = [
+        multiprocessing.Process(target=_worker, args=(path,))
+        for _ in range(4)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    with ExpressionStore(path) as store:
+        assert len(store) == 40
+
+
+def test_canonical_dedup(tmpdir):
+    with ExpressionStore(str(tmpdir.join('store.db')), canonical=True) as store:
+        store.compile('$a + 1 & $b')
+        store.compile('(1+$a)&($b)')
+        store.compile('$a + 2 & $b')
+        assert len(store) == 3
+        assert store.tree_count == 2
+
+        expr = store.compile('(1+$a)&($b)')
+        assert store.stats.warm == 1
+        assert expr.evaluate({'a': 1, 'b': True}).value is True
+
+
+def test_eviction_removes_orphaned_trees(tmpdir):
+    path = str(tmpdir.join('store.db'))
+    with ExpressionStore(path, max_entries=1, canonical=True) as store:
+        store.compile('1 + $a')
+        store.compile('$a + 1')
+        assert store.tree_count == 1
+        store.compile('$b')
+        assert len(store) == 1
+        assert store.tree_count == 1
+
+
+def test_corrupt_entries_are_reparsed(tmpdir):
+    path = str(tmpdir.join('store.db'))
+    with ExpressionStore(path, canonical=True) as store:
+        store.compile('$a + 1')
+        store.compile('1 + $a')
+        store.compile('$b')
+        store._connect().execute(
+            "UPDATE trees SET data = X'4245584c0100ff'"
+            " WHERE id IN (SELECT tree FROM sources WHERE key = ?)",
+            (source_key('$a + 1'),),
+        )
+
+        assert store.get('$a + 1') is None
+        assert len(store) == 1
+        assert store.tree_count == 1
+
+        expr = store.compile('1 + $a')
+        assert expr.evaluate({'a': 1}).value == 2
+        assert store.stats.cold == 4
+        assert store.get('1 + $a') is not None